@@ -1,27 +1,48 @@
 import sqlite3
-from bs4 import BeautifulSoup, NavigableString
+from bs4 import BeautifulSoup
 import re
 import requests
 import time
+from urllib.parse import urlparse
+
+from core.filter_store import FilterStore, parse_option_counts, parse_option_labels
+from core.rate_limiter import shared_limiter
 
 
 class PakWheelsFilterScraper:
-    def __init__(self, db_path='filters.db'):
+    NEW_CARS_NON_MAKE_PATHS = {'compare', 'search', 'price-list', 'pricelist', 'upcoming',
+                               'reviews', 'dealers', 'on-road-price', 'car-finder'}
+
+    def __init__(self, db_path='filters.db', limiter=None):
         self.db_path = db_path
+        self.limiter = limiter
         self.base_url = 'https://www.pakwheels.com'
         self.main_url = f'{self.base_url}/used-cars/search/-/'
+        self.new_cars_url = f'{self.base_url}/new-cars/'
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
 
+    def _get(self, url, endpoint):
+        """GETs a page within the shared rate limit; raises for error statuses."""
+        resp = (self.limiter or shared_limiter()).request(requests, url, endpoint, headers=self.headers)
+        resp.raise_for_status()
+        return resp
+
     def init_db(self):
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS filter_enum (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             filter_name TEXT,
-            value TEXT
+            value TEXT,
+            listing_count INTEGER,
+            counted_at REAL
         )''')
+        enum_columns = {row[1] for row in c.execute('PRAGMA table_info(filter_enum)')}
+        for column, column_type in (('listing_count', 'INTEGER'), ('counted_at', 'REAL')):
+            if column not in enum_columns:  # Databases created before counts were kept.
+                c.execute(f'ALTER TABLE filter_enum ADD COLUMN {column} {column_type}')
         c.execute('''CREATE TABLE IF NOT EXISTS filter_range (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             filter_name TEXT,
@@ -29,13 +50,39 @@ class PakWheelsFilterScraper:
             max INTEGER,
             step INTEGER
         )''')  
+        c.execute('''CREATE TABLE IF NOT EXISTS comparison_make (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            name_key TEXT UNIQUE,
+            slug TEXT
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS comparison_model (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            make_id INTEGER REFERENCES comparison_make(id),
+            name TEXT,
+            name_key TEXT,
+            slug TEXT,
+            UNIQUE (make_id, name_key)
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS comparison_version (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_id INTEGER REFERENCES comparison_model(id),
+            name TEXT,
+            name_key TEXT,
+            slug TEXT,
+            UNIQUE (model_id, name_key)
+        )''')
         conn.commit()
         conn.close()
 
+    def parse_option_labels(self, root):
+        return parse_option_labels(root)
+
+    def parse_option_counts(self, root):
+        return parse_option_counts(root)
+
     def fetch_and_parse_live_filters(self):
-        resp = requests.get(self.main_url, headers=self.headers)
-        resp.raise_for_status()
-        time.sleep(2)
+        resp = self._get(self.main_url, 'search')
         soup = BeautifulSoup(resp.text, 'html.parser')
         filters = {}
         for group in soup.select('.accordion-group'):
@@ -57,28 +104,9 @@ class PakWheelsFilterScraper:
                         'step': int(step_val.group(1)) if step_val else None
                     }
                 continue
-            options = []
-            for li in group.select('ul.list-unstyled li'):
-                label = li.select_one('label')
-                if label:
-                    a = label.select_one('a')
-                    label_source = a if a else label
-                    option_texts = []
-                    for child in label_source.children:
-                        if isinstance(child, NavigableString):
-                            text = child.strip()
-                            if text:
-                                option_texts.append(text)
-                        elif hasattr(child, 'name'):
-                            if child.name == 'p':
-                                text = child.get_text(strip=True)
-                                if text:
-                                    option_texts.append(text)
-                    option_text = ' '.join(option_texts)
-                    option_text = re.sub(
-                        r'\s*\d{1,3}(,\d{3})*$', '', option_text)
-                    if option_text:
-                        options.append(option_text)
+            option_counts = self.parse_option_counts(group)
+            options = [label for label, _ in option_counts]
+            counts = {label: count for label, count in option_counts if count is not None}
 
             more_choice = group.select_one('.more-choice')
             popup_options = []
@@ -88,33 +116,13 @@ class PakWheelsFilterScraper:
                 if ajax_url:
                     ajax_full_url = self.base_url + ajax_url.group(1)
                     try:
-                        ajax_resp = requests.get(
-                            ajax_full_url, headers=self.headers)
-                        ajax_resp.raise_for_status()
+                        ajax_resp = self._get(ajax_full_url, 'ajax')
                         ajax_soup = BeautifulSoup(
                             ajax_resp.text, 'html.parser')
-                        for li in ajax_soup.select('ul.list-unstyled li'):
-                            label = li.select_one('label')
-                            if label:
-                                a = label.select_one('a')
-                                label_source = a if a else label
-                                option_texts = []
-                                for child in label_source.children:
-                                    if isinstance(child, NavigableString):
-                                        text = child.strip()
-                                        if text:
-                                            option_texts.append(text)
-                                    elif hasattr(child, 'name'):
-                                        if child.name == 'p':
-                                            text = child.get_text(strip=True)
-                                            if text:
-                                                option_texts.append(text)
-                                option_text = ' '.join(option_texts)
-                                option_text = re.sub(
-                                    r'\s*\d{1,3}(,\d{3})*$', '', option_text)
-                                if option_text:
-                                    popup_options.append(option_text)
-                        time.sleep(0.5)
+                        for label, count in self.parse_option_counts(ajax_soup):
+                            popup_options.append(label)
+                            if count is not None:
+                                counts.setdefault(label, count)
                     except Exception as e:
                         print(
                             f"Failed to fetch expanded options for {filter_name}: {e}")
@@ -123,14 +131,93 @@ class PakWheelsFilterScraper:
                 if filter_name in filters and filters[filter_name]['type'] == 'enum':
                     filters[filter_name]['options'] = list(dict.fromkeys(
                         filters[filter_name]['options'] + all_options))
+                    filters[filter_name]['counts'] = {**counts, **filters[filter_name]['counts']}
                 else:
                     filters[filter_name] = {
                         'type': 'enum',
-                        'options': all_options
+                        'options': all_options,
+                        'counts': counts
                     }
         return filters
 
-    def update_all_filters_in_db(self, filters):
+    def _parse_child_links(self, soup, parent_path, strip_prefix=''):
+        children = {}
+        for a in soup.select('a[href]'):
+            path = urlparse(a['href']).path
+            if not path.startswith(parent_path):
+                continue
+            slug = path[len(parent_path):].strip('/')
+            if not slug or '/' in slug or slug in self.NEW_CARS_NON_MAKE_PATHS:
+                continue
+            name = a.get_text(' ', strip=True)
+            if strip_prefix and name.lower().startswith(strip_prefix.lower() + ' '):
+                name = name[len(strip_prefix) + 1:]
+            if name and slug not in children:
+                children[slug] = name
+        return children
+
+    def fetch_and_parse_comparison_tree(self):
+        """Crawls the new-car make -> model -> version pages into a nested dict keyed by slug."""
+        resp = self._get(self.new_cars_url, 'detail')
+        soup = BeautifulSoup(resp.text, 'html.parser')
+        tree = {}
+        for make_slug, make_name in self._parse_child_links(soup, '/new-cars/').items():
+            make_path = f'/new-cars/{make_slug}/'
+            models = {}
+            try:
+                make_resp = self._get(self.base_url + make_path, 'detail')
+                make_soup = BeautifulSoup(make_resp.text, 'html.parser')
+                for model_slug, model_name in self._parse_child_links(make_soup, make_path, make_name).items():
+                    model_path = f'{make_path}{model_slug}/'
+                    versions = {}
+                    try:
+                        model_resp = self._get(self.base_url + model_path, 'detail')
+                        model_soup = BeautifulSoup(model_resp.text, 'html.parser')
+                        versions = self._parse_child_links(
+                            model_soup, model_path, f'{make_name} {model_name}')
+                    except Exception as e:
+                        print(f"Failed to fetch versions for {make_name} {model_name}: {e}")
+                    models[model_slug] = {'name': model_name, 'versions': versions}
+            except Exception as e:
+                print(f"Failed to fetch models for {make_name}: {e}")
+            tree[make_slug] = {'name': make_name, 'models': models}
+        return tree
+
+    def update_comparison_tree_in_db(self, tree):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.execute('DELETE FROM comparison_version')
+                conn.execute('DELETE FROM comparison_model')
+                conn.execute('DELETE FROM comparison_make')
+                for make_slug, make in tree.items():
+                    make_key = make['name'].strip().lower()
+                    conn.execute('INSERT OR IGNORE INTO comparison_make (name, name_key, slug) VALUES (?, ?, ?)',
+                                 (make['name'], make_key, make_slug))
+                    make_id = conn.execute(
+                        'SELECT id FROM comparison_make WHERE name_key = ?', (make_key,)).fetchone()[0]
+                    for model_slug, model in make['models'].items():
+                        model_key = model['name'].strip().lower()
+                        conn.execute('INSERT OR IGNORE INTO comparison_model (make_id, name, name_key, slug) VALUES (?, ?, ?, ?)',
+                                     (make_id, model['name'], model_key, model_slug))
+                        model_id = conn.execute('SELECT id FROM comparison_model WHERE make_id = ? AND name_key = ?',
+                                                (make_id, model_key)).fetchone()[0]
+                        for version_slug, version_name in model['versions'].items():
+                            conn.execute(
+                                'INSERT OR IGNORE INTO comparison_version (model_id, name, name_key, slug) VALUES (?, ?, ?, ?)',
+                                (model_id, version_name, version_name.strip().lower(), version_slug))
+        finally:
+            conn.close()
+
+    def has_comparison_tree(self):
+        return FilterStore(self.db_path).has_comparison_tree()
+
+    def lookup_comparison_car(self, make, model, version=None):
+        return FilterStore(self.db_path).lookup_comparison_car(make, model, version)
+
+    def update_all_filters_in_db(self, filters, counted_at=None):
+        """Replaces the stored filters; enum options keep their listing counts, stamped with counted_at."""
+        counted_at = counted_at or time.time()
         conn = sqlite3.connect(self.db_path)
         try:
             with conn:
@@ -138,9 +225,12 @@ class PakWheelsFilterScraper:
                 conn.execute('DELETE FROM filter_range')
                 for filter_name, filter_info in filters.items():
                     if filter_info['type'] == 'enum':
+                        counts = filter_info.get('counts', {})
                         for value in filter_info['options']:
+                            count = counts.get(value)
                             conn.execute(
-                                'INSERT INTO filter_enum (filter_name, value) VALUES (?, ?)', (filter_name, value))
+                                'INSERT INTO filter_enum (filter_name, value, listing_count, counted_at) VALUES (?, ?, ?, ?)',
+                                (filter_name, value, count, counted_at if count is not None else None))
                     elif filter_info['type'] == 'range':
                         conn.execute('INSERT INTO filter_range (filter_name, min, max, step) VALUES (?, ?, ?, ?)',
                                      (filter_name, filter_info.get('min'), filter_info.get('max'), filter_info.get('step')))
@@ -157,6 +247,9 @@ class PakWheelsFilterScraper:
         finally:
             conn.close()
 
+    def get_enum_counts(self, filter_name):
+        return FilterStore(self.db_path).get_enum_counts(filter_name)
+
     def get_range_filter(self, filter_name):
         conn = sqlite3.connect(self.db_path)
         try:
@@ -178,3 +271,7 @@ if __name__ == '__main__':
     filters = scraper.fetch_and_parse_live_filters()
     scraper.update_all_filters_in_db(filters)
     print('All filter options updated in database.')
+    print('\n--- Crawling new-car make/model/version tree ---')
+    tree = scraper.fetch_and_parse_comparison_tree()
+    scraper.update_comparison_tree_in_db(tree)
+    print(f'Stored comparison vocabulary for {len(tree)} makes.')
@@ -0,0 +1,146 @@
+import math
+import random
+from typing import Callable
+
+from .filter_rules import FilterVerifier
+from .models import ListingData, ListingPageData
+
+ACCEPT = "accept"
+REJECT = "reject"
+
+
+def binomial_upper_bound(mismatches: int, samples: int, confidence: float = 0.95) -> float:
+    """One-sided Clopper-Pearson upper bound on a mismatch rate, found by bisection."""
+    if samples == 0:
+        return 1.0
+    if mismatches >= samples:
+        return 1.0
+    alpha = 1 - confidence
+
+    def cdf(p: float) -> float:
+        return sum(math.comb(samples, k) * p ** k * (1 - p) ** (samples - k)
+                   for k in range(mismatches + 1))
+
+    low, high = mismatches / samples, 1.0
+    for _ in range(60):
+        mid = (low + high) / 2
+        if cdf(mid) > alpha:
+            low = mid
+        else:
+            high = mid
+    return high
+
+
+def binomial_lower_bound(mismatches: int, samples: int, confidence: float = 0.95) -> float:
+    """One-sided Clopper-Pearson lower bound on a mismatch rate, found by bisection."""
+    if mismatches == 0:
+        return 0.0
+    return 1 - binomial_upper_bound(samples - mismatches, samples, confidence)
+
+
+class SequentialDetailSampler:
+    """
+    Decides how many detail pages to open with Wald's sequential probability ratio test.
+
+    Each sampled listing is a Bernoulli trial (mismatch or not). Sampling stops as soon as
+    the evidence says the mismatch rate is at most acceptable_rate (accept) or at least
+    threshold_rate (reject), with error rates alpha and beta; with no mismatches and the
+    defaults that takes about 30 detail pages in total, however many listings the sweep has.
+    Listings are drawn at random within each page, in batches so the tab pool stays busy.
+    """
+
+    def __init__(self, verifier: FilterVerifier, acceptable_rate: float = 0.01,
+                 threshold_rate: float = 0.10, alpha: float = 0.05, beta: float = 0.05,
+                 batch_size: int = 4, seed: int | None = None):
+        """
+        Initializes the SequentialDetailSampler.
+
+        Args:
+            verifier: Compiled filter rules; only its detail rules are sampled.
+            acceptable_rate: Mismatch rate treated as "effectively zero" (H0).
+            threshold_rate: Mismatch rate that counts as a broken filter (H1).
+            alpha: Chance of rejecting a filter that is actually fine.
+            beta: Chance of accepting a filter that is actually broken.
+            batch_size: Detail pages requested per round; usually the tab pool size.
+            seed: Seed for the sampling order, for reproducible runs.
+        """
+        self.verifier = verifier
+        self.acceptable_rate = acceptable_rate
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self._rng = random.Random(seed)
+        self._match_step = math.log((1 - threshold_rate) / (1 - acceptable_rate))
+        self._mismatch_step = math.log(threshold_rate / acceptable_rate)
+        self._accept_at = math.log(beta / (1 - alpha))
+        self._reject_at = math.log((1 - beta) / alpha)
+        self.log_ratio = 0.0
+        self.samples = 0
+        self.mismatched = 0
+        self.listings_seen = 0
+        self.decision: str | None = None
+
+    def expected_samples(self) -> float:
+        """
+        Wald's approximation of the evaluable detail pages needed to reach a decision when
+        the filter holds (mismatch rate = acceptable_rate); about 37 with the defaults.
+        """
+        p = self.acceptable_rate
+        drift = (1 - p) * self._match_step + p * self._mismatch_step
+        return ((1 - self.alpha) * self._accept_at + self.alpha * self._reject_at) / drift
+
+    def _observe(self, mismatch: bool):
+        if self.decision is not None:
+            return
+        self.samples += 1
+        self.mismatched += mismatch
+        self.log_ratio += self._mismatch_step if mismatch else self._match_step
+        if self.log_ratio <= self._accept_at:
+            self.decision = ACCEPT
+        elif self.log_ratio >= self._reject_at:
+            self.decision = REJECT
+
+    def check(self, listings: list[ListingData],
+              load_details: Callable[[list[str]], dict[str, ListingPageData | None]],
+              prefix: str = "") -> list[str]:
+        """
+        Checks one page: every summary rule on every listing, detail rules on a sequential sample.
+
+        Returns:
+            Mismatch messages found on the summary cards and the sampled detail pages.
+        """
+        labels = [f"{prefix}{label}" for label in self.verifier.labels(listings)]
+        mismatches = self.verifier.check_summaries(listings, labels)
+        self.listings_seen += len(listings)
+        if not self.verifier.needs_detail_pages or self.decision is not None:
+            return mismatches
+
+        candidates = [(listing, label) for listing, label in zip(listings, labels) if listing.url]
+        self._rng.shuffle(candidates)
+        while candidates and self.decision is None:
+            batch, candidates = candidates[:self.batch_size], candidates[self.batch_size:]
+            details_by_url = load_details([listing.url for listing, _ in batch])
+            for listing, label in batch:
+                if self.decision is not None:
+                    break  # Decided mid-batch; the rest of the batch is not sampled.
+                details = details_by_url.get(listing.url)
+                if details is None:
+                    mismatches.append(f"{label}: Detail page could not be loaded ({listing.url}).")
+                    continue
+                found = self.verifier.check_details([details], [label])
+                mismatches.extend(found)
+                # A page showing none of the checked fields is not a passing trial.
+                if self.verifier.evaluates_details(details):
+                    self._observe(bool(found))
+        return mismatches
+
+    def report(self) -> str:
+        """Describes the decision and the confidence the samples give."""
+        confidence = 1 - self.alpha
+        if self.decision == REJECT:
+            bound = f">= {binomial_lower_bound(self.mismatched, self.samples, confidence):.1%}"
+        else:
+            bound = f"<= {binomial_upper_bound(self.mismatched, self.samples, confidence):.1%}"
+        outcome = {ACCEPT: "filter holds", REJECT: "filter broken", None: "undecided"}[self.decision]
+        return (f"{outcome}: {self.mismatched}/{self.samples} sampled detail pages mismatched "
+                f"out of {self.listings_seen} listings; mismatch rate {bound} "
+                f"with {confidence:.0%} confidence")
@@ -0,0 +1,179 @@
+import json
+import re
+import urllib.request
+
+import trio
+from selenium.webdriver.common.bidi.cdp import BrowserError, WsConnectionClosed, import_devtools, open_cdp
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from .extractor import ListingExtractor
+from .models import ListingPageData
+
+OUTER_HTML_JS = "document.documentElement.outerHTML"
+
+# What a dead tab or CDP connection surfaces as, as opposed to one page failing to load.
+SESSION_ERRORS = (WsConnectionClosed, trio.BrokenResourceError, trio.ClosedResourceError)
+# CDP error messages for a target or session that no longer exists.
+DEAD_SESSION_RE = re.compile(r"(session|target) (with given id )?(not found|closed|crashed)|No target", re.I)
+
+
+def _is_session_error(error: Exception) -> bool:
+    if isinstance(error, SESSION_ERRORS):
+        return True
+    return isinstance(error, BrowserError) and bool(DEAD_SESSION_RE.search(error.message or ""))
+
+
+class AsyncDetailLoader:
+    """
+    Loads listing detail pages through a fixed pool of background tabs over CDP.
+
+    Runs on trio through Selenium's own CDP client. Each of the K tabs is a long-lived
+    target that is navigated to the next URL instead of being closed and reopened, and
+    the tabs survive between load() calls. As soon as a tab has handed over its HTML it
+    moves on to the next URL while the HTML is parsed in a worker thread, so loading in
+    one tab overlaps with extraction of another. The WebDriver session itself is not
+    touched, so the current tab stays where it is. Scripts registered with
+    addScriptToEvaluateOnNewDocument only apply to the target they were added on, so the
+    driver's init scripts (stealth, popup suppression) are added to each pooled tab too.
+    """
+
+    def __init__(self, driver: WebDriver, tabs: int = 4, load_timeout: float = 30, limiter=None,
+                 init_scripts: list[str] | None = None):
+        """
+        Initializes the AsyncDetailLoader.
+
+        Args:
+            driver: A Chrome WebDriver; only its DevTools endpoint is used.
+            tabs: Number of tabs kept in the pool.
+            load_timeout: Seconds to wait for one page's DOMContentLoaded.
+            limiter: TokenBucketLimiter every navigation waits for (optional).
+            init_scripts: Scripts run at document start in every pooled tab.
+        """
+        self.driver = driver
+        self.tabs = tabs
+        self.load_timeout = load_timeout
+        self.limiter = limiter
+        self.init_scripts = list(init_scripts or [])
+        self.extractor = ListingExtractor()
+        self._target_ids = []
+
+    def load(self, urls: list[str]) -> dict[str, ListingPageData | None]:
+        """
+        Loads and extracts every URL.
+
+        Returns:
+            ListingPageData per URL, or None for pages that timed out or failed. A failure
+            in one tab only costs the URL it was on; the other tabs take the rest.
+        """
+        urls = list(dict.fromkeys(urls))
+        try:
+            return trio.run(self._load_all, urls)
+        except Exception as e:
+            print(f"Error starting the detail tab pool: {e}")
+            return dict.fromkeys(urls)
+
+    def close(self):
+        """Closes the pooled tabs."""
+        if self._target_ids:
+            trio.run(self._close_all)
+
+    def _cdp_endpoint(self) -> tuple[str, str]:
+        """Returns the browser's major version and DevTools WebSocket URL."""
+        debugger_address = self.driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        with urllib.request.urlopen(f"http://{debugger_address}/json/version", timeout=10) as resp:
+            info = json.load(resp)
+        version = re.search(r"/(\d+)\.", info["Browser"]).group(1)
+        return version, info["webSocketDebuggerUrl"]
+
+    async def _load_all(self, urls: list[str]) -> dict[str, ListingPageData | None]:
+        version, ws_url = self._cdp_endpoint()
+        devtools = import_devtools(version)
+        results = dict.fromkeys(urls)
+        async with open_cdp(ws_url) as conn:
+            await self._fill_pool(conn, devtools, min(self.tabs, len(urls)))
+            send_url, receive_url = trio.open_memory_channel(len(urls))
+            for url in urls:
+                send_url.send_nowait(url)
+            send_url.close()
+            async with trio.open_nursery() as nursery:
+                for target_id in list(self._target_ids[:len(urls)]):
+                    nursery.start_soon(self._tab_worker, conn, devtools, target_id,
+                                       receive_url.clone(), results)
+        return results
+
+    async def _fill_pool(self, conn, devtools, wanted: int):
+        """Drops tabs that were closed since the last call and opens new ones up to the pool size."""
+        targets = await conn.execute(devtools.target.get_targets())
+        alive = {info.target_id for info in targets}
+        self._target_ids = [target_id for target_id in self._target_ids if target_id in alive]
+        while len(self._target_ids) < wanted:
+            target_id = await conn.execute(
+                devtools.target.create_target("about:blank", background=True))
+            if self.init_scripts:
+                async with conn.open_session(target_id) as session:
+                    for source in self.init_scripts:
+                        await session.execute(devtools.page.add_script_to_evaluate_on_new_document(source))
+            self._target_ids.append(target_id)
+
+    async def _tab_worker(self, conn, devtools, target_id, receive_url, results: dict):
+        try:
+            async with conn.open_session(target_id) as session, trio.open_nursery() as parsers:
+                await session.execute(devtools.page.enable())
+                async with receive_url:
+                    async for url in receive_url:
+                        try:
+                            html = await self._navigate(session, devtools, url)
+                        except Exception as e:
+                            # Stop taking URLs but let this tab's pending parses finish;
+                            # the other tabs drain the channel.
+                            print(f"Detail tab {target_id} lost its session on {url}, retiring it for this batch: {e}")
+                            break
+                        if html is not None:
+                            parsers.start_soon(self._extract, url, html, results)
+        except Exception as e:
+            # The tab is dropped from this batch; its URL stays None and the remaining
+            # URLs go to the other tabs. _fill_pool replaces it on the next load().
+            print(f"Error in detail tab {target_id}, retiring it for this batch: {e}")
+
+    async def _navigate(self, session, devtools, url: str) -> str | None:
+        """
+        Points the tab at a URL and returns its HTML once the DOM is ready.
+
+        Returns None when only this page failed; raises when the tab's session is dead.
+        """
+        if self.limiter is not None:
+            await trio.to_thread.run_sync(self.limiter.acquire, "detail")
+        try:
+            with trio.move_on_after(self.load_timeout) as scope:
+                async with session.wait_for(devtools.page.DomContentEventFired):
+                    await session.execute(devtools.page.navigate(url))
+            if scope.cancelled_caught:
+                print(f"Warning: Timed out loading detail page {url}")
+                return None
+            remote, _ = await session.execute(
+                devtools.runtime.evaluate(OUTER_HTML_JS, return_by_value=True))
+            return remote.value
+        except Exception as e:
+            if _is_session_error(e):
+                raise  # The tab is gone; _tab_worker retires it so it stops taking URLs.
+            print(f"Error loading detail page {url}: {e}")
+            return None
+
+    async def _extract(self, url: str, html: str, results: dict):
+        try:
+            results[url] = await trio.to_thread.run_sync(
+                self.extractor.extract_listing_page_data_from_html, html)
+            print(f"Extracted detail page {url}")
+        except Exception as e:
+            print(f"Error extracting detail page {url}: {e}")
+
+    async def _close_all(self):
+        version, ws_url = self._cdp_endpoint()
+        devtools = import_devtools(version)
+        async with open_cdp(ws_url) as conn:
+            for target_id in self._target_ids:
+                try:
+                    await conn.execute(devtools.target.close_target(target_id))
+                except Exception:
+                    pass
+        self._target_ids = []
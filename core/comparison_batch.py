@@ -0,0 +1,172 @@
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict
+from typing import Iterator
+
+from core.comparison_cache import ComparisonCache
+from core.comparison_interactor import ComparisonInteractor
+from core.comparison_slugs import ComparisonSlugMap
+from core.models import ComparisonResult
+from core.navigator import PakWheelsNavigator
+
+
+class ComparisonBatchRunner:
+    """
+    Runs many comparisons across a pool of browser sessions, streaming results to a JSONL file.
+
+    All sessions share one ComparisonCache and one ComparisonSlugMap, so a result or slug
+    learned by one session is reused by the others and the files behind them are written
+    by one owner at a time.
+    """
+
+    def __init__(self, output_path: str, workers: int = 2, config_path: str = "config.json"):
+        """
+        Initializes the ComparisonBatchRunner.
+
+        Args:
+            output_path: JSONL file each finished comparison is appended to. It doubles as
+                         the checkpoint: groups already stored there with status 'ok' are skipped.
+            workers: Number of browser sessions to run in parallel.
+            config_path: Config file handed to each PakWheelsNavigator.
+        """
+        with open(config_path, "r") as f:
+            self.config = json.load(f)
+        self.output_path = output_path
+        self.workers = max(1, workers)
+        self.config_path = config_path
+        self._write_lock = threading.Lock()
+
+    @staticmethod
+    def _group_id(group: list[dict[str, str]]) -> str:
+        return " vs ".join("|".join(car) for car in ComparisonCache.make_key(group))
+
+    def completed_groups(self, statuses: tuple[str, ...] = ("ok",)) -> set[str]:
+        """Returns the ids of groups stored in earlier runs with one of the given statuses."""
+        done = set()
+        if not os.path.exists(self.output_path):
+            return done
+        with open(self.output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn final line from a crash.
+                if record.get("status") in statuses:
+                    done.add(record["group_id"])
+        return done
+
+    def run(self, groups: list[list[dict[str, str]]]) -> dict[str, int]:
+        """
+        Compares every group, resuming from the output file if it already exists.
+
+        Args:
+            groups: Lists of 1-3 car dicts with 'Make', 'Model' and optional 'Version'.
+
+        Returns:
+            Counts of groups that succeeded, failed, were skipped from the checkpoint or invalid.
+        """
+        stats = {"ok": 0, "failed": 0, "skipped": 0, "invalid": 0}
+        done = self.completed_groups()
+        recorded_invalid = self.completed_groups(("invalid",))
+        self._terminate_torn_line()
+        pending = queue.Queue()
+        seen = set()
+
+        for group in groups:
+            group_id = self._group_id(group)
+            if not 1 <= len(group) <= 3:
+                print(f"Skipping invalid group of {len(group)} cars: {group_id}")
+                if group_id not in recorded_invalid:
+                    self._write({"group_id": group_id, "cars": group, "status": "invalid"})
+                    recorded_invalid.add(group_id)
+                stats["invalid"] += 1
+            elif group_id in done or group_id in seen:
+                stats["skipped"] += 1
+            else:
+                seen.add(group_id)
+                pending.put(group)
+
+        print(f"Comparing {pending.qsize()} groups across {self.workers} browser sessions "
+              f"({stats['skipped']} already done).")
+        slug_map = ComparisonSlugMap(self.config.get("comparison_slug_path", "comparison_slugs.json"))
+        cache = ComparisonCache(ttl=self.config.get("comparison_cache_ttl", 3600),
+                                cache_path=self.config.get("comparison_cache_path"))
+        threads = [
+            threading.Thread(target=self._worker, args=(pending, slug_map, cache, stats), daemon=True)
+            for _ in range(min(self.workers, pending.qsize()))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats
+
+    def _worker(self, pending: queue.Queue, slug_map: ComparisonSlugMap, cache: ComparisonCache,
+                stats: dict[str, int]):
+        navigator = PakWheelsNavigator(self.config_path)
+        interactor = None
+        try:
+            while True:
+                try:
+                    group = pending.get_nowait()
+                except queue.Empty:
+                    return
+
+                group_id = self._group_id(group)
+                started = time.time()
+                try:
+                    if interactor is None:
+                        driver, wait = navigator.initialize_driver()
+                        interactor = ComparisonInteractor(driver, wait, navigator, cache=cache)
+                        interactor.slug_map = slug_map
+                    if not slug_map.build_url(navigator.config.get("comparison_url", ""), group):
+                        navigator.go_to_comparison_page()
+                    result = interactor.get_comparison_result(group)
+                except Exception as e:
+                    print(f"Error comparing {group_id}: {e}. Restarting browser session.")
+                    navigator.close_driver()
+                    interactor = None
+                    result = None
+
+                record = {"group_id": group_id, "cars": group,
+                          "duration": round(time.time() - started, 2)}
+                if result is not None:
+                    record.update(status="ok", result=asdict(result))
+                else:
+                    record["status"] = "failed"
+                self._write(record)
+                with self._write_lock:
+                    stats[record["status"]] += 1
+        finally:
+            navigator.close_driver()
+
+    def _terminate_torn_line(self):
+        """Makes sure appends after a crash start on a fresh line."""
+        if not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0:
+            return
+        with open(self.output_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _write(self, record: dict):
+        with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def load_comparison_results(output_path: str) -> Iterator[tuple[list[dict[str, str]], ComparisonResult]]:
+    """Yields (cars, ComparisonResult) pairs for every successful record in a batch output file."""
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                yield record["cars"], ComparisonResult.from_dict(record["result"])
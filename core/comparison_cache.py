@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+from typing import Optional, Tuple
+
+from .models import ComparisonResult
+
+CarKey = Tuple[Tuple[str, str, str], ...]
+KEY_FIELDS = ("Make", "Model", "Version")
+
+
+def normalize_car_details(details: dict[str, str]) -> Tuple[str, str, str]:
+    """Lower-cases and strips the Make/Model/Version of a single car dict."""
+    return tuple((details.get(name) or "").strip().lower() for name in KEY_FIELDS)
+
+
+class ComparisonCache:
+    """
+    Caches ComparisonResult objects keyed by the ordered Make/Model/Version triples compared.
+
+    One instance may be shared by several threads; a lock serializes updates and file writes.
+    """
+
+    def __init__(self, ttl: float = 3600, cache_path: Optional[str] = None):
+        """
+        Initializes the ComparisonCache.
+
+        Args:
+            ttl: Seconds a stored result stays valid.
+            cache_path: Optional JSON file used to persist entries between runs.
+        """
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self._entries: dict[CarKey, tuple[float, ComparisonResult]] = {}
+        self._lock = threading.Lock()
+        if cache_path:
+            self._load()
+
+    @classmethod
+    def make_key(cls, car_details: list[dict[str, str]]) -> CarKey:
+        """Normalizes the car dicts into a hashable key. Slot order is preserved."""
+        return tuple(normalize_car_details(details) for details in car_details)
+
+    def get(self, car_details: list[dict[str, str]]) -> ComparisonResult | None:
+        """Returns the cached result for these cars, or None if missing or expired."""
+        key = self.make_key(car_details)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            stored_at, result = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self._save()
+                return None
+            return result
+
+    def put(self, car_details: list[dict[str, str]], result: ComparisonResult):
+        """Stores a result for these cars and persists the cache if a path is configured."""
+        with self._lock:
+            self._entries[self.make_key(car_details)] = (time.time(), result)
+            self._save()
+
+    def invalidate(self, car_details: list[dict[str, str]]):
+        """Drops the cached result for these cars, if any."""
+        with self._lock:
+            if self._entries.pop(self.make_key(car_details), None):
+                self._save()
+
+    def clear(self):
+        """Drops every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read comparison cache '{self.cache_path}': {e}")
+            return
+        now = time.time()
+        for entry in raw:
+            stored_at = entry.get("stored_at", 0)
+            if now - stored_at > self.ttl:
+                continue
+            key = tuple(tuple(car) for car in entry["key"])
+            self._entries[key] = (stored_at, ComparisonResult.from_dict(entry["result"]))
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        raw = [
+            {"key": [list(car) for car in key], "stored_at": stored_at, "result": asdict(result)}
+            for key, (stored_at, result) in self._entries.items()
+        ]
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(raw, f)
+        except OSError as e:
+            print(f"Warning: Could not write comparison cache '{self.cache_path}': {e}")
@@ -1,29 +1,75 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from core.navigator import PakWheelsNavigator
+from core.comparison_cache import ComparisonCache
+from core.comparison_slugs import ComparisonSlugMap
+from core.filter_store import FilterStore
+from core.extractor import ListingExtractor
+from core.models import ComparisonResult
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.action_chains import ActionChains
+import os
 import time
 
 
+def _xpath_literal(text: str) -> str:
+    """Quotes text for an XPath expression, using concat() when it holds both quote kinds."""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in text.split("'")) + ")"
+
+
 class ComparisonInteractor:
     MODAL_XPATH = "//div[contains(@class,'cat-selection') or contains(@class,'comparison-modal')]"
 
-    def __init__(self, driver, wait, navigator: PakWheelsNavigator):
-        self.driver = driver
-        self.wait = wait
+    def __init__(self, driver, wait, navigator: PakWheelsNavigator, cache: ComparisonCache | None = None,
+                 vocabulary: FilterStore | None = None):
+        self._driver = driver
+        self._wait = wait
         self.navigator = navigator
-        
+        if cache is None:
+            cache = ComparisonCache(
+                ttl=navigator.config.get("comparison_cache_ttl", 3600),
+                cache_path=navigator.config.get("comparison_cache_path"))
+        self.cache = cache
+        self.slug_map = ComparisonSlugMap(
+            navigator.config.get("comparison_slug_path", "comparison_slugs.json"))
+        if vocabulary is None:
+            db_path = navigator.config.get("filters_db_path", "filters.db")
+            if os.path.exists(db_path):
+                store = FilterStore(db_path)
+                if store.has_comparison_tree():
+                    vocabulary = store
+        self.vocabulary = vocabulary
+
+    # Read through the navigator so the interactor follows the new browser after a restart.
+    @property
+    def driver(self):
+        return self.navigator.driver or self._driver
+
+    @property
+    def wait(self):
+        return self.navigator.wait or self._wait
+
     def do_comparison(self, car_details: list[dict[str:str]]) -> bool:
+        if not 1 <= len(car_details) <= 3:
+            print("  ✖ Invalid number of cars to compare")
+            return False
+
+        if not self.validate_car_details(car_details):
+            return False
+
+        if self.open_comparison_by_url(car_details):
+            print("  ✓ Comparison opened directly via URL.")
+            return True
+
         if not self.navigator.is_on_comparison_page():
             print("  ✖ Not on comparison page")
             self.navigator.go_to_comparison_page()
-            
-        if not len(car_details) >= 1 and len(car_details) <= 3:
-            print("  ✖ Invalid number of cars to compare")
-            return False
-        
+
         print("  Starting comparison process…")
         for i, details in enumerate(car_details):
             print(f"  Selecting car {i+1}…")
@@ -36,14 +82,114 @@ class ComparisonInteractor:
         
         if success:
             print("  ✓ Comparison initiated successfully.")
+            self._learn_slugs(car_details)
             return True
         else:
             print("  ✖ Failed to initiate comparison.")
             return False
-    
-    
+
+    def validate_car_details(self, car_details: list[dict[str:str]]) -> bool:
+        """
+        Rejects cars that are missing from the scraped new-car vocabulary before any browser work.
+
+        Without a scraped vocabulary every request is accepted and left to the picker.
+        """
+        if not self.vocabulary:
+            return True
+        cars = []
+        for details in car_details:
+            car = self._lookup_car(details)
+            if car is None:
+                print(f"  ✖ Unknown car requested: {details}")
+                return False
+            cars.append((details, car))
+        self.slug_map.learn_from_tree(cars)
+        return True
+
+    def _lookup_car(self, details: dict) -> dict | None:
+        if not self.vocabulary:
+            return None
+        return self.vocabulary.lookup_comparison_car(
+            details.get("Make", ""), details.get("Model", ""), details.get("Version"))
+
+    def open_comparison_by_url(self, car_details: list[dict[str:str]]) -> bool:
+        """
+        Loads the comparison result page with a single driver.get, skipping the slot picker.
+
+        Only works for cars whose slugs are known, either from an earlier picker run or
+        built from the scraped new-car tree.
+
+        Returns:
+            True if the result page loaded, False if the slugs are unknown or the page failed.
+        """
+        url = self.slug_map.build_url(
+            self.navigator.config.get("comparison_url", ""), car_details)
+        if not url:
+            return False
+
+        print(f"  Opening comparison directly: {url}")
+        try:
+            self.driver.get(url)
+            self.navigator.wait_for("comparison_direct_result", EC.visibility_of_element_located(
+                (By.CSS_SELECTOR, "table.vehicle-compare-head")), 10)
+            return True
+        except Exception as e:
+            print(f"  ✖ Direct comparison URL failed, falling back to the picker: {e}")
+            self.slug_map.forget(car_details)
+            return False
+
+    def _learn_slugs(self, car_details: list[dict[str:str]]):
+        """Records the slugs from the result URL the picker navigated to."""
+        try:
+            self.navigator.wait_for("comparison_url_update",
+                lambda d: len(ComparisonSlugMap.slugs_in_url(d.current_url)) == len(car_details), 10, optional=True)
+        except TimeoutException:
+            print("  → Comparison URL did not update; slugs not learned.")
+            return
+        if self.slug_map.learn_from_url(self.driver.current_url, car_details):
+            print(f"  → Learned comparison slugs from {self.driver.current_url}")
+
+    def get_comparison_result(self, car_details: list[dict[str:str]], force_refresh: bool = False) -> ComparisonResult | None:
+        """
+        Returns the ComparisonResult for the given cars, serving it from the cache when possible.
+
+        Args:
+            car_details: Up to 3 dicts with 'Make', 'Model' and optional 'Version' keys.
+            force_refresh: Ignore any cached result and drive the browser again.
+
+        Returns:
+            The ComparisonResult, or None if the comparison could not be run.
+        """
+        if not force_refresh:
+            cached = self.cache.get(car_details)
+            if cached is not None:
+                print("  ✓ Returning cached comparison result.")
+                return cached
+
+        if not self.do_comparison(car_details):
+            return None
+
+        try:
+            self.navigator.wait_for("comparison_result_head", EC.visibility_of_element_located(
+                (By.CSS_SELECTOR, "table.vehicle-compare-head")))
+            self.navigator.wait_for("comparison_result_specs", EC.visibility_of_element_located(
+                (By.CSS_SELECTOR, "div.specs-wrapper.spec-compare-details")))
+        except TimeoutException:
+            print("  ✖ Comparison results page did not load.")
+            return None
+
+        result = ListingExtractor().extract_comparison_data(self.driver)
+        self.cache.put(car_details, result)
+        return result
+
 
     def select_car(self, slot_num: int, details: dict) -> bool:
+        car = self._lookup_car(details)
+        if self.vocabulary and car is None:
+            print(f"  ✖ Unknown car requested: {details}")
+            return False
+        car = car or {}
+
         slot = self.wait.until(EC.element_to_be_clickable(
             (By.ID, f"vehicle_selector_{slot_num}")
         ))
@@ -65,17 +211,17 @@ class ComparisonInteractor:
         self._close_interfering_popup()
         time.sleep(0.5)
 
-        if not self._select_make(details["Make"]):
+        if not self._select_make(details["Make"], car.get("make")):
             return False
 
-        if not self._select_model(details["Model"]):
+        if not self._select_model(details["Model"], car.get("model")):
             return False
 
         self.navigator._close_google_signin_popup(timeout=2)
 
         self._close_interfering_popup()
         version = details.get("Version")
-        if version and not self._select_version(version):
+        if version and not self._select_version(version, car.get("version")):
             return False
 
         print(f"  ✓ Car {slot_num} selected: {details}")
@@ -94,8 +240,29 @@ class ComparisonInteractor:
             print(f"  ✖ ActionChains click failed: {e}")
             return False
 
-    def _select_make(self, make_text):
+    def _click_exact_link(self, xpath: str, label: str) -> bool:
+        """Waits for the single link matching an exact locator and clicks it."""
+        try:
+            elem = self.navigator.wait_for(
+                "comparison_exact_link", EC.element_to_be_clickable((By.XPATH, xpath)), 5, optional=True)
+            self.driver.execute_script(
+                "arguments[0].scrollIntoView({block:'center'});", elem)
+            try:
+                elem.click()
+            except Exception:
+                self.driver.execute_script("arguments[0].click();", elem)
+            time.sleep(1)
+            print(f"      → clicked {label}")
+            return True
+        except Exception as e:
+            print(f"      ✖ exact locator for '{label}' failed, scanning instead: {e}")
+            return False
+
+    def _select_make(self, make_text, canonical_make: str | None = None):
         print(f"    Picking Make: {make_text}")
+        if canonical_make and self._click_exact_link(
+                f"//li[contains(@class, 'make')]//a[normalize-space()={_xpath_literal(canonical_make)}]", canonical_make):
+            return True
         try:
             make_elements = self.wait.until(EC.presence_of_all_elements_located(
                 (By.XPATH, "//li[contains(@class, 'make')]//a")))
@@ -127,11 +294,16 @@ class ComparisonInteractor:
             print(f"      ✖ Error locating make elements: {e}")
             return False
 
-    def _select_model(self, model_text: str) -> bool:
+    def _select_model(self, model_text: str, canonical_model: str | None = None) -> bool:
         print(f"    Picking Model: {model_text}")
         try:
             self._dismiss_overlay_link()
 
+            if canonical_model and self._click_exact_link(
+                    "//ul[contains(@class, 'model-listings') and contains(@class, 'show')]"
+                    f"//li[contains(@class, 'model')]//a[normalize-space()={_xpath_literal(canonical_model)}]", canonical_model):
+                return True
+
             self.wait.until(EC.presence_of_element_located((
                 By.CSS_SELECTOR,
                 "ul.model-listings.show li.model a"
@@ -167,17 +339,30 @@ class ComparisonInteractor:
             print(f"      ✖ could not pick Model '{model_text}': {e}")
             return False
 
-    def _select_version(self, version_text):
+    def _select_version(self, version_text, canonical_version: str | None = None):
         print(f"    Picking Version: {version_text}")
         self._close_interfering_popup(timeout=2)
+        if canonical_version and self._click_exact_link(
+                f"//li[contains(@class,'version')]//a[normalize-space()={_xpath_literal(canonical_version)}]",
+                canonical_version):
+            return True
         try:
-            xpath = f"//li[contains(@class,'version')]//a[contains(text(),'{version_text}')]"
-            elem = self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, xpath)))
+            links = self.wait.until(EC.presence_of_all_elements_located(
+                (By.XPATH, "//li[contains(@class,'version')]//a")))
+            wanted = version_text.strip().lower()
+            matches = ([link for link in links if link.text.strip().lower() == wanted]
+                       or [link for link in links if wanted in link.text.strip().lower()])
+            if not matches:
+                print(f"      ✖ Version '{version_text}' not found among {[l.text.strip() for l in links]}")
+                return False
+            elem = matches[0]
             self.driver.execute_script(
                 "arguments[0].scrollIntoView(true);", elem)
             time.sleep(0.5)
-            elem.click()
+            try:
+                elem.click()
+            except Exception:
+                self.driver.execute_script("arguments[0].click();", elem)
             time.sleep(1)
             print(f"      → clicked {version_text}")
             return True
@@ -189,21 +374,23 @@ class ComparisonInteractor:
         """
         Closes the Download‑App or Google‑Sign‑In modal if present.
         """
+        if self.navigator.popup_suppressor.skip_wait("interfering_popup", timeout):
+            return
         try:
-            modal = WebDriverWait(self.driver, timeout).until(
+            modal = self.navigator.wait_for("interfering_popup",
                 EC.visibility_of_element_located((
                     By.XPATH,
                     "//div[@id='download_apps' or @id='googleSignInModal']"
-                ))
+                )), timeout, optional=True
             )
             close_btn = modal.find_element(
                 By.CSS_SELECTOR, ".close, .btn-close, .dismiss-btn")
             close_btn.click()
-            WebDriverWait(self.driver, timeout).until(
+            self.navigator.wait_for("interfering_popup_hidden",
                 EC.invisibility_of_element_located((
                     By.XPATH,
                     "//div[@id='download_apps' or @id='googleSignInModal']"
-                ))
+                )), timeout
             )
             print("  ✔ Overlay closed")
         except Exception:
@@ -216,10 +403,13 @@ class ComparisonInteractor:
         """
         Wait briefly for any full‑page <a href="#"> overlay, then remove it via JS.
         """
+        if self.navigator.popup_suppressor.skip_wait("overlay_link", timeout):
+            return
         try:
-            overlay = WebDriverWait(self.driver, timeout).until(
+            overlay = self.navigator.wait_for("overlay_link",
                 EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "a[href='#'].overlay, a[href='#'].full-field-overlay"))
+                    (By.CSS_SELECTOR, "a[href='#'].overlay, a[href='#'].full-field-overlay")),
+                timeout, optional=True
             )
             self.driver.execute_script("arguments[0].remove();", overlay)
             print("  ✔ Removed stray overlay <a href='#'>")
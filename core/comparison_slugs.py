@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+
+from .comparison_cache import normalize_car_details
+
+
+class ComparisonSlugMap:
+    """Maps Make/Model/Version triples to the URL slugs PakWheels uses on its comparison pages."""
+
+    SEPARATOR = "-vs-"
+
+    def __init__(self, slug_path: Optional[str] = None):
+        """
+        Initializes the ComparisonSlugMap.
+
+        Args:
+            slug_path: Optional JSON file used to persist learned slugs between runs.
+        """
+        self.slug_path = slug_path
+        self._slugs: dict[str, str] = {}
+        self._lock = threading.Lock()
+        if slug_path and os.path.exists(slug_path):
+            try:
+                with open(slug_path, "r", encoding="utf-8") as f:
+                    self._slugs = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Warning: Could not read comparison slugs '{slug_path}': {e}")
+
+    @staticmethod
+    def _key(details: dict[str, str]) -> str:
+        return "|".join(normalize_car_details(details))
+
+    def get(self, details: dict[str, str]) -> str | None:
+        """Returns the known slug for a car, or None if it has not been learned yet."""
+        return self._slugs.get(self._key(details)) or None
+
+    @classmethod
+    def slugs_in_url(cls, url: str) -> list[str]:
+        """Returns the car slugs in a comparison result URL, in slot order (empty if it is not one)."""
+        path = urlparse(url).path.rstrip("/")
+        if "/compare/" not in path:
+            return []
+        return [slug for slug in path.split("/compare/", 1)[1].split(cls.SEPARATOR) if slug]
+
+    @staticmethod
+    def tree_slug(car: dict) -> str | None:
+        """Builds a car's comparison slug from the /new-cars/ path slugs of a FilterStore lookup."""
+        parts = [car.get("make_slug"), car.get("model_slug")]
+        if not all(parts):
+            return None
+        if car.get("version_slug"):
+            parts.append(car["version_slug"])
+        return "-".join(parts)
+
+    def learn_from_tree(self, cars: list[tuple[dict[str, str], dict]]) -> int:
+        """
+        Records slugs built from the new-car tree for cars that have none yet.
+
+        Slugs learned from a real result URL, and slugs that already failed, are left alone.
+
+        Args:
+            cars: (requested details, FilterStore.lookup_comparison_car result) pairs.
+
+        Returns:
+            How many slugs were added.
+        """
+        added = 0
+        with self._lock:
+            for details, car in cars:
+                slug = self.tree_slug(car)
+                if slug and self._key(details) not in self._slugs:
+                    self._slugs[self._key(details)] = slug
+                    added += 1
+            if added:
+                self._save()
+        return added
+
+    def build_url(self, comparison_url: str, car_details: list[dict[str, str]]) -> str | None:
+        """Returns the direct comparison URL for the cars, or None if any slug is unknown."""
+        slugs = [self.get(details) for details in car_details]
+        if not all(slugs):
+            return None
+        if not comparison_url.endswith("/"):
+            comparison_url += "/"
+        return comparison_url + self.SEPARATOR.join(slugs)
+
+    def learn_from_url(self, url: str, car_details: list[dict[str, str]]) -> bool:
+        """
+        Records the slugs from a comparison result URL produced by the slot picker.
+
+        Args:
+            url: The URL the browser landed on after clicking Compare.
+            car_details: The cars selected in the picker, in slot order.
+
+        Returns:
+            True if one slug per car was found and stored, False otherwise.
+        """
+        slugs = self.slugs_in_url(url)
+        if len(slugs) != len(car_details):
+            return False
+
+        with self._lock:
+            for details, slug in zip(car_details, slugs):
+                self._slugs[self._key(details)] = slug
+            self._save()
+        return True
+
+    def forget(self, car_details: list[dict[str, str]]):
+        """
+        Drops the slugs for the given cars, e.g. after a direct URL stopped working.
+
+        The cars stay marked as unknown so the tree slug is not guessed again; the next
+        picker run stores the real one.
+        """
+        with self._lock:
+            for details in car_details:
+                self._slugs[self._key(details)] = ""
+            self._save()
+
+    def _save(self):
+        if not self.slug_path:
+            return
+        try:
+            with open(self.slug_path, "w", encoding="utf-8") as f:
+                json.dump(self._slugs, f, indent=2)
+        except OSError as e:
+            print(f"Warning: Could not write comparison slugs '{self.slug_path}': {e}")
@@ -0,0 +1,98 @@
+import heapq
+import time
+from dataclasses import dataclass, field
+
+from .filter_store import FilterStore
+from .search_query import SearchQuery
+
+
+@dataclass
+class Shard:
+    """One worker's share of a crawl: the queries it runs and the listings they should return."""
+    queries: list[SearchQuery] = field(default_factory=list)
+    expected_listings: int = 0
+
+
+class CrawlPlanner:
+    """
+    Splits a crawl across workers using the per-option listing counts stored in filter_enum.
+
+    Options of one facet (e.g. City or Make) are dealt out largest first, each to the
+    currently lightest shard, so shards end up with similar listing totals instead of one
+    worker getting Lahore and Karachi while another gets a handful of small towns.
+    """
+
+    def __init__(self, db_path: str = "filters.db", max_age: float | None = 7 * 24 * 3600):
+        """
+        Initializes the CrawlPlanner.
+
+        Args:
+            db_path: Filter DB written by PakWheelsFilterScraper.update_all_filters_in_db.
+            max_age: Counts older than this many seconds trigger a warning (None to skip the check).
+        """
+        self.store = FilterStore(db_path)
+        self.max_age = max_age
+
+    def facet_counts(self, filter_name: str) -> dict[str, int]:
+        """
+        Returns {option: listing count} for a facet.
+
+        Options stored without a count are given the average of the known counts, so they
+        still spread across shards rather than all landing on one.
+        """
+        stored = self.store.get_enum_counts(filter_name)
+        if not stored:
+            raise ValueError(f"No stored options for '{filter_name}'. Run FilterScraper.py first.")
+        known = [count for count, _ in stored.values() if count is not None]
+        stamps = [counted_at for _, counted_at in stored.values() if counted_at is not None]
+        if not known:
+            print(f"Warning: no listing counts stored for '{filter_name}'; shards are balanced by option count only.")
+        elif self.max_age is not None and time.time() - min(stamps) > self.max_age:
+            print(f"Warning: listing counts for '{filter_name}' are "
+                  f"{(time.time() - min(stamps)) / 3600:.0f}h old; re-run FilterScraper.py to refresh them.")
+        fallback = round(sum(known) / len(known)) if known else 1
+        return {option: fallback if count is None else count for option, (count, _) in stored.items()}
+
+    def plan(self, filter_name: str, workers: int, base: "SearchQuery | dict | None" = None) -> list[Shard]:
+        """
+        Deals a facet's options out to workers with balanced listing totals.
+
+        Args:
+            filter_name: Facet to shard on, e.g. "City" or "Make".
+            workers: Number of shards.
+            base: Filters every shard's queries share (optional).
+
+        Returns:
+            One Shard per worker, heaviest first.
+        """
+        base = SearchQuery.from_filters(base or {})
+        counts = self.facet_counts(filter_name)
+        target = sum(counts.values()) / max(1, workers)
+        for option, count in counts.items():
+            if count > target * 1.2:
+                print(f"Warning: '{option}' alone ({count}) exceeds the per-shard target ({target:.0f}); "
+                      f"split it further with FilterInteractor.split_query.")
+        return self.deal([(base.with_option(filter_name, option), count) for option, count in counts.items()],
+                         workers, f"'{filter_name}'")
+
+    @staticmethod
+    def deal(units: list[tuple[SearchQuery, int]], workers: int, label: str = "query") -> list[Shard]:
+        """
+        Deals (query, expected listings) pairs out to workers, largest first to the lightest shard.
+
+        Returns:
+            One Shard per worker, heaviest first.
+        """
+        shards = [Shard() for _ in range(max(1, workers))]
+        lightest = [(0, index) for index in range(len(shards))]
+        for query, count in sorted(units, key=lambda unit: unit[1], reverse=True):
+            load, index = heapq.heappop(lightest)
+            shards[index].queries.append(query)
+            shards[index].expected_listings += count
+            heapq.heappush(lightest, (load + count, index))
+        shards.sort(key=lambda shard: shard.expected_listings, reverse=True)
+        if shards[0].expected_listings and len(units) >= len(shards):
+            spread = shards[0].expected_listings / max(1, shards[-1].expected_listings)
+            print(f"Planned {len(shards)} {label} shards: "
+                  f"{shards[-1].expected_listings}-{shards[0].expected_listings} listings (max/min {spread:.2f}).")
+        return shards
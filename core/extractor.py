@@ -2,10 +2,13 @@ from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 from .models import *
+from .selector_registry import REGISTRY
 import re
 from selenium.webdriver.remote.webdriver import WebDriver
 import json
-from typing import Any, Tuple
+from typing import Any, List, Tuple
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
 
 class ListingExtractor:
     """Extracts structured data from listing elements."""
@@ -17,6 +20,11 @@ class ListingExtractor:
         except NoSuchElementException:
             return None
 
+    def _registry_text(self, element, name: str, page_type: str) -> str | None:
+        """Returns the text of the first match for a registered selector, or None."""
+        found = REGISTRY.find(element, name, page_type)
+        return found.text.strip() if found else None
+
     def _parse_price(self, price_str: str | None) -> int | None:
         """Parses price string like 'PKR 1,096,470,000' or 'PKR 16.8 lacs' into an integer."""
         if not price_str:
@@ -67,6 +75,24 @@ class ListingExtractor:
             return int(num_part.group(0))
         return 0
 
+    AGE_UNIT_SECONDS = {
+        'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400,
+        'week': 604800, 'month': 2592000, 'year': 31536000,
+    }
+
+    def _parse_updated_age(self, updated_str: str | None) -> int | None:
+        """Parses relative text like 'Updated 3 hours ago' into an age in seconds."""
+        if not updated_str:
+            return None
+        text = updated_str.lower()
+        if 'just now' in text or 'moments ago' in text:
+            return 0
+        match = re.search(r'(\d+|an?)\s+(second|minute|hour|day|week|month|year)s?', text)
+        if not match:
+            return None
+        count = 1 if match.group(1) in ('a', 'an') else int(match.group(1))
+        return count * self.AGE_UNIT_SECONDS[match.group(2)]
+
     def extract_listing_data(self, listing_element: WebElement) -> ListingData:
         """
         Extracts data from a single listing WebElement.
@@ -78,49 +104,93 @@ class ListingExtractor:
         Returns:
             A ListingData object populated with extracted information.
         """
+        car_link_element = REGISTRY.find(listing_element, 'listing_link', 'search')
+        specs_elements = REGISTRY.find_all(listing_element, 'listing_specs', 'search')
+
+        return self._build_listing_data(
+            listing_id=listing_element.get_attribute('data-listing-id'),
+            url=car_link_element.get_attribute('href') if car_link_element else None,
+            price_text=self._registry_text(listing_element, 'listing_price', 'search'),
+            city=self._registry_text(listing_element, 'listing_city', 'search'),
+            spec_texts=[spec.text for spec in specs_elements],
+            pic_count_text=self._registry_text(listing_element, 'listing_pictures', 'search'),
+            updated_text=self._registry_text(listing_element, 'listing_updated', 'search'),
+        )
+
+    def extract_listings_from_html(self, html: str, page_url: str = '') -> List[ListingData]:
+        """
+        Extracts listing cards from a raw search results response body, without a browser.
+
+        Args:
+            html: The HTML of a search results page or AJAX fragment.
+            page_url: URL the HTML was served from, used to make listing links absolute.
+
+        Returns:
+            A list of ListingData objects, in page order.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        listings = []
+        for card in self._soup_select(soup, 'listing'):
+            link = next(iter(self._soup_select(card, 'listing_link')), None)
+            listings.append(self._build_listing_data(
+                listing_id=card.get('data-listing-id'),
+                url=urljoin(page_url, link['href']) if link and link.get('href') else None,
+                price_text=self._soup_text(card, 'listing_price'),
+                city=self._soup_text(card, 'listing_city'),
+                spec_texts=[spec.get_text(' ', strip=True) for spec in self._soup_select(card, 'listing_specs')],
+                pic_count_text=self._soup_text(card, 'listing_pictures'),
+                updated_text=self._soup_text(card, 'listing_updated'),
+            ))
+        return listings
+
+    def _soup_select(self, root, name: str) -> list:
+        for css in REGISTRY.css_chain(name):
+            found = root.select(css)
+            if found:
+                return found
+        return []
+
+    def _soup_text(self, root, name: str) -> str | None:
+        found = self._soup_select(root, name)
+        if not found:
+            return None
+        return ' '.join(found[0].get_text(' ', strip=True).split())
+
+    def _build_listing_data(self, listing_id, url, price_text, city, spec_texts,
+                            pic_count_text, updated_text) -> ListingData:
+        """Builds a ListingData from the raw card texts, shared by the DOM and HTML paths."""
         data = ListingData()
 
         # --- Basic Info ---
-        data.listing_id = listing_element.get_attribute('data-listing-id')
-
-        try:
-            car_link_element = listing_element.find_element(
-                By.CSS_SELECTOR, 'a.car-name.ad-detail-path')
-            data.url = car_link_element.get_attribute('href')
-        except NoSuchElementException:
-            data.url = None
+        data.listing_id = listing_id
+        data.url = url
 
         # --- Price ---
-        price_text = self._safe_find_text(
-            listing_element, By.CSS_SELECTOR, '.price-details')
         data.price = self._parse_price(price_text)
 
         # --- Location ---
-        data.city = self._safe_find_text(
-            listing_element, By.CSS_SELECTOR, '.search-vehicle-info li:first-child')
+        data.city = city
 
         # --- Specs (using the second ul) ---
-        specs_elements = listing_element.find_elements(
-            By.CSS_SELECTOR, '.search-vehicle-info-2 li')
-
-        if len(specs_elements) >= 1:
-            data.year = specs_elements[0].text.strip()
-        if len(specs_elements) >= 2:
-            data.mileage = self._parse_mileage(specs_elements[1].text)
-        if len(specs_elements) >= 3:
-            data.engine_type = specs_elements[2].text.strip()
-        if len(specs_elements) >= 4:
-            data.engine_capacity = self._parse_engine_capacity(
-                specs_elements[3].text)
-        if len(specs_elements) >= 5:
-            data.transmission = specs_elements[4].text.strip()
+        if len(spec_texts) >= 1:
+            data.year = spec_texts[0].strip()
+        if len(spec_texts) >= 2:
+            data.mileage = self._parse_mileage(spec_texts[1])
+        if len(spec_texts) >= 3:
+            data.engine_type = spec_texts[2].strip()
+        if len(spec_texts) >= 4:
+            data.engine_capacity = self._parse_engine_capacity(spec_texts[3])
+        if len(spec_texts) >= 5:
+            data.transmission = spec_texts[4].strip()
 
         # --- Pictures ---
-        pic_count_text = self._safe_find_text(
-            listing_element, By.CSS_SELECTOR, '.total-pictures-bar')
         data.picture_count = self._parse_picture_count(pic_count_text)
         data.picture_availability = data.picture_count > 0
 
+        # --- Updated ---
+        data.last_updated = updated_text
+        data.updated_age = self._parse_updated_age(updated_text)
+
         return data
 
     def _parse_location(self, location_str: str | None) -> tuple[str | None, str | None, str | None]:
@@ -172,75 +242,136 @@ class ListingExtractor:
         Returns:
             A ListingPageData object populated with extracted information.
         """
-        data = ListingPageData()
-        json_ld_data = {}
-
+        json_ld_content = None
         try:
             json_ld_script = driver.find_element(
                 By.XPATH, "//script[@type='application/ld+json']")
             json_ld_content = json_ld_script.get_attribute('innerHTML')
-            json_ld_data = json.loads(json_ld_content)
-            print("Successfully parsed JSON-LD data.")
         except NoSuchElementException:
             print("Warning: JSON-LD script not found.")
-        except json.JSONDecodeError as e:
-            print(f"Warning: Failed to decode JSON-LD: {e}")
-        except Exception as e:
-            print(
-                f"Warning: An unexpected error occurred parsing JSON-LD: {e}")
+
+        specs_table = REGISTRY.find(driver, 'detail_specs_table', 'detail')
+        spec_cells = None
+        if specs_table is not None:
+            spec_cells = [cell.text for cell in specs_table.find_elements(By.TAG_NAME, "td")]
+
+        try:
+            contact_text = driver.find_element(
+                By.CSS_SELECTOR, "button.phone_number_btn span").text
+        except NoSuchElementException:
+            contact_text = None
+
+        return self._build_listing_page_data(
+            json_ld_content=json_ld_content,
+            price_text=self._registry_text(driver, 'detail_price', 'detail'),
+            location_text=self._safe_find_text(
+                driver, By.CSS_SELECTOR, 'p.detail-sub-heading a'),
+            spec_cells=spec_cells,
+            featured=self._extract_from_ul_featured(driver),
+            contact_text=contact_text,
+        )
+
+    def extract_listing_page_data_from_html(self, html: str) -> ListingPageData:
+        """
+        Extracts detailed data from the raw HTML of a listing detail page, without a browser.
+
+        Args:
+            html: The page's HTML, e.g. document.documentElement.outerHTML or a response body.
+
+        Returns:
+            A ListingPageData object populated with extracted information.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+
+        json_ld_script = soup.select_one("script[type='application/ld+json']")
+        if json_ld_script is None:
+            print("Warning: JSON-LD script not found.")
+
+        specs_tables = self._soup_select(soup, 'detail_specs_table')
+        spec_cells = None
+        if specs_tables:
+            spec_cells = [cell.get_text(' ', strip=True) for cell in specs_tables[0].select('td')]
+
+        featured = {}
+        ul_element = soup.select_one("ul.ul-featured")
+        if ul_element is None:
+            print("Warning: Could not find 'ul-featured' list for detailed specs.")
+        else:
+            list_items = ul_element.find_all('li')
+            for i in range(0, len(list_items) - 1, 2):
+                if "ad-data" in (list_items[i].get('class') or []):
+                    key = list_items[i].get_text(strip=True).replace(':', '')
+                    featured[key] = list_items[i + 1].get_text(' ', strip=True)
+
+        location = soup.select_one('p.detail-sub-heading a')
+        contact = soup.select_one("button.phone_number_btn span")
+
+        return self._build_listing_page_data(
+            json_ld_content=json_ld_script.string if json_ld_script else None,
+            price_text=self._soup_text(soup, 'detail_price'),
+            location_text=location.get_text(' ', strip=True) if location else None,
+            spec_cells=spec_cells,
+            featured=featured,
+            contact_text=contact.get_text('\n', strip=True) if contact else None,
+        )
+
+    def _build_listing_page_data(self, json_ld_content, price_text, location_text, spec_cells,
+                                 featured, contact_text) -> ListingPageData:
+        """Builds a ListingPageData from the raw detail page texts, shared by the DOM and HTML paths."""
+        data = ListingPageData()
+        json_ld_data = {}
+
+        if json_ld_content:
+            try:
+                json_ld_data = json.loads(json_ld_content)
+                print("Successfully parsed JSON-LD data.")
+            except json.JSONDecodeError as e:
+                print(f"Warning: Failed to decode JSON-LD: {e}")
+            except Exception as e:
+                print(
+                    f"Warning: An unexpected error occurred parsing JSON-LD: {e}")
 
         try:
             if json_ld_data.get('offers') and 'price' in json_ld_data['offers']:
                 data.price = int(json_ld_data['offers']['price'])
             else:
-                price_text = self._safe_find_text(
-                    driver, By.CSS_SELECTOR, '.price-box strong')
-                if not price_text:
-                    price_text = self._safe_find_text(
-                        driver, By.CSS_SELECTOR, '.light-gallery-user-info strong.generic-white')
                 data.price = self._parse_price(price_text)
         except Exception as e:
             print(f"Warning: Could not extract price: {e}")
 
         try:
-            location_full = self._safe_find_text(
-                driver, By.CSS_SELECTOR, 'p.detail-sub-heading a')
-            if location_full:
-                location_full = location_full.replace('map marker', '').strip()
+            if location_text:
+                location_full = location_text.replace('map marker', '').strip()
                 data.area, data.city, data.province = self._parse_location(
                     location_full)
         except Exception as e:
             print(f"Warning: Could not extract location: {e}")
 
-        try:
-            specs_table = driver.find_element(
-                By.CSS_SELECTOR, "table.table-engine-detail")
-            cells = specs_table.find_elements(By.TAG_NAME, "td")
-            if len(cells) >= 1:
-                data.year = int(cells[0].text.strip(
-                )) if cells[0].text.strip().isdigit() else None
-            if len(cells) >= 2:
-                data.mileage = self._parse_mileage(cells[1].text)
-            if len(cells) >= 3:
-                data.engine_type = cells[2].text.strip()
-            if len(cells) >= 4:
-                data.transmission = cells[3].text.strip()
-        except NoSuchElementException:
+        if spec_cells is None:
             print("Warning: Could not find main specs table.")
-        except Exception as e:
-            print(f"Warning: Error parsing main specs table: {e}")
+        else:
+            try:
+                if len(spec_cells) >= 1:
+                    data.year = int(spec_cells[0].strip(
+                    )) if spec_cells[0].strip().isdigit() else None
+                if len(spec_cells) >= 2:
+                    data.mileage = self._parse_mileage(spec_cells[1])
+                if len(spec_cells) >= 3:
+                    data.engine_type = spec_cells[2].strip()
+                if len(spec_cells) >= 4:
+                    data.transmission = spec_cells[3].strip()
+            except Exception as e:
+                print(f"Warning: Error parsing main specs table: {e}")
 
         # --- Specs from ul-featured ---
-        ul_data = self._extract_from_ul_featured(driver)
-
-        data.registered_in = ul_data.get('Registered In')
-        data.colour = ul_data.get('Color')
-        data.assembly = ul_data.get('Assembly')
-        data.engine_capacity = self._parse_engine_capacity(ul_data.get(
+        data.registered_in = featured.get('Registered In')
+        data.colour = featured.get('Color')
+        data.assembly = featured.get('Assembly')
+        data.engine_capacity = self._parse_engine_capacity(featured.get(
             'Engine Capacity'))  
-        data.body_type = ul_data.get('Body Type')
-        data.last_updated = ul_data.get('Last Updated')
-        data.ad_reference = ul_data.get('Ad Ref #')
+        data.body_type = featured.get('Body Type')
+        data.last_updated = featured.get('Last Updated')
+        data.ad_reference = featured.get('Ad Ref #')
 
         if json_ld_data:
             if 'modelDate' in json_ld_data:
@@ -258,20 +389,19 @@ class ListingExtractor:
                 data.engine_capacity = self._parse_engine_capacity(
                     json_ld_data['vehicleEngine']['engineDisplacement'])
 
-        try:
-            contact_button = driver.find_element(
-                By.CSS_SELECTOR, "button.phone_number_btn span")
-            button_text = contact_button.text.strip()
-            match = re.search(r'(\d+\.{3,})', button_text)
-            if match:
-                data.seller_contact = match.group(1)
-            else:
-                data.seller_contact = button_text.split(
-                    '\n')[0].strip() if '\n' in button_text else None
-        except NoSuchElementException:
+        if contact_text is None:
             print("Warning: Could not find seller contact button.")
-        except Exception as e:
-            print(f"Warning: Error extracting seller contact: {e}")
+        else:
+            try:
+                button_text = contact_text.strip()
+                match = re.search(r'(\d+\.{3,})', button_text)
+                if match:
+                    data.seller_contact = match.group(1)
+                else:
+                    data.seller_contact = button_text.split(
+                        '\n')[0].strip() if '\n' in button_text else None
+            except Exception as e:
+                print(f"Warning: Error extracting seller contact: {e}")
 
         return data
 
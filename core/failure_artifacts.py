@@ -0,0 +1,186 @@
+import gzip
+import io
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: screenshots stay PNG without Pillow.
+    Image = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: page sources fall back to gzip without zstandard.
+    zstandard = None
+
+
+class FailureArtifactCollector:
+    """
+    Saves screenshots, page sources, console logs and recent WebDriver commands for failed tests.
+
+    Only the raw grab happens on the test thread, because the driver is not thread safe and
+    the page changes as soon as the next test starts. Compression, writing and pruning run
+    on a background thread fed by a bounded queue; captures beyond the bound are dropped.
+    Last-use times live in an index file rather than in directory atimes, which the size
+    scan itself would keep refreshing.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, artifact_dir: str = "artifacts", max_bytes: int = 200 * 1024 * 1024,
+                 max_pending: int = 8):
+        """
+        Initializes the FailureArtifactCollector.
+
+        Args:
+            artifact_dir: Directory holding one sub-directory per captured failure.
+            max_bytes: Size budget for artifact_dir; least recently used captures are evicted.
+            max_pending: Captures allowed to wait for the background writer.
+        """
+        self.artifact_dir = artifact_dir
+        self.max_bytes = max_bytes
+        self._index_lock = threading.Lock()
+        self._jobs = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def capture(self, navigator, test_id: str) -> bool:
+        """
+        Grabs the raw failure state from the navigator's driver and queues it for writing.
+
+        Returns:
+            True if the capture was queued, False if the driver was gone or the queue was full.
+        """
+        driver = navigator.driver
+        if not driver:
+            return False
+
+        job = {"test_id": test_id, "captured_at": time.time(),
+               "commands": list(navigator.command_log)}
+        for key, grab in (("url", lambda: driver.current_url),
+                          ("screenshot", driver.get_screenshot_as_png),
+                          ("page_source", lambda: driver.page_source),
+                          ("console", lambda: driver.get_log("browser"))):
+            try:
+                job[key] = grab()
+            except Exception as e:
+                print(f"Warning: Could not capture {key} for {test_id}: {e}")
+
+        try:
+            self._jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            print(f"Warning: Failure artifact queue full, dropping capture for {test_id}.")
+            return False
+
+    def touch(self, capture_name: str):
+        """Marks a capture directory as used now, e.g. after a tool reopened it, so it is evicted last."""
+        with self._index_lock:
+            index = self._load_index()
+            index[capture_name] = time.time()
+            self._save_index(index)
+
+    def _index_path(self) -> str:
+        return os.path.join(self.artifact_dir, self.INDEX_FILE)
+
+    def _load_index(self) -> dict[str, float]:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index: dict[str, float]):
+        temp_path = self._index_path() + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_path, self._index_path())
+
+    def flush(self, timeout: float = 30):
+        """Waits until every queued capture has been written."""
+        deadline = time.time() + timeout
+        while self._jobs.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.1)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                self._write(job)
+                self._enforce_budget()
+            except Exception as e:
+                print(f"Warning: Could not write failure artifacts for {job['test_id']}: {e}")
+            finally:
+                self._jobs.task_done()
+
+    def _write(self, job: dict):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(job["captured_at"]))
+        safe_id = re.sub(r"[^\w.-]+", "_", job["test_id"])
+        target = os.path.join(self.artifact_dir, f"{stamp}_{safe_id}")
+        os.makedirs(target, exist_ok=True)
+
+        screenshot = job.get("screenshot")
+        if screenshot:
+            if Image is not None:
+                buffer = io.BytesIO()
+                Image.open(io.BytesIO(screenshot)).save(buffer, "WEBP", quality=80)
+                self._write_bytes(os.path.join(target, "screenshot.webp"), buffer.getvalue())
+            else:
+                self._write_bytes(os.path.join(target, "screenshot.png"), screenshot)
+
+        page_source = job.get("page_source")
+        if page_source:
+            raw = page_source.encode("utf-8")
+            if zstandard is not None:
+                self._write_bytes(os.path.join(target, "page_source.html.zst"),
+                                  zstandard.ZstdCompressor(level=10).compress(raw))
+            else:
+                self._write_bytes(os.path.join(target, "page_source.html.gz"), gzip.compress(raw))
+
+        report = {
+            "test_id": job["test_id"],
+            "url": job.get("url"),
+            "console": job.get("console", []),
+            "commands": [{"time": t, "command": c, "params": p} for t, c, p in job["commands"]],
+        }
+        with open(os.path.join(target, "report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        self.touch(os.path.basename(target))
+
+    @staticmethod
+    def _write_bytes(path: str, data: bytes):
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def _enforce_budget(self):
+        """Evicts the least recently used capture directories until the budget is met."""
+        with self._index_lock:
+            index = self._load_index()
+            entries = []
+            total = 0
+            for name in os.listdir(self.artifact_dir):
+                path = os.path.join(self.artifact_dir, name)
+                if not os.path.isdir(path):
+                    continue
+                size = sum(os.path.getsize(os.path.join(root, f))
+                           for root, _, files in os.walk(path) for f in files)
+                # Captures from before the index existed fall back to their creation time.
+                last_used = index.get(name, os.stat(path).st_mtime)
+                entries.append((last_used, name, size))
+                total += size
+
+            kept = {name: last_used for last_used, name, _ in entries}
+            for _, name, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(os.path.join(self.artifact_dir, name), ignore_errors=True)
+                kept.pop(name)
+                total -= size
+                print(f"Evicted failure artifacts {name} to stay within {self.max_bytes} bytes.")
+            if kept != index:
+                self._save_index(kept)
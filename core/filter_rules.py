@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .models import ListingData, ListingPageData
+from .search_query import SearchQuery
+
+SUMMARY = "summary"
+DETAIL = "detail"
+
+# Filter name -> (kind, ListingData field, ListingPageData field). A field of None means
+# that page does not show the value. Summary cards are preferred when both have it.
+FILTER_FIELDS = {
+    "City": ("contains", "city", "city"),
+    "Price Range": ("range", "price", "price"),
+    "Year": ("range", "year", "year"),
+    "Model Year": ("range", "year", "year"),
+    "Mileage": ("range", "mileage", "mileage"),
+    "Engine Capacity": ("range", "engine_capacity", "engine_capacity"),
+    "Transmission": ("contains", "transmission", "transmission"),
+    "Engine Type": ("contains", "engine_type", "engine_type"),
+    "Picture Availability": ("pictures", "picture_availability", None),
+    "Registered In": ("equals", None, "registered_in"),
+    "Registration City": ("equals", None, "registered_in"),
+    "Assembly": ("contains", None, "assembly"),
+    "Color": ("contains", None, "colour"),
+    "Body Type": ("contains", None, "body_type"),
+}
+
+
+def _as_int(value: Any) -> int | None:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().replace(",", "").isdigit():
+        return int(value.strip().replace(",", ""))
+    return None
+
+
+@dataclass
+class FieldRule:
+    """One compiled filter check against a single field of a summary or detail batch."""
+    filter_name: str
+    source: str
+    field: str
+    expected: str
+    test: Callable[[Any], bool]
+    # A missing value is a mismatch for ranges (cannot be verified) but not for options,
+    # which the site leaves blank on some cards.
+    required: bool = False
+
+    def can_evaluate(self, record) -> bool:
+        """Whether this rule says anything about the record; blank optional fields are skipped."""
+        return self.required or getattr(record, self.field) is not None
+
+    def mismatches(self, records: list, labels: list[str]) -> list[str]:
+        column = [getattr(record, self.field) for record in records]
+        found = []
+        for label, value in zip(labels, column):
+            if value is None:
+                if self.required:
+                    found.append(f"{label}: {self.filter_name} is missing. Cannot verify {self.expected}.")
+            elif not self.test(value):
+                found.append(f"{label}: {self.filter_name} mismatch. Expected {self.expected}, got '{value}'.")
+        return found
+
+
+class FilterVerifier:
+    """
+    Compiles a filter dict into field checks over batches of ListingData/ListingPageData.
+
+    Takes the same shape create_filter_query_string accepts:
+    {"City": {"type": "option", "value": "Lahore"},
+     "Price Range": {"type": "range", "min": 2500000, "max": 10000000}}.
+    Each filter is checked on the summary cards when they show the field, and only
+    otherwise on detail pages, so callers can skip detail pages when no rule needs them.
+    """
+
+    def __init__(self, filters: "dict[str, dict] | SearchQuery"):
+        if isinstance(filters, SearchQuery):
+            filters = filters.to_filters()
+        self.summary_rules: list[FieldRule] = []
+        self.detail_rules: list[FieldRule] = []
+        self.unverifiable: list[str] = []
+        for name, spec in filters.items():
+            rule = self._compile(name, spec)
+            if rule is None:
+                self.unverifiable.append(name)
+            elif rule.source == SUMMARY:
+                self.summary_rules.append(rule)
+            else:
+                self.detail_rules.append(rule)
+
+    @staticmethod
+    def _compile(name: str, spec: dict) -> FieldRule | None:
+        if name not in FILTER_FIELDS or not isinstance(spec, dict):
+            return None
+        kind, summary_field, detail_field = FILTER_FIELDS[name]
+        source, field = (SUMMARY, summary_field) if summary_field else (DETAIL, detail_field)
+
+        if kind == "range":
+            low, high = _as_int(spec.get("min")), _as_int(spec.get("max"))
+            if low is None and high is None:
+                return None
+            if low is not None and high is not None and low > high:
+                low, high = high, low
+
+            def in_range(value, low=low, high=high):
+                number = _as_int(value)
+                return (number is not None and (low is None or number >= low)
+                        and (high is None or number <= high))
+            expected = f"range [{low if low is not None else ''}-{high if high is not None else ''}]"
+            return FieldRule(name, source, field, expected, in_range, required=True)
+
+        option = spec.get("value")
+        if not option:
+            return None
+        if kind == "pictures":
+            wanted = option.lower() == "with pictures"
+            return FieldRule(name, source, field, f"'{option}'", lambda value: value == wanted)
+        if kind == "equals":
+            return FieldRule(name, source, field, f"'{option}'",
+                             lambda value: value.strip().lower() == option.lower())
+        return FieldRule(name, source, field, f"'{option}'",
+                         lambda value: option.lower() in value.lower())
+
+    @property
+    def needs_detail_pages(self) -> bool:
+        return bool(self.detail_rules)
+
+    def describe(self) -> str:
+        """Summarizes which filters are checked where."""
+        def names(rules):
+            return ", ".join(rule.filter_name for rule in rules) or "-"
+        return (f"summary cards: {names(self.summary_rules)}; detail pages: {names(self.detail_rules)}; "
+                f"not verifiable: {', '.join(self.unverifiable) or '-'}")
+
+    @staticmethod
+    def labels(listings: list[ListingData]) -> list[str]:
+        """Returns the 'Listing N (ID: ...)' labels used in mismatch messages."""
+        return [f"Listing {i+1} (ID: {listing.listing_id})" for i, listing in enumerate(listings)]
+
+    def check_summaries(self, listings: list[ListingData], labels: list[str] | None = None) -> list[str]:
+        """Runs the summary-card rules over a batch; returns mismatch messages."""
+        labels = labels or self.labels(listings)
+        return [message for rule in self.summary_rules for message in rule.mismatches(listings, labels)]
+
+    def check_details(self, details: list[ListingPageData], labels: list[str]) -> list[str]:
+        """Runs the detail-page rules over a batch of detail pages labelled like the summaries."""
+        return [message for rule in self.detail_rules for message in rule.mismatches(details, labels)]
+
+    def evaluates_details(self, details: ListingPageData) -> bool:
+        """Whether at least one detail rule can judge this page, i.e. it counts as evidence."""
+        return any(rule.can_evaluate(details) for rule in self.detail_rules)
+
+    def check(self, listings: list[ListingData],
+              load_details: Callable[[list[str]], dict[str, ListingPageData | None]] | None = None,
+              prefix: str = "") -> list[str]:
+        """
+        Verifies a page of listings, opening detail pages only if some rule needs them.
+
+        Args:
+            listings: Summary cards of one results page.
+            load_details: Maps detail URLs to ListingPageData (e.g. navigator.load_listing_details).
+            prefix: Prepended to every listing label, e.g. "Page 2, ".
+
+        Returns:
+            Mismatch messages for summary and detail rules.
+        """
+        labels = [f"{prefix}{label}" for label in self.labels(listings)]
+        mismatches = self.check_summaries(listings, labels)
+        if not self.needs_detail_pages:
+            return mismatches
+        if load_details is None:
+            raise ValueError(f"Filters {[r.filter_name for r in self.detail_rules]} need detail pages.")
+
+        to_load = []
+        for listing, label in zip(listings, labels):
+            if listing.url:
+                to_load.append((listing, label))
+            else:
+                print(f"Warning: {label} has no URL. Skipping detail checks.")
+        details_by_url = load_details([listing.url for listing, _ in to_load])
+
+        loaded, loaded_labels = [], []
+        for listing, label in to_load:
+            details = details_by_url.get(listing.url)
+            if details is None:
+                mismatches.append(f"{label}: Detail page could not be loaded ({listing.url}).")
+            else:
+                loaded.append(details)
+                loaded_labels.append(label)
+        return mismatches + self.check_details(loaded, loaded_labels)
@@ -0,0 +1,116 @@
+import re
+import sqlite3
+
+from bs4 import NavigableString
+
+# Trailing listing count on an option label, e.g. 'Lahore 12,345'.
+OPTION_COUNT_RE = re.compile(r'\s*(\d{1,3}(?:,\d{3})*)$')
+
+
+def parse_option_counts(root) -> list[tuple[str, int | None]]:
+    """Returns (option text, listing count) pairs; the count is None when the label has none."""
+    options = []
+    for li in root.select('ul.list-unstyled li'):
+        label = li.select_one('label')
+        if label:
+            a = label.select_one('a')
+            label_source = a if a else label
+            option_texts = []
+            for child in label_source.children:
+                if isinstance(child, NavigableString):
+                    text = child.strip()
+                    if text:
+                        option_texts.append(text)
+                elif hasattr(child, 'name'):
+                    if child.name == 'p':
+                        text = child.get_text(strip=True)
+                        if text:
+                            option_texts.append(text)
+            option_text = ' '.join(option_texts)
+            count_match = OPTION_COUNT_RE.search(option_text)
+            count = None
+            if count_match:
+                count = int(count_match.group(1).replace(',', ''))
+                option_text = option_text[:count_match.start()]
+            if option_text:
+                options.append((option_text, count))
+    return options
+
+
+def parse_option_labels(root) -> list[str]:
+    """Returns the option texts of a filter group or 'More Choices' popup, minus their counts."""
+    return [label for label, _ in parse_option_counts(root)]
+
+
+class FilterStore:
+    """Read access to the filter DB that FilterScraper.py fills, for code under core/."""
+
+    def __init__(self, db_path: str = 'filters.db'):
+        self.db_path = db_path
+
+    def has_comparison_tree(self) -> bool:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'comparison_make'").fetchone()
+            return bool(row) and conn.execute('SELECT 1 FROM comparison_make LIMIT 1').fetchone() is not None
+        finally:
+            conn.close()
+
+    def lookup_comparison_car(self, make: str, model: str, version: str | None = None) -> dict | None:
+        """
+        Resolves a Make/Model/Version request against the crawled new-car tree.
+
+        The version matches exactly first, then as a substring of a single known version,
+        mirroring how the picker matches version links.
+
+        Returns:
+            A dict with the ids, canonical names and slugs, or None if any part is unknown.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            c.execute('''SELECT mk.id, mk.name, mk.slug, md.id, md.name, md.slug
+                         FROM comparison_make mk
+                         JOIN comparison_model md ON md.make_id = mk.id
+                         WHERE mk.name_key = ? AND md.name_key = ?''',
+                      (make.strip().lower(), model.strip().lower()))
+            row = c.fetchone()
+            if not row:
+                return None
+            car = {'make_id': row[0], 'make': row[1], 'make_slug': row[2],
+                   'model_id': row[3], 'model': row[4], 'model_slug': row[5],
+                   'version_id': None, 'version': None, 'version_slug': None}
+            if not version:
+                return car
+
+            version_key = version.strip().lower()
+            c.execute('SELECT id, name, slug FROM comparison_version WHERE model_id = ? AND name_key = ?',
+                      (car['model_id'], version_key))
+            version_row = c.fetchone()
+            if not version_row:
+                c.execute('SELECT id, name, slug FROM comparison_version WHERE model_id = ? AND instr(name_key, ?) > 0',
+                          (car['model_id'], version_key))
+                candidates = c.fetchall()
+                if len(candidates) != 1:
+                    return None
+                version_row = candidates[0]
+            car['version_id'], car['version'], car['version_slug'] = version_row
+            return car
+        finally:
+            conn.close()
+
+    def get_enum_counts(self, filter_name: str) -> dict[str, tuple[int | None, float | None]]:
+        """
+        Returns {option: (listing_count, counted_at)} for an enum filter.
+
+        Both are None for options whose label carried no count when the filters were fetched.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            c.execute(
+                'SELECT value, listing_count, counted_at FROM filter_enum WHERE filter_name = ?', (filter_name,))
+            return {row[0]: (row[1], row[2]) for row in c.fetchall()}
+        finally:
+            conn.close()
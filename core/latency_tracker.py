@@ -0,0 +1,153 @@
+import contextlib
+import json
+import math
+import os
+import tempfile
+import threading
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """Holds an exclusive lock on path + '.lock' across processes for the duration of the block."""
+    with open(f"{path}.lock", "a+b") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s; keep waiting.
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class LatencyTracker:
+    """
+    Records how long each named wait site actually takes and derives per-site timeouts.
+
+    Once a site has enough samples its timeout becomes p99 x headroom, so waits for
+    elements that are not coming fail fast while sites with slow pages get more room.
+    Samples are persisted so the tuning carries over between runs. Timeouts are never
+    samples: a site that just missed gets its default timeout until it succeeds again,
+    so repeated misses cannot ratchet the timeout up.
+    """
+
+    def __init__(self, stats_path: Optional[str] = "latency_stats.json", min_samples: int = 20,
+                 headroom: float = 1.5, floor: float = 1.0, ceiling: float = 90.0,
+                 max_samples: int = 200):
+        """
+        Initializes the LatencyTracker.
+
+        Args:
+            stats_path: JSON file used to persist samples between runs (None keeps them in memory).
+            min_samples: Samples a site needs before its timeout is tuned.
+            headroom: Multiplier applied to the p99 latency.
+            floor: Shortest timeout ever handed out, in seconds.
+            ceiling: Longest timeout ever handed out, in seconds.
+            max_samples: Most recent samples kept per site.
+        """
+        self.stats_path = stats_path
+        self.min_samples = min_samples
+        self.headroom = headroom
+        self.floor = floor
+        self.ceiling = ceiling
+        self.max_samples = max_samples
+        self._samples: dict[str, list[float]] = {}
+        self._unsaved: dict[str, list[float]] = {}
+        self._missed: set[str] = set()
+        self._lock = threading.Lock()
+        if stats_path:
+            self._samples = self._read()
+
+    def record(self, site: str, seconds: float):
+        """Stores one observed time-to-condition for a wait site."""
+        with self._lock:
+            samples = self._samples.setdefault(site, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.max_samples]
+            self._unsaved.setdefault(site, []).append(round(seconds, 3))
+            self._missed.discard(site)
+
+    def record_miss(self, site: str):
+        """Notes that a wait site timed out; its next timeout is the caller's default."""
+        with self._lock:
+            self._missed.add(site)
+
+    def percentile(self, site: str, pct: float = 99) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get(site, []))
+        if not samples:
+            return None
+        index = max(0, math.ceil(pct / 100 * len(samples)) - 1)
+        return samples[index]
+
+    def timeout(self, site: str, default: float) -> float:
+        """Returns the tuned timeout for a site, or the default until enough samples exist or after a miss."""
+        with self._lock:
+            count = len(self._samples.get(site, []))
+            missed = site in self._missed
+        if count < self.min_samples or missed:
+            return default
+        return min(self.ceiling, max(self.floor, self.percentile(site) * self.headroom))
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Returns sample count, p50 and p99 per site."""
+        return {site: {"samples": len(samples), "p50": self.percentile(site, 50),
+                       "p99": self.percentile(site, 99)}
+                for site, samples in list(self._samples.items())}
+
+    def save(self):
+        """
+        Merges this run's samples into the stats file so parallel workers don't clobber each other.
+
+        The read-merge-write holds a lock file shared by every process, and the new file is
+        written next to the old one and swapped in, so a reader never sees a torn file.
+        """
+        if not self.stats_path:
+            return
+        with self._lock:
+            try:
+                with _file_lock(self.stats_path):
+                    merged = self._read()
+                    for site, new in self._unsaved.items():
+                        merged[site] = (merged.get(site, []) + new)[-self.max_samples:]
+                    directory = os.path.dirname(os.path.abspath(self.stats_path))
+                    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                    try:
+                        with os.fdopen(fd, "w", encoding="utf-8") as f:
+                            json.dump(merged, f)
+                        os.replace(temp_path, self.stats_path)
+                    except BaseException:
+                        os.unlink(temp_path)
+                        raise
+            except OSError as e:
+                print(f"Warning: Could not write latency stats '{self.stats_path}': {e}")
+                return
+            self._samples = merged
+            self._unsaved = {}
+
+    def _read(self) -> dict[str, list[float]]:
+        if not os.path.exists(self.stats_path):
+            return {}
+        try:
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read latency stats '{self.stats_path}': {e}")
+            return {}
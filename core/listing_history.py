@@ -0,0 +1,278 @@
+import sqlite3
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from .models import ListingData
+
+try:
+    import numpy as np
+except ImportError:  # Optional: diffs fall back to a pure-Python merge over array('q') columns.
+    np = None
+
+# Stored in place of a missing price or mileage so the columns stay plain integers.
+MISSING = -1
+
+
+@dataclass
+class CrawlDiff:
+    """Changes between two crawls. Price changes are (listing_id, old_price, new_price)."""
+    old_crawl: int
+    new_crawl: int
+    price_drops: list[tuple[int, int, int]] = field(default_factory=list)
+    price_increases: list[tuple[int, int, int]] = field(default_factory=list)
+    new_listings: list[int] = field(default_factory=list)
+    relisted: list[int] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+
+
+class ListingHistoryStore:
+    """
+    Append-only SQLite store of listing snapshots, one row per listing per crawl.
+
+    Rows are never updated. The (crawl_id, listing_id) primary key doubles as the index that
+    diff() reads from: it streams each crawl's columns already sorted by listing_id into
+    flat integer arrays and compares the two crawls in one merge-join, instead of building
+    per-listing dicts.
+    """
+
+    def __init__(self, db_path: str = "listing_history.db"):
+        self.db_path = db_path
+        self.init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def init_db(self):
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS crawl (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL,
+                label TEXT,
+                kind TEXT NOT NULL DEFAULT 'full'
+            )''')
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(crawl)")}
+            if "kind" not in columns:  # Databases created before incremental crawls existed.
+                conn.execute("ALTER TABLE crawl ADD COLUMN kind TEXT NOT NULL DEFAULT 'full'")
+            conn.execute('''CREATE TABLE IF NOT EXISTS listing_snapshot (
+                crawl_id INTEGER NOT NULL REFERENCES crawl(id),
+                listing_id INTEGER NOT NULL,
+                price INTEGER NOT NULL,
+                mileage INTEGER NOT NULL,
+                last_updated TEXT,
+                PRIMARY KEY (crawl_id, listing_id)
+            ) WITHOUT ROWID''')
+            conn.execute('''CREATE INDEX IF NOT EXISTS idx_snapshot_listing
+                ON listing_snapshot(listing_id, crawl_id)''')
+
+    def start_crawl(self, label: str = "", kind: str = "full") -> int:
+        """
+        Registers a new crawl and returns its id.
+
+        Args:
+            label: Free text identifying what was crawled (e.g. the filters).
+            kind: 'full' for crawls that saw every result, 'incremental' for crawls that
+                  stopped at already-stored listings, 'partial' for crawls cut short by a
+                  page limit or a crash; only full crawls are diffed.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute("INSERT INTO crawl (started_at, label, kind) VALUES (?, ?, ?)",
+                                  (time.time(), label, kind))
+            return cursor.lastrowid
+
+    def set_crawl_kind(self, crawl_id: int, kind: str):
+        """Changes a crawl's kind, e.g. from 'partial' to 'full' once it has seen every result."""
+        with self._connect() as conn:
+            conn.execute("UPDATE crawl SET kind = ? WHERE id = ?", (kind, crawl_id))
+
+    def add_listings(self, crawl_id: int, listings: Iterable[ListingData]) -> int:
+        """
+        Appends listings to a crawl. A listing seen twice in one crawl (results shift while
+        paging) keeps its first snapshot; listings without a numeric id are skipped.
+
+        Returns:
+            The number of rows added.
+        """
+        rows = [(crawl_id, int(listing.listing_id),
+                 listing.price if isinstance(listing.price, int) else MISSING,
+                 listing.mileage if isinstance(listing.mileage, int) else MISSING,
+                 listing.last_updated)
+                for listing in listings
+                if listing.listing_id and str(listing.listing_id).isdigit()]
+        rows.sort(key=lambda row: row[1])  # Key order keeps the B-tree inserts sequential.
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany('''INSERT OR IGNORE INTO listing_snapshot
+                (crawl_id, listing_id, price, mileage, last_updated) VALUES (?, ?, ?, ?, ?)''', rows)
+            return conn.total_changes - before
+
+    def record_crawl(self, listings: Iterable[ListingData], label: str = "") -> int:
+        """Stores a complete crawl in one go and returns its id."""
+        crawl_id = self.start_crawl(label)
+        self.add_listings(crawl_id, listings)
+        return crawl_id
+
+    def crawl_ids(self, kind: str | None = "full", label: str | None = None) -> list[int]:
+        """
+        Returns the ids of crawls, oldest first.
+
+        Args:
+            kind: Only crawls of this kind (None for all kinds).
+            label: Only crawls with this label (None for all labels). Crawls with different
+                   labels cover different filter sets, so only same-label crawls can be diffed.
+        """
+        conditions, params = [], []
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        if label is not None:
+            conditions.append("label = ?")
+            params.append(label)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(f"SELECT id FROM crawl{where} ORDER BY id", params)]
+
+    def crawl_labels(self, kind: str | None = "full") -> list[str]:
+        """Returns the distinct labels of crawls of one kind (None for all)."""
+        with self._connect() as conn:
+            if kind is None:
+                return [row[0] for row in conn.execute("SELECT DISTINCT label FROM crawl ORDER BY label")]
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT label FROM crawl WHERE kind = ? ORDER BY label", (kind,))]
+
+    def last_crawl_started(self, label: str) -> float | None:
+        """Returns when the most recent crawl with this label started, or None if there was none."""
+        with self._connect() as conn:
+            return conn.execute("SELECT MAX(started_at) FROM crawl WHERE label = ?",
+                                (label,)).fetchone()[0]
+
+    def has_snapshot(self, listing_id: str | int, last_updated: str | None = None) -> bool:
+        """Tells whether a listing was stored by any crawl (with the given last_updated, if set)."""
+        if not str(listing_id).isdigit():
+            return False
+        query = "SELECT 1 FROM listing_snapshot WHERE listing_id = ?"
+        params = [int(listing_id)]
+        if last_updated is not None:
+            query += " AND last_updated = ?"
+            params.append(last_updated)
+        with self._connect() as conn:
+            return conn.execute(query + " LIMIT 1", params).fetchone() is not None
+
+    def stored_ids(self, listing_ids: Iterable[str | int]) -> set[int]:
+        """Returns which of the given listing ids any crawl has stored, in one query per 500 ids."""
+        ids = sorted({int(listing_id) for listing_id in listing_ids if str(listing_id).isdigit()})
+        stored = set()
+        with self._connect() as conn:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                stored.update(row[0] for row in conn.execute(
+                    "SELECT DISTINCT listing_id FROM listing_snapshot WHERE listing_id IN "
+                    f"({','.join('?' * len(chunk))})", chunk))
+        return stored
+
+    def _columns(self, conn, crawl_id: int) -> tuple[array, array]:
+        """Returns a crawl's listing ids and prices as parallel arrays sorted by listing id."""
+        ids, prices = array("q"), array("q")
+        cursor = conn.execute('''SELECT listing_id, price FROM listing_snapshot
+            WHERE crawl_id = ? ORDER BY listing_id''', (crawl_id,))
+        while True:
+            batch = cursor.fetchmany(50_000)
+            if not batch:
+                return ids, prices
+            for listing_id, price in batch:
+                ids.append(listing_id)
+                prices.append(price)
+
+    def _seen_before(self, conn, crawl_id: int) -> array:
+        """Returns the sorted ids of every listing stored by crawls older than crawl_id."""
+        return array("q", (row[0] for row in conn.execute('''SELECT DISTINCT listing_id
+            FROM listing_snapshot WHERE crawl_id < ? ORDER BY listing_id''', (crawl_id,))))
+
+    def diff(self, old_crawl: int, new_crawl: int) -> CrawlDiff:
+        """
+        Compares two crawls.
+
+        A listing missing from old_crawl but present in new_crawl counts as relisted if any
+        crawl before old_crawl had it, and as new otherwise.
+        """
+        with self._connect() as conn:
+            old_ids, old_prices = self._columns(conn, old_crawl)
+            new_ids, new_prices = self._columns(conn, new_crawl)
+            earlier = self._seen_before(conn, old_crawl)
+
+        result = CrawlDiff(old_crawl, new_crawl)
+        if np is not None:
+            self._merge_numpy(result, old_ids, old_prices, new_ids, new_prices, earlier)
+        else:
+            self._merge_python(result, old_ids, old_prices, new_ids, new_prices, earlier)
+        return result
+
+    @staticmethod
+    def _merge_numpy(result, old_ids, old_prices, new_ids, new_prices, earlier):
+        old_ids, old_prices = np.frombuffer(old_ids, np.int64), np.frombuffer(old_prices, np.int64)
+        new_ids, new_prices = np.frombuffer(new_ids, np.int64), np.frombuffer(new_prices, np.int64)
+        earlier = np.frombuffer(earlier, np.int64)
+
+        common, old_index, new_index = np.intersect1d(
+            old_ids, new_ids, assume_unique=True, return_indices=True)
+        before, after = old_prices[old_index], new_prices[new_index]
+        priced = (before != MISSING) & (after != MISSING)
+        for mask, target in ((priced & (after < before), result.price_drops),
+                             (priced & (after > before), result.price_increases)):
+            target.extend(zip(common[mask].tolist(), before[mask].tolist(), after[mask].tolist()))
+
+        appeared = np.setdiff1d(new_ids, old_ids, assume_unique=True)
+        came_back = np.isin(appeared, earlier, assume_unique=True)
+        result.relisted = appeared[came_back].tolist()
+        result.new_listings = appeared[~came_back].tolist()
+        result.removed = np.setdiff1d(old_ids, new_ids, assume_unique=True).tolist()
+
+    @staticmethod
+    def _merge_python(result, old_ids, old_prices, new_ids, new_prices, earlier):
+        appeared = []
+        i = j = 0
+        while i < len(old_ids) and j < len(new_ids):
+            old_id, new_id = old_ids[i], new_ids[j]
+            if old_id == new_id:
+                before, after = old_prices[i], new_prices[j]
+                if before != MISSING and after != MISSING and before != after:
+                    target = result.price_drops if after < before else result.price_increases
+                    target.append((old_id, before, after))
+                i += 1
+                j += 1
+            elif old_id < new_id:
+                result.removed.append(old_id)
+                i += 1
+            else:
+                appeared.append(new_id)
+                j += 1
+        result.removed.extend(old_ids[i:])
+        appeared.extend(new_ids[j:])
+
+        # Second merge: split the appeared ids by whether an earlier crawl had them.
+        k = 0
+        for listing_id in appeared:
+            while k < len(earlier) and earlier[k] < listing_id:
+                k += 1
+            if k < len(earlier) and earlier[k] == listing_id:
+                result.relisted.append(listing_id)
+            else:
+                result.new_listings.append(listing_id)
+
+
+if __name__ == "__main__":
+    store = ListingHistoryStore()
+    for label in store.crawl_labels():
+        crawls = store.crawl_ids(label=label)
+        if len(crawls) < 2:
+            print(f"{label or '(no label)'}: need at least two full crawls to diff.")
+            continue
+        started = time.perf_counter()
+        changes = store.diff(crawls[-2], crawls[-1])
+        print(f"{label or '(no label)'}: crawl {changes.old_crawl} -> {changes.new_crawl} "
+              f"({time.perf_counter() - started:.2f}s):")
+        for name in ("price_drops", "price_increases", "new_listings", "relisted", "removed"):
+            print(f"  {name}: {len(getattr(changes, name))}")
+        for listing_id, before, after in changes.price_drops[:20]:
+            print(f"  {listing_id}: {before:,} -> {after:,}")
@@ -15,6 +15,8 @@ class ListingData:
     picture_availability: bool = False
     listing_id: Optional[str] = None
     url: Optional[str] = None
+    last_updated: Optional[str] = None
+    updated_age: Optional[int] = None
 
 
 @dataclass
@@ -75,4 +77,21 @@ class ComparisonResult:
             for spec in section.specifications:
                 result += f"  Feature: {spec.feature}, Values: {spec.values}\n"
         return result
-    
\ No newline at end of file
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ComparisonResult":
+        """Rebuilds a ComparisonResult from the output of dataclasses.asdict()."""
+        sections = [
+            ComparisonSection(
+                title=section.get("title"),
+                specifications=[ComparisonSpec(feature=spec.get("feature"), values=list(spec.get("values", [])))
+                                for spec in section.get("specifications", [])])
+            for section in data.get("sections", [])
+        ]
+        return cls(
+            car_names=list(data.get("car_names", [None, None, None])),
+            prices=list(data.get("prices", [None, None, None])),
+            ratings=list(data.get("ratings", [None, None, None])),
+            review_counts=list(data.get("review_counts", [None, None, None])),
+            sections=sections,
+        )
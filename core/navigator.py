@@ -8,6 +8,20 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
 import time
+from collections import deque
+from urllib.parse import urldefrag
+from .popup_suppressor import POPUP_SUPPRESSION_JS, PopupSuppressor
+from .selector_registry import REGISTRY
+from .latency_tracker import LatencyTracker
+from .network_capture import NetworkCapture
+from .async_tabs import AsyncDetailLoader
+from .extractor import ListingExtractor
+from .search_query import DEFAULT_SEARCH_URL, SearchQuery
+from .session_watchdog import PAGE_LOAD_COMMANDS, SessionWatchdog
+from .rate_limiter import endpoint_for_url, shared_limiter
+
+# Hides the automation flag from page scripts; added to every tab the driver controls.
+STEALTH_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
 
 
 class PakWheelsNavigator:
@@ -25,6 +39,19 @@ class PakWheelsNavigator:
         self.config = self._load_config(config_path)
         self.driver = None
         self.wait = None
+        self.popup_suppressor = PopupSuppressor()
+        self.network_capture = NetworkCapture()
+        self.detail_loader = None
+        self.watchdog = None
+        self.command_started = None
+        self.command_name = None
+        self.navigation_started = None
+        self.results_load_started = None
+        self.rate_limiter = shared_limiter(config_path)
+        self.command_log = deque(maxlen=self.config.get("command_log_size", 50))
+        self.latency = LatencyTracker(
+            self.config.get("latency_stats_path", "latency_stats.json"),
+            ceiling=self.config.get("page_load_timeout", 90))
 
     def _load_config(self, config_path):
         try:
@@ -41,24 +68,63 @@ class PakWheelsNavigator:
             }
         return cfg
     
+    def wait_for(self, site: str, condition, default_timeout: float | None = None, root=None,
+                 optional: bool = False, message: str = ""):
+        """
+        WebDriverWait.until with a per-site timeout tuned from observed latencies.
+
+        Args:
+            site: Stable name of the wait site, used as the latency key.
+            condition: An expected_conditions callable.
+            default_timeout: Timeout used until the site has enough samples
+                             (defaults to webdriver_wait_timeout).
+            root: Element to wait within instead of the driver.
+            optional: The condition often never happens (e.g. popups, a Next button on
+                      the last page), so a timeout is not treated as a miss.
+            message: Message for the TimeoutException.
+        """
+        if default_timeout is None:
+            default_timeout = self.config.get("webdriver_wait_timeout", 20)
+        timeout = self.latency.timeout(site, default_timeout)
+        started = time.perf_counter()
+        try:
+            result = WebDriverWait(root or self.driver, timeout).until(condition, message)
+        except TimeoutException:
+            if not optional:
+                self.latency.record_miss(site)
+            raise
+        self.latency.record(site, time.perf_counter() - started)
+        return result
+
+    def results_page_loaded(self):
+        """
+        Records how long the last results-page navigation took, from the request (after the
+        rate limiter let it through) until its listings were available, as 'results_page_load'.
+        """
+        if self.results_load_started is not None:
+            self.latency.record("results_page_load", time.perf_counter() - self.results_load_started)
+            self.results_load_started = None
+
     def _close_google_signin_popup(self, timeout: int = 5) -> bool:
         """
         Detects the Google sign‑in iframe, switches into it, clicks its close button,
         then returns to the main page. Returns True if the popup was found & closed.
         """
+        if self.popup_suppressor.skip_wait("google_signin", timeout):
+            return False
         try:
-            iframe = WebDriverWait(self.driver, timeout).until(
+            iframe = self.wait_for("google_signin_iframe",
                 EC.presence_of_element_located((
                     By.XPATH,
                     "//iframe[contains(@src,'accounts.google.com/gsi/iframe/select')]"
-                ))
+                )), timeout, optional=True
             )
             print("  → Found Google sign‑in iframe")
 
             self.driver.switch_to.frame(iframe)
 
-            close_btn = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable((By.ID, "close"))
+            close_btn = self.wait_for("google_signin_close",
+                EC.element_to_be_clickable((By.ID, "close")), timeout
             )
             print("  → Found iframe close button, clicking it")
             close_btn.click()
@@ -66,11 +132,11 @@ class PakWheelsNavigator:
             self.driver.switch_to.default_content()
             print("  → Switched back to main document")
 
-            WebDriverWait(self.driver, timeout).until(
+            self.wait_for("google_signin_hidden",
                 EC.invisibility_of_element_located((
                     By.XPATH,
                     "//iframe[contains(@src,'accounts.google.com/gsi/iframe/select')]"
-                ))
+                )), timeout
             )
             print("  → Google‑Sign‑In popup closed")
             return True
@@ -114,6 +180,10 @@ class PakWheelsNavigator:
             options.add_experimental_option(
                 "excludeSwitches", ["enable-automation"])
             options.add_experimental_option("useAutomationExtension", False)
+            logging_prefs = {"browser": "ALL"}
+            if self.config.get("network_capture", False):
+                logging_prefs["performance"] = "ALL"
+            options.set_capability("goog:loggingPrefs", logging_prefs)
             self.driver = webdriver.Chrome(options=options)
         elif browser_type == "firefox":
             options = webdriver.FirefoxOptions()
@@ -127,14 +197,21 @@ class PakWheelsNavigator:
 
         try:
             self.driver.execute_cdp_cmd(
-                "Page.addScriptToEvaluateOnNewDocument",
-                {"source": """
-                    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                """}
-            )
+                "Page.addScriptToEvaluateOnNewDocument", {"source": STEALTH_JS})
         except Exception:
             pass
 
+        if self.config.get("suppress_popups", True):
+            self.popup_suppressor.install(self.driver)
+
+        if self.config.get("network_capture", False):
+            if browser_type == "chrome":
+                self.network_capture.install(self.driver)
+            else:
+                print("Warning: network_capture needs Chrome; listings will be read from the DOM.")
+
+        self._record_commands()
+
         self.driver.maximize_window()
         try:
             self.driver.set_page_load_timeout(page_load)
@@ -142,9 +219,93 @@ class PakWheelsNavigator:
             print(f"Warning: Could not set page load timeout: {e}")
 
         self.wait = WebDriverWait(self.driver, timeout)
+
+        if self.config.get("session_watchdog", True):
+            if self.watchdog is None:
+                self.watchdog = SessionWatchdog(self, self.config.get("watchdog_interval", 5),
+                                                hang_timeout=page_load + 5,
+                                                command_timeout=self.config.get("command_hang_timeout", 15))
+                self.watchdog.install()
+            else:
+                self.watchdog.start()
+
         print(f"{browser_type.capitalize()} driver ready with UA:\n  {user_agent}")
         return self.driver, self.wait
 
+    def recover_session(self, url: str | None = None):
+        """
+        Replaces a crashed or hung browser with a new one started from the same config.
+
+        Args:
+            url: Page to reopen in the new browser (optional).
+
+        Returns:
+            The new (driver, wait) pair.
+        """
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Ignoring error while quitting the old WebDriver: {e}")
+        self.driver = None
+        self.wait = None
+        self.detail_loader = None
+        self.navigation_started = None
+        self.initialize_driver()
+        if url:
+            self.driver.get(url)
+            print(f"Reopened {url} after restarting the browser.")
+        return self.driver, self.wait
+
+    def _record_commands(self):
+        """
+        Wraps driver.execute so the last few WebDriver commands are kept for failure reports,
+        so the session watchdog can tell a slow command from an idle session, and so every
+        page load waits for the shared rate limiter.
+        """
+        original_execute = self.driver.execute
+        command_log = self.command_log
+
+        def execute(driver_command, params=None):
+            summary = repr(params)[:200] if params else ""
+            endpoint = url = None
+            if driver_command == "get" and params:
+                url = params.get("url", "")
+                endpoint = endpoint_for_url(url)
+                self.rate_limiter.acquire(endpoint)
+                if endpoint == "search":
+                    self.results_load_started = time.perf_counter()
+            command_log.append((time.time(), driver_command, summary))
+            self.command_name = driver_command
+            self.command_started = time.monotonic()
+            if driver_command in PAGE_LOAD_COMMANDS:
+                self.navigation_started = self.command_started
+            try:
+                return original_execute(driver_command, params)
+            finally:
+                self.command_started = None
+                if endpoint:
+                    self._report_document_status(endpoint, url)
+
+        self.driver.execute = execute
+
+    def _report_document_status(self, endpoint: str, url: str):
+        """
+        Passes the HTTP status of the page just loaded to the rate limiter (needs network capture).
+
+        Only the newest document response for the requested URL counts, so an iframe or a
+        late document from another page cannot stand in for it.
+        """
+        if not self.network_capture.active:
+            return
+        self.network_capture.poll(self.driver)
+        wanted = urldefrag(url)[0]
+        for response in reversed(self.network_capture.responses("Document")):
+            if urldefrag(response["url"])[0] == wanted:
+                if response.get("status"):
+                    self.rate_limiter.report(endpoint, int(response["status"]))
+                return
+
     def go_to_search_page(self):
         """Navigates to the base search URL specified in the config."""
         if not self.driver:
@@ -162,12 +323,31 @@ class PakWheelsNavigator:
             self.close_driver()
             raise
 
+    def go_to_search_results(self, query: "SearchQuery | dict"):
+        """
+        Opens the results page for a filter set directly by URL, skipping the filter clicks.
+
+        Args:
+            query: A SearchQuery or a filter dict SearchQuery.from_filters() accepts.
+        """
+        if not self.driver:
+            raise WebDriverException("WebDriver not initialized.")
+        query = SearchQuery.from_filters(query)
+        results_url = query.to_url(self.config.get("search_url") or DEFAULT_SEARCH_URL)
+        try:
+            self.driver.get(results_url)
+            print(f"Navigated to results for {query.text or 'no filters'}: {results_url}")
+        except Exception as e:
+            print(f"Error navigating to {results_url}: {e}")
+            raise
+
     def open_listing_page_new_tab(self, listing_url: str) -> str | None:
         """Opens a new tab with the given listing URL, switches to it, and returns the new tab's handle."""
         if not self.driver:
             raise WebDriverException("WebDriver not initialized.")
 
         original_window = self.driver.current_window_handle
+        self.rate_limiter.acquire("detail")
         try:
             self.driver.execute_script(
                 f"window.open('{listing_url}', '_blank');")
@@ -195,6 +375,54 @@ class PakWheelsNavigator:
                 f"Error opening or switching to new tab with URL {listing_url}: {e}")
             return None
 
+    def load_listing_details(self, listing_urls: list[str], tabs: int | None = None) -> dict:
+        """
+        Loads and extracts several listing detail pages.
+
+        On Chrome the pages go through a pool of background tabs that is kept alive between
+        calls (AsyncDetailLoader); other browsers fall back to opening, extracting and
+        closing one tab at a time.
+
+        Args:
+            listing_urls: Detail page URLs.
+            tabs: Size of the tab pool (defaults to detail_tabs in config). Changing it
+                  replaces the pool.
+
+        Returns:
+            A dict of URL to ListingPageData, or None for pages that could not be loaded.
+        """
+        if not self.driver:
+            raise WebDriverException("WebDriver not initialized.")
+        tabs = tabs or self.config.get("detail_tabs", 4)
+        if self.config.get("browser", "chrome").lower() == "chrome":
+            if self.detail_loader is None or self.detail_loader.tabs != tabs:
+                if self.detail_loader is not None:
+                    self.detail_loader.close()
+                init_scripts = [STEALTH_JS]
+                if self.popup_suppressor.active:
+                    init_scripts.append(POPUP_SUPPRESSION_JS)
+                self.detail_loader = AsyncDetailLoader(
+                    self.driver, tabs, self.config.get("page_load_timeout", 90), self.rate_limiter,
+                    init_scripts)
+            return self.detail_loader.load(listing_urls)
+
+        extractor = ListingExtractor()
+        results = {}
+        original_window = self.driver.current_window_handle
+        for url in listing_urls:
+            results[url] = None
+            if not self.open_listing_page_new_tab(url):
+                continue
+            try:
+                self.wait_for("detail_ready", EC.presence_of_element_located(
+                    REGISTRY.locator("detail_ready", "detail")))
+                results[url] = extractor.extract_listing_page_data(self.driver)
+            except TimeoutException:
+                print(f"Warning: Timed out waiting for detail page elements at {url}.")
+            finally:
+                self.close_current_tab_and_switch_back(original_window)
+        return results
+
     def close_current_tab_and_switch_back(self, original_handle: str):
         """Closes the current tab and switches back to the specified original tab handle."""
         if not self.driver or not original_handle:
@@ -223,10 +451,12 @@ class PakWheelsNavigator:
 
     def _handle_onesignal_popup(self):
         """Checks for and closes the OneSignal slidedown popup if present."""
+        if self.popup_suppressor.skip_wait("onesignal", 3):
+            return
         try:
             popup_container_selector = (By.ID, "onesignal-slidedown-container")
-            popup_container = WebDriverWait(self.driver, 3).until(
-                EC.visibility_of_element_located(popup_container_selector)
+            popup_container = self.wait_for("onesignal_popup",
+                EC.visibility_of_element_located(popup_container_selector), 3, optional=True
             )
             print("OneSignal popup detected. Attempting to close...")
 
@@ -239,9 +469,9 @@ class PakWheelsNavigator:
             close_button = None
             for selector_type, selector_value in possible_button_selectors:
                 try:
-                    close_button = WebDriverWait(popup_container, 2).until(
+                    close_button = self.wait_for(f"onesignal_close:{selector_value}",
                         EC.element_to_be_clickable(
-                            (selector_type, selector_value))
+                            (selector_type, selector_value)), 2, root=popup_container, optional=True
                     )
                     print(
                         f"Found close button using: {selector_type}={selector_value}")
@@ -252,9 +482,9 @@ class PakWheelsNavigator:
             if close_button:
                 self.driver.execute_script(
                     "arguments[0].click();", close_button)
-                WebDriverWait(self.driver, 5).until( 
+                self.wait_for("onesignal_hidden",
                     EC.invisibility_of_element_located(
-                        popup_container_selector)
+                        popup_container_selector), 5
                 )
                 print("OneSignal popup closed.")
                 time.sleep(0.5)
@@ -280,13 +510,15 @@ class PakWheelsNavigator:
         disabled_next_selector = (By.CSS_SELECTOR, "li.next_page.disabled")
 
         try:
-            next_button = self.wait.until(
-                EC.element_to_be_clickable(next_button_selector))
+            next_button = self.wait_for("next_button",
+                EC.element_to_be_clickable(next_button_selector), optional=True)
             current_url = self.driver.current_url
 
             self.driver.execute_script(
                 "arguments[0].scrollIntoView(true);", next_button)
             time.sleep(0.5)
+            self.rate_limiter.acquire("search")
+            self.results_load_started = time.perf_counter()
 
             try:
                 next_button.click()
@@ -304,17 +536,17 @@ class PakWheelsNavigator:
                     return False
 
             try:
-                self.wait.until(EC.url_changes(current_url))
+                self.wait_for("next_page_url", EC.url_changes(current_url))
                 print("URL changed after clicking Next.")
             except TimeoutException:
                 print(
                     "URL did not change, waiting for listings to potentially reload...")
                 try:
                     listing_on_current_page = self.driver.find_element(
-                        By.CSS_SELECTOR, "li.classified-listing")
+                        *REGISTRY.locator("listing", "search"))
                     self.wait.until(EC.staleness_of(listing_on_current_page))
                     self.wait.until(EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, "li.classified-listing")))
+                        REGISTRY.locator("listing", "search")))
                     print("Listings appear to have reloaded.")
                 except (TimeoutException, NoSuchElementException):
                     print("Warning: Could not confirm page update after clicking Next.")
@@ -340,15 +572,15 @@ class PakWheelsNavigator:
         prev_button_selector = (
             By.CSS_SELECTOR, "li.prev:not(.disabled) a[rel='prev']")
         try:
-            prev_button = self.wait.until(
+            prev_button = self.wait_for("prev_button",
                 EC.element_to_be_clickable(prev_button_selector))
             self.driver.execute_script(
                 "arguments[0].scrollIntoView(true);", prev_button)
             time.sleep(0.5)
             prev_button.click()
             print("Clicked 'Previous' button.")
-            self.wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "li.classified-listing")))
+            self.wait_for("listings_present", EC.presence_of_element_located(
+                REGISTRY.locator("listing", "search")), optional=True)
             print("Previous page loaded successfully.")
         except TimeoutException:
             print("Error: 'Previous' button not found or not clickable within timeout.")
@@ -377,8 +609,8 @@ class PakWheelsNavigator:
 
             self.driver.get(page_url)
             print(f"Navigated to page {page_number}: {page_url}")
-            self.wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "li.classified-listing")))
+            self.wait_for("listings_present", EC.presence_of_element_located(
+                REGISTRY.locator("listing", "search")), optional=True)
             print(f"Page {page_number} loaded successfully.")
         except TimeoutException:
             print(
@@ -420,6 +652,10 @@ class PakWheelsNavigator:
 
     def close_driver(self):
         """Closes the WebDriver."""
+        if self.watchdog:
+            self.watchdog.stop()
+        self.latency.save()
+        self.detail_loader = None
         if self.driver:
             try:
                 print("Attempting to quit WebDriver.")
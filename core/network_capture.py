@@ -0,0 +1,111 @@
+import base64
+import json
+from collections import deque
+from urllib.parse import urldefrag
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+CAPTURED_RESOURCE_TYPES = {"Document", "XHR", "Fetch"}
+
+
+class NetworkCapture:
+    """
+    Keeps track of the HTML responses the browser has already downloaded, via Chrome DevTools.
+
+    Network.responseReceived events are read from the 'performance' log, which Chrome only
+    fills when goog:loggingPrefs asks for it, so the driver has to be created with that
+    capability. Bodies are fetched lazily with Network.getResponseBody, only for the
+    responses that are actually parsed.
+    """
+
+    def __init__(self, max_responses: int = 50):
+        """
+        Initializes the NetworkCapture.
+
+        Args:
+            max_responses: Most recent HTML responses remembered; older bodies are
+                           evicted by Chrome anyway.
+        """
+        self.active = False
+        self._responses = deque(maxlen=max_responses)
+        self.bodies_fetched = 0
+
+    def install(self, driver: WebDriver) -> bool:
+        """Enables the DevTools Network domain. Returns False on browsers without CDP."""
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception as e:
+            print(f"Warning: Network capture unavailable, falling back to DOM scraping: {e}")
+            self.active = False
+            return False
+        self.active = True
+        return True
+
+    def poll(self, driver: WebDriver):
+        """Moves new responseReceived events from the performance log into the response list."""
+        if not self.active:
+            return
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            print(f"Warning: Could not read performance log: {e}")
+            return
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, json.JSONDecodeError):
+                continue
+            if message.get("method") != "Network.responseReceived":
+                continue
+            params = message.get("params", {})
+            response = params.get("response", {})
+            if params.get("type") not in CAPTURED_RESOURCE_TYPES:
+                continue
+            if "html" not in response.get("mimeType", ""):
+                continue
+            self._responses.append({
+                "request_id": params.get("requestId"),
+                "url": response.get("url", ""),
+                "type": params.get("type"),
+                "status": response.get("status"),
+            })
+
+    def responses(self, resource_type: str | None = None) -> list[dict]:
+        """Returns the remembered responses, newest last, optionally of one resource type."""
+        return [r for r in self._responses if resource_type is None or r["type"] == resource_type]
+
+    def body(self, driver: WebDriver, response: dict) -> str | None:
+        """Fetches the body of a remembered response, or None if Chrome no longer has it."""
+        try:
+            result = driver.execute_cdp_cmd("Network.getResponseBody",
+                                            {"requestId": response["request_id"]})
+        except Exception as e:
+            print(f"Warning: Could not get response body for {response['url']}: {e}")
+            return None
+        self.bodies_fetched += 1
+        if result.get("base64Encoded"):
+            return base64.b64decode(result["body"]).decode("utf-8", errors="replace")
+        return result.get("body")
+
+    def document_body(self, driver: WebDriver, url: str) -> str | None:
+        """
+        Returns the HTML of the most recent document response for a URL.
+
+        Args:
+            driver: The driver the capture was installed on.
+            url: Page URL, typically driver.current_url; fragments are ignored.
+        """
+        self.poll(driver)
+        wanted = urldefrag(url)[0]
+        for response in reversed(self.responses("Document")):
+            if urldefrag(response["url"])[0] == wanted and response.get("status") == 200:
+                return self.body(driver, response)
+        return None
+
+    def latest_ajax_body(self, driver: WebDriver, url_contains: str = "") -> str | None:
+        """Returns the HTML of the most recent XHR/fetch response whose URL contains url_contains."""
+        self.poll(driver)
+        for response in reversed(self._responses):
+            if response["type"] != "Document" and url_contains in response["url"]:
+                return self.body(driver, response)
+        return None
@@ -0,0 +1,106 @@
+from selenium.webdriver.remote.webdriver import WebDriver
+
+# Injected before any page script runs. The CSS hides the known popups as soon as
+# they are inserted; the observer clicks their dismiss buttons so the page state
+# (body classes, backdrops, cookies) ends up the same as after a manual close.
+POPUP_SUPPRESSION_JS = r"""
+(function () {
+    var CSS = [
+        '#onesignal-slidedown-container',
+        '#onesignal-popover-container',
+        '#credential_picker_container',
+        'iframe[src*="accounts.google.com/gsi/"]',
+        '#download_apps',
+        '#googleSignInModal',
+        'a[href="#"].overlay',
+        'a[href="#"].full-field-overlay'
+    ].join(',') + '{display:none !important; visibility:hidden !important; pointer-events:none !important;}';
+
+    function addStyle() {
+        if (document.getElementById('pw-popup-suppression')) return;
+        var style = document.createElement('style');
+        style.id = 'pw-popup-suppression';
+        style.textContent = CSS;
+        (document.head || document.documentElement).appendChild(style);
+    }
+
+    function dismiss() {
+        var cancel = document.querySelector('#onesignal-slidedown-cancel-button, button.onesignal-slidedown-cancel-button');
+        if (cancel) cancel.click();
+        ['download_apps', 'googleSignInModal'].forEach(function (id) {
+            var modal = document.getElementById(id);
+            if (modal && /\b(in|show)\b/.test(modal.className)) {
+                var close = modal.querySelector('.close, .btn-close, .dismiss-btn');
+                if (close) close.click();
+            }
+        });
+        document.querySelectorAll('a[href="#"].overlay, a[href="#"].full-field-overlay').forEach(function (el) {
+            el.remove();
+        });
+    }
+
+    addStyle();
+    new MutationObserver(function () { addStyle(); dismiss(); })
+        .observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ['class']});
+})();
+"""
+
+# Popup handlers whose popup the script above hides and dismisses. Handlers for popups
+# not listed here keep waiting for their popup even when suppression is installed.
+COVERED_POPUPS = frozenset({
+    "google_signin",      # iframe[src*="accounts.google.com/gsi/"], #credential_picker_container
+    "onesignal",          # #onesignal-slidedown-container, #onesignal-popover-container
+    "interfering_popup",  # #download_apps, #googleSignInModal
+    "overlay_link",       # a[href="#"].overlay, a[href="#"].full-field-overlay
+})
+
+
+class PopupSuppressor:
+    """Hides and auto-dismisses PakWheels popups at document start so actions need not wait for them."""
+
+    def __init__(self):
+        self.active = False
+        self.covered: frozenset[str] = frozenset()
+        self.waits_skipped = 0
+        self.timeout_seconds_skipped = 0.0
+
+    def install(self, driver: WebDriver) -> bool:
+        """
+        Registers the suppression script for every new document via CDP.
+
+        Returns:
+            True if suppression is active. Browsers without CDP (e.g. Firefox) return False
+            and keep using the per-action popup waits.
+        """
+        try:
+            driver.execute_cdp_cmd(
+                "Page.addScriptToEvaluateOnNewDocument", {"source": POPUP_SUPPRESSION_JS})
+            self.active = True
+            self.covered = COVERED_POPUPS
+            print("Popup suppression installed.")
+        except Exception as e:
+            print(f"Warning: Popup suppression unavailable, falling back to popup waits: {e}")
+            self.active = False
+            self.covered = frozenset()
+        return self.active
+
+    def skip_wait(self, popup: str, timeout: float) -> bool:
+        """
+        Called at the top of each popup handler. Returns True if the handler can return
+        immediately because the installed script covers its popup.
+
+        Args:
+            popup: Handler name, one of COVERED_POPUPS for popups the script handles.
+            timeout: The handler's wait timeout. Its sum is an upper bound on the time
+                     saved (the full timeout is only spent when no popup appears), not a
+                     measurement.
+        """
+        if popup not in self.covered:
+            return False
+        self.waits_skipped += 1
+        self.timeout_seconds_skipped += timeout
+        return True
+
+    def reset_stats(self):
+        self.waits_skipped = 0
+        self.timeout_seconds_skipped = 0.0
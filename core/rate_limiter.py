@@ -0,0 +1,218 @@
+import json
+import multiprocessing
+import time
+
+import requests
+
+# Endpoint budgets as (requests per second, burst). "global" caps all endpoints together;
+# an endpoint without a budget is only held back by the global bucket.
+DEFAULT_BUDGETS = {
+    "global": (1.0, 4),
+    "search": (0.5, 2),
+    "detail": (1.0, 4),
+    "ajax": (2.0, 4),
+}
+ENDPOINTS = ("global", "search", "detail", "ajax", "other")
+BACKOFF_STATUSES = (429, 503)
+
+# Per-endpoint slots in the shared state array.
+TOKENS, UPDATED, BLOCKED_UNTIL, BACKOFF_LEVEL, ACQUIRED, WAITED, THROTTLED = range(7)
+SLOTS = 7
+
+
+def endpoint_for_url(url: str) -> str:
+    """Classifies a PakWheels URL into the endpoint whose budget it spends."""
+    if "/used-cars/search/" in url:
+        return "search"
+    if "/used-cars/" in url or "/new-cars/" in url:
+        return "detail"
+    return "other"
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets shared by every thread and worker process that talks to the site.
+
+    Each endpoint (search pages, detail pages, AJAX popups) has its own bucket, and every
+    request also spends a token from the global bucket. The state lives in a shared-memory
+    array behind one lock, so worker processes that are handed the limiter draw from the
+    same budget. A 429 or 503 pauses the endpoint for an exponentially growing delay (or
+    the server's Retry-After); successful responses shrink the delay again.
+    """
+
+    def __init__(self, budgets: dict[str, tuple[float | None, float]] | None = None,
+                 base_backoff: float = 5, max_backoff: float = 300, ctx=None):
+        """
+        Initializes the TokenBucketLimiter.
+
+        Args:
+            budgets: {endpoint: (requests per second, burst)}; a rate of None, or a missing
+                     endpoint, means unlimited. Defaults to DEFAULT_BUDGETS.
+            base_backoff: Seconds an endpoint pauses after its first 429/503.
+            max_backoff: Longest pause, however many 429/503s follow.
+            ctx: multiprocessing context the shared state is created in (e.g. a spawn context).
+        """
+        ctx = ctx or multiprocessing
+        budgets = DEFAULT_BUDGETS if budgets is None else budgets
+        self.rates = [None] * len(ENDPOINTS)
+        self.bursts = [1.0] * len(ENDPOINTS)
+        for name, (rate, burst) in budgets.items():
+            index = ENDPOINTS.index(name)
+            self.rates[index] = rate
+            self.bursts[index] = max(1.0, float(burst))
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._state = ctx.RawArray("d", SLOTS * len(ENDPOINTS))
+        now = time.monotonic()
+        for index in range(len(ENDPOINTS)):
+            self._set(index, TOKENS, self.bursts[index])
+            self._set(index, UPDATED, now)
+        self._lock = ctx.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, ctx=None) -> "TokenBucketLimiter":
+        """Builds a limiter from config "rate_limits": {endpoint: {"rate": ..., "burst": ...}}."""
+        limits = config.get("rate_limits")
+        budgets = None
+        if limits is not None:
+            budgets = {name: (limit.get("rate"), limit.get("burst", 1))
+                       for name, limit in limits.items() if name in ENDPOINTS}
+        return cls(budgets, config.get("rate_limit_backoff", 5), config.get("rate_limit_max_backoff", 300), ctx)
+
+    def _get(self, index: int, slot: int) -> float:
+        return self._state[index * SLOTS + slot]
+
+    def _set(self, index: int, slot: int, value: float):
+        self._state[index * SLOTS + slot] = value
+
+    def _refill(self, index: int, now: float):
+        rate = self.rates[index]
+        if rate is None:
+            return
+        elapsed = now - self._get(index, UPDATED)
+        self._set(index, TOKENS, min(self.bursts[index], self._get(index, TOKENS) + elapsed * rate))
+        self._set(index, UPDATED, now)
+
+    def _wait_time(self, index: int, now: float) -> float:
+        wait = self._get(index, BLOCKED_UNTIL) - now
+        rate = self.rates[index]
+        if rate is not None and self._get(index, TOKENS) < 1:
+            wait = max(wait, (1 - self._get(index, TOKENS)) / rate)
+        return wait
+
+    def acquire(self, endpoint: str = "other") -> float:
+        """
+        Blocks until the endpoint and the global budget both allow one more request.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        indexes = tuple(dict.fromkeys(
+            (ENDPOINTS.index("global"), ENDPOINTS.index(endpoint if endpoint in ENDPOINTS else "other"))))
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = 0.0
+                for index in indexes:
+                    self._refill(index, now)
+                    wait = max(wait, self._wait_time(index, now))
+                if wait <= 0:
+                    waited = now - started
+                    for index in indexes:
+                        if self.rates[index] is not None:
+                            self._set(index, TOKENS, self._get(index, TOKENS) - 1)
+                    endpoint_index = indexes[-1]
+                    self._set(endpoint_index, ACQUIRED, self._get(endpoint_index, ACQUIRED) + 1)
+                    self._set(endpoint_index, WAITED, self._get(endpoint_index, WAITED) + waited)
+                    return waited
+            time.sleep(min(wait, 1.0))
+
+    def report(self, endpoint: str, status: int, retry_after: float | None = None) -> float:
+        """
+        Feeds a response status back. 429/503 pause the endpoint; other statuses ease the pause.
+
+        Returns:
+            Seconds the endpoint is now paused for (0 if not paused).
+        """
+        index = ENDPOINTS.index(endpoint if endpoint in ENDPOINTS else "other")
+        with self._lock:
+            now = time.monotonic()
+            level = self._get(index, BACKOFF_LEVEL)
+            if status not in BACKOFF_STATUSES:
+                if level:
+                    self._set(index, BACKOFF_LEVEL, level - 1)
+                return max(0.0, self._get(index, BLOCKED_UNTIL) - now)
+            delay = min(self.max_backoff, self.base_backoff * 2 ** level)
+            if retry_after is not None:
+                delay = max(delay, min(self.max_backoff, retry_after))
+            self._set(index, BACKOFF_LEVEL, level + 1)
+            self._set(index, THROTTLED, self._get(index, THROTTLED) + 1)
+            self._set(index, BLOCKED_UNTIL, max(self._get(index, BLOCKED_UNTIL), now + delay))
+        print(f"Rate limiter: HTTP {status} on '{endpoint}'; pausing it for {delay:.0f}s.")
+        return delay
+
+    def interval(self, endpoint: str) -> float:
+        """Steady-state seconds between requests to an endpoint (the slower of it and the global budget)."""
+        rates = [self.rates[ENDPOINTS.index(name)] for name in ("global", endpoint) if name in ENDPOINTS]
+        return max((1 / rate for rate in rates if rate), default=0.0)
+
+    def request(self, session, url: str, endpoint: str | None = None, retries: int = 3,
+                **kwargs) -> requests.Response:
+        """
+        GETs a URL within the endpoint's budget, waiting out and retrying 429/503 responses.
+
+        Args:
+            session: A requests.Session (or the requests module).
+            url: URL to fetch.
+            endpoint: Budget to spend (default: classified from the URL).
+            retries: Extra attempts after a 429/503.
+            **kwargs: Passed on to session.get.
+
+        Returns:
+            The last response; callers still call raise_for_status().
+        """
+        endpoint = endpoint or endpoint_for_url(url)
+        for attempt in range(retries + 1):
+            self.acquire(endpoint)
+            resp = session.get(url, **kwargs)
+            retry_after = resp.headers.get("Retry-After", "")
+            self.report(endpoint, resp.status_code,
+                        float(retry_after) if retry_after.isdigit() else None)
+            if resp.status_code not in BACKOFF_STATUSES or attempt == retries:
+                return resp
+        return resp
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Returns per-endpoint request counts, total seconds waited and 429/503 counts."""
+        with self._lock:
+            return {name: {"requests": int(self._get(i, ACQUIRED)), "waited": self._get(i, WAITED),
+                           "throttled": int(self._get(i, THROTTLED))}
+                    for i, name in enumerate(ENDPOINTS) if self._get(i, ACQUIRED) or self._get(i, THROTTLED)}
+
+
+_shared_limiter: TokenBucketLimiter | None = None
+
+
+def shared_limiter(config_path: str = "config.json") -> TokenBucketLimiter:
+    """
+    Returns this process's limiter, creating it from the config on first use.
+
+    Worker processes should call install_shared_limiter() with the parent's limiter instead,
+    so they draw from the same budget.
+    """
+    global _shared_limiter
+    if _shared_limiter is None:
+        try:
+            with open(config_path, "r") as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            config = {}
+        _shared_limiter = TokenBucketLimiter.from_config(config)
+    return _shared_limiter
+
+
+def install_shared_limiter(limiter: TokenBucketLimiter):
+    """Makes a limiter handed over from a parent process the one shared_limiter() returns."""
+    global _shared_limiter
+    _shared_limiter = limiter
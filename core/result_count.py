@@ -0,0 +1,197 @@
+import math
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable
+
+from bs4 import BeautifulSoup
+
+from .filter_store import parse_option_counts
+from .search_query import SearchQuery
+from .selector_registry import REGISTRY
+
+# "Showing 1 - 25 of 45,123 Results" / "45,123 results".
+TOTAL_PATTERNS = (
+    re.compile(r"\bof\s+(\d{1,3}(?:,\d{3})+|\d+)\s+(?:results?|ads|cars)\b", re.I),
+    re.compile(r"(\d{1,3}(?:,\d{3})+|\d+)\s+(?:results?|ads)\s+found\b", re.I),
+)
+
+# Full span searched when a range filter is bisected and the query leaves it open;
+# load_range_bounds() replaces these with the slider limits stored in the filter DB.
+RANGE_BOUNDS = {
+    "Price Range": (0, 100_000_000),
+    "Year": (1950, date.today().year + 1),
+    "Mileage": (0, 1_000_000),
+}
+
+
+@dataclass
+class ResultCount:
+    """How many results a query has, and the per-option counts its filter sidebar shows."""
+    query: SearchQuery
+    total: int | None
+    facets: dict[str, dict[str, int]] = field(default_factory=dict)
+    per_page: int = 25
+    # "page": the results header; "facets": summed from a complete facet; "parent": the
+    # option count shown on the parent query, without loading this query at all.
+    source: str = "page"
+
+    @property
+    def pages(self) -> int | None:
+        return None if self.total is None else math.ceil(self.total / self.per_page)
+
+    def crawl_seconds(self, seconds_per_page: float) -> float | None:
+        """Estimated time to page through every result at seconds_per_page."""
+        return None if self.pages is None else self.pages * seconds_per_page
+
+
+def load_range_bounds(db_path: str = "filters.db") -> dict[str, tuple[int, int]]:
+    """Returns RANGE_BOUNDS updated with the min/max the site's range sliders advertise."""
+    bounds = dict(RANGE_BOUNDS)
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("SELECT filter_name, min, max FROM filter_range").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return bounds
+    for name, low, high in rows:
+        if name in bounds and low is not None and high is not None and low < high:
+            bounds[name] = (low, high)
+    return bounds
+
+
+def _parse_total(soup: BeautifulSoup) -> int | None:
+    containers = [element for selector in REGISTRY.css_chain("result_count")
+                  for element in soup.select(selector)]
+    for text in [element.get_text(" ", strip=True) for element in containers]:
+        for pattern in TOTAL_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return int(match.group(1).replace(",", ""))
+    return None
+
+
+def parse_result_count(html: str, query: SearchQuery, per_page: int = 25) -> ResultCount:
+    """
+    Reads the total result count and the facet counts from a results page.
+
+    When the header has no total, the largest sum over facets that list every option
+    (no 'More Choices' link) stands in for it, since each listing falls in exactly one
+    option of such a facet.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    facets, complete = {}, []
+    for group in soup.select(".accordion-group"):
+        heading = group.select_one(".accordion-heading .accordion-toggle")
+        if not heading or group.select_one(".range-filter"):
+            continue
+        counts = {label: count for label, count in parse_option_counts(group) if count is not None}
+        if counts:
+            name = heading.get_text(strip=True)
+            facets[name] = counts
+            if not group.select_one(".more-choice"):
+                complete.append(name)
+
+    total, source = _parse_total(soup), "page"
+    if total is None and complete:
+        total, source = max(sum(facets[name].values()) for name in complete), "facets"
+    return ResultCount(query, total, facets, per_page, source)
+
+
+class QuerySplitter:
+    """
+    Cuts a query into sub-queries that each stay under the site's pagination ceiling.
+
+    A query over the ceiling is split on the facet whose options cover (nearly) all of its
+    results with the smallest largest option, so most sub-queries are sized from the parent's
+    facet counts without being loaded. When no facet covers the results, a range filter
+    (price, then year, then mileage) is halved instead and both halves are counted.
+
+    A facet split drops listings that show no option of that facet (up to 1 - coverage of
+    them); the site has no query for "none of these options", so they are counted in
+    results_uncovered rather than fetched.
+    """
+
+    def __init__(self, counter: Callable[[SearchQuery], ResultCount], max_results: int,
+                 coverage: float = 0.99, max_depth: int = 16,
+                 range_bounds: dict[str, tuple[int, int]] | None = None):
+        """
+        Initializes the QuerySplitter.
+
+        Args:
+            counter: Returns the ResultCount of a query, e.g. FilterInteractor.count.
+            max_results: The most results one query can page through.
+            coverage: Share of the results a facet's option counts must add up to before it
+                      is used to split; facets that drop more listings than that are skipped.
+            max_depth: Split levels before giving up and returning an oversized query.
+            range_bounds: Span of each range filter that may be halved (default RANGE_BOUNDS).
+        """
+        self.counter = counter
+        self.max_results = max_results
+        self.coverage = coverage
+        self.max_depth = max_depth
+        self.range_bounds = range_bounds or RANGE_BOUNDS
+        self.queries_loaded = 0
+        self.results_uncovered = 0
+
+    def split(self, query: SearchQuery) -> list[ResultCount]:
+        """
+        Returns ResultCounts of sub-queries that cover the query's results, except for the
+        results_uncovered listings that facet splits could not assign to any option.
+        """
+        self.queries_loaded += 1
+        return self._split(self.counter(query), 0)
+
+    def _split(self, result: ResultCount, depth: int) -> list[ResultCount]:
+        if result.total is None or result.total <= self.max_results:
+            return [result]
+        if depth >= self.max_depth:
+            print(f"Warning: {result.query} still has {result.total} results after {depth} splits.")
+            return [result]
+
+        facet = self._best_facet(result)
+        if facet:
+            gap = result.total - sum(result.facets[facet].values())
+            if gap > 0:
+                self.results_uncovered += gap
+                print(f"Warning: splitting {result.query} on {facet} leaves {gap} results without an option.")
+            parts = []
+            for option, count in result.facets[facet].items():
+                sub_query = result.query.with_option(facet, option)
+                if count <= self.max_results:
+                    parts.append(ResultCount(sub_query, count, {}, result.per_page, "parent"))
+                else:
+                    self.queries_loaded += 1
+                    parts.extend(self._split(self.counter(sub_query), depth + 1))
+            return parts
+
+        halves = self._bisect(result.query)
+        if not halves:
+            print(f"Warning: no facet or range left to split {result.query} ({result.total} results).")
+            return [result]
+        parts = []
+        for half in halves:
+            self.queries_loaded += 1
+            parts.extend(self._split(self.counter(half), depth + 1))
+        return parts
+
+    def _best_facet(self, result: ResultCount) -> str | None:
+        candidates = [
+            (max(counts.values()), name) for name, counts in result.facets.items()
+            if result.query.get(name) is None and len(counts) > 1
+            and sum(counts.values()) >= self.coverage * result.total]
+        return min(candidates)[1] if candidates else None
+
+    def _bisect(self, query: SearchQuery) -> list[SearchQuery] | None:
+        for name, (default_low, default_high) in self.range_bounds.items():
+            current = query.get(name)
+            low, high = (current[1], current[2]) if current and current[0] == "range" else (None, None)
+            low = default_low if low is None else low
+            high = default_high if high is None else high
+            if high - low >= 1:
+                middle = (low + high) // 2
+                return [query.with_range(name, low, middle), query.with_range(name, middle + 1, high)]
+        return None
@@ -0,0 +1,252 @@
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, fields
+
+from core.models import ListingData
+from core.navigator import PakWheelsNavigator
+from core.search_interactor import FilterInteractor
+from core.search_query import SearchQuery
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without pyarrow the dataset is written as columnar JSON.
+    pa = pq = None
+
+DATASET_COLUMNS = ["query_key", "query", "page"] + [f.name for f in fields(ListingData)]
+
+
+def filter_grid(axes: dict[str, list]) -> list[dict]:
+    """
+    Expands per-filter choices into every combination, e.g. for city x make x price bucket reports.
+
+    Args:
+        axes: {"City": ["Lahore", "Karachi"], "Make": ["Toyota", "Honda"],
+               "Price Range": [(0, 2000000), (2000000, 5000000)]}. Tuples are (min, max) ranges.
+
+    Returns:
+        One filter dict per combination, in the typed shape SearchQuery.from_filters() accepts.
+    """
+    names = list(axes)
+    grid = []
+    for combination in itertools.product(*(axes[name] for name in names)):
+        filters = {}
+        for name, choice in zip(names, combination):
+            if isinstance(choice, (tuple, list)):
+                filters[name] = {"type": "range", "min": choice[0], "max": choice[1]}
+            else:
+                filters[name] = {"type": "option", "value": choice}
+        grid.append(filters)
+    return grid
+
+
+class SearchBatchRunner:
+    """
+    Runs many filter sets across a pool of browser sessions and collects every listing into one dataset.
+
+    Filter sets are deduplicated by their canonical SearchQuery, then sorted by results URL
+    so queries that share leading segments (same city, then same make) sit next to each
+    other. Each session gets a contiguous run of that order, which keeps its browser cache
+    warm for the pages those queries share; a session that runs dry takes queries from the
+    far end of the busiest session's run. Every page load goes through the navigators'
+    shared rate limiter, so the sessions together stay within the search budget. Finished
+    queries are appended to a JSONL file that doubles as the checkpoint, and
+    write_dataset() turns it into a single columnar dataset.
+    """
+
+    def __init__(self, output_path: str, workers: int = 2, pages_per_query: int = 1,
+                 config_path: str = "config.json"):
+        """
+        Initializes the SearchBatchRunner.
+
+        Args:
+            output_path: JSONL file each finished query is appended to. Queries already stored
+                         there with status 'ok' are skipped.
+            workers: Number of browser sessions to run in parallel.
+            pages_per_query: Result pages read per query.
+            config_path: Config file handed to each PakWheelsNavigator.
+        """
+        self.output_path = output_path
+        self.workers = max(1, workers)
+        self.pages_per_query = max(1, pages_per_query)
+        self.config_path = config_path
+        self._write_lock = threading.Lock()
+        self._lane_lock = threading.Lock()
+        self._lanes: list[deque] = []
+
+    def completed_queries(self) -> set[str]:
+        """Returns the keys of queries already run successfully in earlier runs."""
+        done = set()
+        if not os.path.exists(self.output_path):
+            return done
+        with open(self.output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn final line from a crash.
+                if record.get("status") == "ok":
+                    done.add(record["query_key"])
+        return done
+
+    def plan(self, filter_sets: list) -> tuple[list[SearchQuery], int]:
+        """
+        Deduplicates filter sets and puts them in URL order.
+
+        Returns:
+            The unique queries in run order, and how many duplicates were dropped.
+        """
+        unique = {}
+        for filters in filter_sets:
+            query = SearchQuery.from_filters(filters)
+            unique.setdefault(query, query)
+        ordered = sorted(unique, key=lambda query: query.to_url())
+        return ordered, len(filter_sets) - len(ordered)
+
+    def run(self, filter_sets: list) -> dict[str, int]:
+        """
+        Runs every filter set, resuming from the output file if it already exists.
+
+        Args:
+            filter_sets: Filter dicts (either shape) or SearchQuery objects.
+
+        Returns:
+            Counts of queries that succeeded, failed, were duplicates or were skipped from the checkpoint.
+        """
+        queries, duplicates = self.plan(filter_sets)
+        done = self.completed_queries()
+        pending = [query for query in queries if query.key not in done]
+        stats = {"ok": 0, "failed": 0, "duplicate": duplicates, "skipped": len(queries) - len(pending)}
+        self._terminate_torn_line()
+
+        workers = min(self.workers, len(pending))
+        lane_size = math.ceil(len(pending) / workers) if workers else 0
+        self._lanes = [deque(pending[i:i + lane_size]) for i in range(0, len(pending), lane_size or 1)]
+        print(f"Running {len(pending)} searches across {workers} browser sessions "
+              f"({duplicates} duplicates dropped, {stats['skipped']} already done).")
+        threads = [threading.Thread(target=self._worker, args=(lane, stats), daemon=True)
+                   for lane in range(len(self._lanes))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats
+
+    def _next_query(self, lane: int) -> SearchQuery | None:
+        with self._lane_lock:
+            if self._lanes[lane]:
+                return self._lanes[lane].popleft()
+            busiest = max(self._lanes, key=len)
+            # The far end of another lane is the part that session would reach last.
+            return busiest.pop() if busiest else None
+
+    def _worker(self, lane: int, stats: dict[str, int]):
+        navigator = PakWheelsNavigator(self.config_path)
+        interactor = None
+        try:
+            while True:
+                query = self._next_query(lane)
+                if query is None:
+                    return
+
+                started = time.time()
+                record = {"query_key": query.key, "query": query.text, "filters": query.to_filters()}
+                try:
+                    if interactor is None:
+                        driver, wait = navigator.initialize_driver()
+                        interactor = FilterInteractor(driver, wait, navigator)
+                    record["pages"] = self._search(navigator, interactor, query)
+                    record["status"] = "ok"
+                except Exception as e:
+                    print(f"Error searching {query}: {e}. Restarting browser session.")
+                    navigator.close_driver()
+                    interactor = None
+                    record["status"] = "failed"
+
+                record["duration"] = round(time.time() - started, 2)
+                self._write(record)
+                with self._write_lock:
+                    stats[record["status"]] += 1
+        finally:
+            navigator.close_driver()
+
+    def _search(self, navigator: PakWheelsNavigator, interactor: FilterInteractor,
+                query: SearchQuery) -> list[list[dict]]:
+        """Opens the query's results by URL and reads up to pages_per_query pages of listings."""
+        navigator.go_to_search_results(query)
+        pages = []
+        while True:
+            listings = interactor.get_current_listings_data()
+            pages.append([asdict(listing) for listing in listings])
+            if not listings or len(pages) >= self.pages_per_query:
+                return pages
+            if not navigator.go_to_next_page():
+                return pages
+
+    def _terminate_torn_line(self):
+        """Makes sure appends after a crash start on a fresh line."""
+        if not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0:
+            return
+        with open(self.output_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _write(self, record: dict):
+        with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read_columns(self) -> dict[str, list]:
+        """Flattens every successful query in the output file into one list per column."""
+        columns = {name: [] for name in DATASET_COLUMNS}
+        if not os.path.exists(self.output_path):
+            return columns
+        with open(self.output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("status") != "ok":
+                    continue
+                for page_number, page in enumerate(record["pages"], start=1):
+                    for listing in page:
+                        columns["query_key"].append(record["query_key"])
+                        columns["query"].append(record["query"])
+                        columns["page"].append(page_number)
+                        for name in DATASET_COLUMNS[3:]:
+                            columns[name].append(listing.get(name))
+        return columns
+
+    def write_dataset(self, dataset_path: str) -> str:
+        """
+        Writes all collected listings as one columnar dataset.
+
+        A .parquet path is written with pyarrow when it is installed; otherwise the columns
+        go to a JSON file of {column: [values]}, which pandas.DataFrame() reads directly.
+
+        Returns:
+            The path actually written.
+        """
+        columns = self.read_columns()
+        if dataset_path.endswith(".parquet"):
+            if pq is not None:
+                # Price is an int on most cards but free text ("Call for price") on some.
+                columns["price"] = [None if value is None else str(value) for value in columns["price"]]
+                pq.write_table(pa.table(columns), dataset_path)
+                print(f"Wrote {len(columns['query_key'])} rows to {dataset_path}.")
+                return dataset_path
+            print("pyarrow is not installed; writing the dataset as columnar JSON instead.")
+            dataset_path = dataset_path[:-len(".parquet")] + ".json"
+        with open(dataset_path, "w", encoding="utf-8") as f:
+            json.dump(columns, f)
+        print(f"Wrote {len(columns['query_key'])} rows to {dataset_path}.")
+        return dataset_path
@@ -7,7 +7,12 @@ from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, ElementNotInteractableException, ElementClickInterceptedException
 from .extractor import ListingExtractor
 from .models import ListingData
-from typing import List
+from .result_count import QuerySplitter, ResultCount, load_range_bounds, parse_result_count
+from .search_query import SearchQuery
+from .selector_registry import REGISTRY
+from typing import Iterator, List
+from bs4 import BeautifulSoup
+from core.filter_store import parse_option_labels
 
 
 class FilterInteractor:
@@ -20,42 +25,31 @@ class FilterInteractor:
         Args:
             driver: The Selenium WebDriver instance.
             wait: The Selenium WebDriverWait instance.
+            navigator: The PakWheelsNavigator that owns the driver.
         """
-        self.driver = driver
-        self.wait = wait
+        self._driver = driver
+        self._wait = wait
         self.navigator = navigator
 
+    # Read through the navigator so the interactor follows the new browser after a restart.
+    @property
+    def driver(self) -> WebDriver:
+        return self.navigator.driver or self._driver
+
+    @property
+    def wait(self) -> WebDriverWait:
+        return self.navigator.wait or self._wait
+
     def _handle_onesignal_popup(self):
         """Checks for and closes the OneSignal slidedown popup if present."""
-        try:
-            popup_container = WebDriverWait(self.driver, 5).until(
-                EC.visibility_of_element_located(
-                    (By.ID, "onesignal-slidedown-container"))
-            )
-            print("OneSignal popup detected. Attempting to close...")
-            close_button = popup_container.find_element(
-                By.CSS_SELECTOR, "button.onesignal-slidedown-cancel-button")
-            close_button.click()
-            WebDriverWait(self.driver, 5).until(
-                EC.invisibility_of_element_located(
-                    (By.ID, "onesignal-slidedown-container"))
-            )
-            print("OneSignal popup closed.")
-            time.sleep(0.5)
-        except TimeoutException:
-            print("OneSignal popup not found or did not appear within timeout.")
-        except NoSuchElementException:
-            print("Could not find the close button within the OneSignal popup.")
-        except Exception as e:
-            print(
-                f"An error occurred while trying to close the OneSignal popup: {e}")
+        self.navigator._handle_onesignal_popup()
 
     def _find_filter_group_element(self, filter_name: str) -> WebElement | None:
         """Finds the main container element for a given filter category name."""
         try:
             heading_xpath = f"//div[contains(@class, 'accordion-heading')][.//a[normalize-space()='{filter_name}']]"
-            heading_element = self.wait.until(
-                EC.presence_of_element_located((By.XPATH, heading_xpath)))
+            heading_element = self.navigator.wait_for(
+                "filter_group", EC.presence_of_element_located((By.XPATH, heading_xpath)))
             filter_group = heading_element.find_element(
                 By.XPATH, "./ancestor::div[contains(@class, 'accordion-group')]")
             return filter_group
@@ -144,6 +138,7 @@ class FilterInteractor:
             self.driver.execute_script(
                 "arguments[0].scrollIntoView(true);", more_choices_span)
             time.sleep(0.5)
+            self.navigator.rate_limiter.acquire("ajax")
 
             try:
                 self.driver.execute_script(
@@ -198,7 +193,7 @@ class FilterInteractor:
         try:
             action_func(*args, **kwargs)
 
-            self.wait.until(EC.url_changes(initial_url))
+            self.navigator.wait_for("filter_url_change", EC.url_changes(initial_url), optional=True)
             final_url = self.driver.current_url
             print(f"URL changed successfully to: {final_url}")
             return True
@@ -364,9 +359,10 @@ class FilterInteractor:
                                 print("Clicked Submit button in the filter modal.")
 
                                 try:
-                                    WebDriverWait(self.driver, 10).until(
+                                    self.navigator.wait_for("filter_ajax_loading",
                                         lambda d: d.find_element(
-                                            By.CSS_SELECTOR, "div.ajax-loading").get_attribute("style") == "display: none;"
+                                            By.CSS_SELECTOR, "div.ajax-loading").get_attribute("style") == "display: none;",
+                                        10
                                     )
                                 except Exception:
                                     print(
@@ -411,9 +407,9 @@ class FilterInteractor:
                     "Option was selected in 'More Choices' popup. Attempting to click Submit.")
                 try:
                     visible_modal_selector = (By.CSS_SELECTOR, "div.modal.in")
-                    modal_container = WebDriverWait(self.driver, 5).until(
+                    modal_container = self.navigator.wait_for("more_choices_modal",
                         EC.visibility_of_element_located(
-                            visible_modal_selector),
+                            visible_modal_selector), 5,
                         message="Could not find visible modal container (div.modal.in) before clicking Submit."
                     )
 
@@ -445,9 +441,9 @@ class FilterInteractor:
                             "arguments[0].click();", submit_button)
                         print("Clicked Submit button via JS.")
                         try:
-                            WebDriverWait(self.driver, 10).until(
+                            self.navigator.wait_for("more_choices_modal_hidden",
                                 EC.invisibility_of_element_located(
-                                    visible_modal_selector)
+                                    visible_modal_selector), 10
                             )
                             print("Modal closed after submit.")
                         except TimeoutException:
@@ -500,47 +496,26 @@ class FilterInteractor:
             to_input = None
             go_button = None
 
-            try:
-                filter_prefix = "".join(word[0]
-                                        for word in filter_name.split()).lower()
-                from_input = accordion_body.find_element(
-                    By.CSS_SELECTOR, f"input[id='{filter_prefix}_from']")
-                to_input = accordion_body.find_element(
-                    By.CSS_SELECTOR, f"input[id='{filter_prefix}_to']")
+            filter_prefix = "".join(word[0]
+                                    for word in filter_name.split()).lower()
+            from_input = REGISTRY.find(
+                accordion_body, "range_from", "search", prefix=filter_prefix)
+            to_input = REGISTRY.find(
+                accordion_body, "range_to", "search", prefix=filter_prefix)
+            if not from_input or not to_input:
                 print(
-                    f"Found range inputs by specific ID prefix: '{filter_prefix}'")
-            except NoSuchElementException:
-                print(
-                    f"Could not find range inputs by specific ID prefix '{filter_prefix}', trying placeholders...")
-                try:
-                    from_input = accordion_body.find_element(
-                        By.CSS_SELECTOR, "input[placeholder='From']")
-                    to_input = accordion_body.find_element(
-                        By.CSS_SELECTOR, "input[placeholder='To']")
-                    print("Found range inputs by placeholder.")
-                except NoSuchElementException:
-                    print(
-                        f"Error: Could not find 'From' or 'To' input fields for filter '{filter_name}' using common methods.")
-                    return
+                    f"Error: Could not find 'From' or 'To' input fields for filter '{filter_name}' using common methods.")
+                return
+            print(f"Found range inputs for filter '{filter_name}'.")
 
             # --- Find Go Button ---
-            try:
-                filter_prefix = "".join(word[0]
-                                        for word in filter_name.split()).lower()
-                go_button = accordion_body.find_element(
-                    By.CSS_SELECTOR, f"input[type='submit'][id='{filter_prefix}-go']")
-                print(f"Found Go button by specific ID: '{filter_prefix}-go'")
-            except NoSuchElementException:
+            go_button = REGISTRY.find(
+                accordion_body, "range_go", "search", prefix=filter_prefix)
+            if not go_button:
                 print(
-                    "Could not find Go button by specific ID, trying generic value='Go'...")
-                try:
-                    go_button = accordion_body.find_element(
-                        By.CSS_SELECTOR, "input[type='submit'][value='Go']")
-                    print("Found Go button by value='Go'.")
-                except NoSuchElementException:
-                    print(
-                        f"Error: Could not find the 'Go' button for filter '{filter_name}'.")
-                    return
+                    f"Error: Could not find the 'Go' button for filter '{filter_name}'.")
+                return
+            print(f"Found Go button for filter '{filter_name}'.")
 
             # --- Enter Values ---
             if from_input and min_value is not None:
@@ -598,6 +573,42 @@ class FilterInteractor:
                 f"An unexpected error occurred while applying range filter '{filter_name}': {e}")
 
     def get_current_listings_data(self) -> List[ListingData]:
+        """
+        Extracts the data of every listing on the current page.
+
+        With network capture active the listing cards are parsed from the response body
+        the browser already downloaded, without any DOM queries; otherwise (or if the
+        response is not available) the DOM is scraped.
+
+        Returns:
+            A list of ListingData objects, one for each listing found.
+        """
+        listings_data = self.get_listings_data_from_network()
+        if listings_data is not None:
+            self.navigator.results_page_loaded()
+            return listings_data
+        return self.get_listings_data_from_dom()
+
+    def get_listings_data_from_network(self) -> List[ListingData] | None:
+        """
+        Parses the listings of the current page from its captured document response.
+
+        Returns:
+            The listings, or None if capture is off or the response body is not available.
+        """
+        capture = self.navigator.network_capture
+        if not capture.active:
+            return None
+        current_url = self.driver.current_url
+        html = capture.document_body(self.driver, current_url)
+        if html is None:
+            print(f"No captured response for {current_url}, reading listings from the DOM.")
+            return None
+        listings_data = ListingExtractor().extract_listings_from_html(html, current_url)
+        print(f"Parsed {len(listings_data)} listings from the captured response.")
+        return listings_data
+
+    def get_listings_data_from_dom(self) -> List[ListingData]:
         """
         Finds all listing elements on the current page and extracts their data.
 
@@ -607,14 +618,14 @@ class FilterInteractor:
         listings_data = []
         extractor = ListingExtractor()
         try:
-            listings_container_selector = (
-                By.CSS_SELECTOR, "ul.search-results-mid")
-            self.wait.until(EC.presence_of_element_located(
-                listings_container_selector))
+            self.navigator.wait_for("listings_container", lambda d: REGISTRY.find(
+                d, "listings_container", "search", record=False))
+            REGISTRY.find(self.driver, "listings_container", "search")  # Records the settled outcome once.
+            self.navigator.results_page_loaded()
             time.sleep(1)
 
-            listing_elements = self.driver.find_elements(
-                By.CSS_SELECTOR, "li.classified-listing")
+            listing_elements = REGISTRY.find_all(
+                self.driver, "listing", "search")
             print(
                 f"Found {len(listing_elements)} listing elements on the page.")
 
@@ -636,6 +647,143 @@ class FilterInteractor:
 
         return listings_data
 
+    def compare_listing_sources(self) -> list[str]:
+        """
+        Reads the current page through both the network and DOM paths and lists the differences.
+
+        Returns:
+            One message per mismatch; empty if both paths agree. Network capture must be active.
+        """
+        network = self.get_listings_data_from_network()
+        if network is None:
+            return ["No captured response available for the current page."]
+        dom = self.get_listings_data_from_dom()
+
+        differences = []
+        if len(network) != len(dom):
+            differences.append(f"Listing count differs: network={len(network)}, dom={len(dom)}")
+        for index, (net, web) in enumerate(zip(network, dom)):
+            for field, net_value in vars(net).items():
+                dom_value = getattr(web, field)
+                if net_value != dom_value:
+                    differences.append(
+                        f"Listing {index} ({web.listing_id}) {field}: network={net_value!r}, dom={dom_value!r}")
+        return differences
+
+    def get_more_choices_options_from_network(self, filter_name: str) -> List[str] | None:
+        """
+        Opens a filter's 'More Choices' popup and reads its options from the AJAX response.
+
+        Returns:
+            The option labels without counts, or None if capture is off or nothing was captured.
+        """
+        if not self.navigator.network_capture.active:
+            return None
+        if not self.open_more_choices_popup(filter_name):
+            return None
+        html = self.navigator.network_capture.latest_ajax_body(self.driver)
+        if html is None:
+            return None
+        return parse_option_labels(BeautifulSoup(html, 'html.parser'))
+
+    def iter_pages(self, max_pages: int | None = None) -> Iterator[tuple[int, list[ListingData]]]:
+        """
+        Lazily yields result pages, only moving to the next page once the current one has
+        been consumed.
+
+        Args:
+            max_pages: Stop after this many pages (optional; default is all pages).
+
+        Yields:
+            (page_number, listings on that page) tuples.
+        """
+        page = 1
+        while True:
+            listings = self.get_current_listings_data()
+            if not listings:
+                print(f"No listings found on page {page}, stopping.")
+                return
+            yield page, listings
+            if max_pages is not None and page >= max_pages:
+                return
+            if not self.navigator.go_to_next_page():
+                return
+            page += 1
+
+    def iter_listings(self, max_pages: int | None = None) -> Iterator[tuple[int, ListingData]]:
+        """
+        Lazily yields listings page by page, only moving to the next page once the
+        current one has been consumed.
+
+        Args:
+            max_pages: Stop after this many pages (optional; default is all pages).
+
+        Yields:
+            (page_number, ListingData) tuples in the order they appear on the site.
+        """
+        for page, listings in self.iter_pages(max_pages):
+            for listing in listings:
+                yield page, listing
+
+    def count(self, filters: "dict | SearchQuery") -> ResultCount:
+        """
+        Reads how many results a filter set has, and its facet counts, from page 1 alone.
+
+        Opens the results URL unless the browser is already on it, so no filter clicks and
+        no paging are needed.
+
+        Args:
+            filters: A filter dict (either shape) or a SearchQuery.
+
+        Returns:
+            The ResultCount, with pages worked out from config "results_per_page".
+        """
+        query = SearchQuery.from_filters(filters)
+        if SearchQuery.from_url(self.driver.current_url) != query:
+            self.navigator.go_to_search_results(query)
+        self.navigator.wait_for("listings_container", lambda d: REGISTRY.find(
+            d, "listings_container", "search", record=False))
+        REGISTRY.find(self.driver, "listings_container", "search")  # Records the settled outcome once.
+        self.navigator.results_page_loaded()
+        result = parse_result_count(self.driver.page_source, query,
+                                    self.navigator.config.get("results_per_page", 25))
+        estimate = result.crawl_seconds(self.seconds_per_page())
+        print(f"{query}: {result.total} results ({result.source}), {result.pages} pages, "
+              f"~{estimate or 0:.0f}s to crawl.")
+        return result
+
+    def seconds_per_page(self) -> float:
+        """
+        Typical time to load one results page: the measured p50 from navigation to listings
+        present, plus the rate limiter's spacing.
+        """
+        load = self.navigator.latency.percentile("results_page_load", 50) or 3.0
+        return load + self.navigator.rate_limiter.interval("search")
+
+    def split_query(self, filters: "dict | SearchQuery", max_results: int | None = None) -> list[ResultCount]:
+        """
+        Cuts a filter set into sub-queries that each fit under the pagination ceiling.
+
+        Args:
+            filters: A filter dict (either shape) or a SearchQuery.
+            max_results: Results one query can page through (default: config
+                         "results_per_page" x "max_result_pages").
+
+        Returns:
+            ResultCounts of the sub-queries. They cover the original results except for
+            listings that show no option of a facet that was split on; the shortfall is logged.
+        """
+        config = self.navigator.config
+        if max_results is None:
+            max_results = config.get("results_per_page", 25) * config.get("max_result_pages", 100)
+        splitter = QuerySplitter(self.count, max_results,
+                                 range_bounds=load_range_bounds(config.get("filters_db_path", "filters.db")))
+        parts = splitter.split(SearchQuery.from_filters(filters))
+        print(f"Split into {len(parts)} sub-queries after loading {splitter.queries_loaded} result pages.")
+        if splitter.results_uncovered:
+            print(f"Warning: {splitter.results_uncovered} results fall outside every sub-query.")
+        return parts
+
     def sleep_driver(self, seconds: int = 1):
         """
         Pauses the WebDriver for a specified number of seconds.
@@ -649,44 +797,19 @@ class FilterInteractor:
         else:
             print("Warning: WebDriver not initialized. Cannot sleep.")
 
-    def create_filter_query_string(self, filters_dict):
+    def create_filter_query_string(self, filters_dict: "dict | SearchQuery") -> str:
         """
         Creates a single query string from a dictionary of applied filters,
         always placing the city last with a preceding 'in'.
         """
-        parts = []
-        city = None
-
-        for key, value in filters_dict.items():
-            if not (isinstance(value, dict) and "type" in value and "value" in value):
-                continue
-
-            if key.lower() == "city" and value["type"] == "option" and value["value"]:
-                city = value["value"]
-            else:
-                if value["type"] == "option" and value["value"]:
-                    parts.append(f"{value['value']}")
-                elif value["type"] == "range":
-                    min_str = value.get("min", "")
-                    max_str = value.get("max", "")
-                    parts.append(f"{key} {min_str}-{max_str}")
-
-        search_query = " ".join(parts).strip()
-
-        if city:
-            if search_query:
-                search_query += f" in {city}"
-            else:
-                search_query = f"in {city}"
-
-        return search_query
-
-    def _normalize_filter_dict(self, filters: dict[str, str]) -> dict:
-        return {k: {"type": "option", "value": v} for k, v in filters.items() if v}
+        return SearchQuery.from_filters(filters_dict).text
 
-    def enter_text_search(self, filters: dict[str, str]):
+    def enter_text_search(self, filters: "dict[str, str] | SearchQuery"):
         """
         Enters a text search in the search bar and submits the form.
+
+        Args:
+            filters: {"City": "Lahore", ...}, a typed filter dict, or a SearchQuery.
         """
         print("Entering text search...")
 
@@ -712,8 +835,7 @@ class FilterInteractor:
             print(f"Error: search input not ready: {e}")
             raise
 
-        keyword = self._normalize_filter_dict(filters)
-        keyword = self.create_filter_query_string(keyword)
+        keyword = SearchQuery.from_filters(filters).text
 
         if keyword:
             search_input.clear()
@@ -722,13 +844,11 @@ class FilterInteractor:
         else:
             print("No keyword provided; skipping input entry.")
 
-        query = self.create_filter_query_string(
-            self._normalize_filter_dict(filters))
         try:
             qp = self.driver.find_element(By.ID, "query_params")
             self.driver.execute_script(
-                "arguments[0].value = arguments[1];", qp, query)
-            print(f"Set hidden query_params to: {query}")
+                "arguments[0].value = arguments[1];", qp, keyword)
+            print(f"Set hidden query_params to: {keyword}")
         except NoSuchElementException:
             pass
 
@@ -0,0 +1,242 @@
+import hashlib
+import json
+from functools import cached_property
+from typing import Iterable
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+# Filter name -> path segment prefix of a results URL, e.g. ".../search/-/ct_lahore/tr_automatic/".
+# Filters without a known prefix are carried in the query string instead, so every
+# filter set still survives a to_url()/from_url() round trip.
+URL_SEGMENTS = {
+    "City": "ct",
+    "Make": "mk",
+    "Model": "md",
+    "Version": "vr",
+    "Price Range": "pr",
+    "Year": "yr",
+    "Model Year": "yr",
+    "Mileage": "ml",
+    "Engine Capacity": "ec",
+    "Transmission": "tr",
+    "Engine Type": "et",
+    "Color": "cl",
+    "Body Type": "bt",
+    "Assembly": "as",
+}
+SEGMENT_FILTERS = {}
+for _name, _prefix in URL_SEGMENTS.items():
+    SEGMENT_FILTERS.setdefault(_prefix, _name)  # "yr" reads back as Year.
+RANGE_FILTERS = {"Price Range", "Year", "Model Year", "Mileage", "Engine Capacity"}
+
+DEFAULT_SEARCH_URL = "https://www.pakwheels.com/used-cars/search/-/"
+
+
+# Spellings of the same filter; the URL cannot tell them apart, so queries use the target.
+FILTER_ALIASES = {"Model Year": "Year"}
+
+
+def _canonical_name(name: str) -> str:
+    """Matches a filter name to its known spelling ('city' -> 'City'); unknown names are kept."""
+    name = " ".join(str(name).split())
+    for known in URL_SEGMENTS:
+        if known.lower() == name.lower():
+            return FILTER_ALIASES.get(known, known)
+    return name
+
+
+def _canonical_value(value: str) -> str:
+    """Case, spacing and slug hyphens do not change which results an option selects."""
+    return " ".join(str(value).lower().replace("-", " ").split())
+
+
+def _as_bound(value) -> int | None:
+    if isinstance(value, int):
+        return value
+    text = str(value or "").strip().replace(",", "")
+    return int(text) if text.isdigit() else None
+
+
+class SearchQuery:
+    """
+    An immutable, canonical filter set for the used-car search.
+
+    Filters are normalized once on construction: names are matched to their known
+    spelling, empty options are dropped, range bounds are parsed and put in order, and
+    filters are sorted by name. Two queries for the same results compare and hash equal
+    however their dicts were written, so a SearchQuery (or its key) can be used as a
+    cache key or crawl label. The text-search keyword and the results URL are derived
+    from it on first use and then reused.
+    """
+
+    def __init__(self, options: Iterable[tuple[str, str]] = (),
+                 ranges: Iterable[tuple[str, int | None, int | None]] = ()):
+        """
+        Initializes the SearchQuery. Prefer from_filters() or from_url().
+
+        Args:
+            options: (filter name, option label) pairs.
+            ranges: (filter name, min, max) triples; either bound may be None.
+        """
+        by_name = {}
+        for name, value in options:
+            value = " ".join(str(value or "").split())
+            if value:
+                by_name[_canonical_name(name)] = ("option", value)
+        for name, low, high in ranges:
+            low, high = _as_bound(low), _as_bound(high)
+            if low is None and high is None:
+                continue
+            if low is not None and high is not None and low > high:
+                low, high = high, low
+            by_name[_canonical_name(name)] = ("range", low, high)
+        self.filters: tuple[tuple, ...] = tuple(
+            (name, *spec) for name, spec in sorted(by_name.items(), key=lambda item: item[0].lower()))
+        self._canonical = tuple(
+            (name.lower(), kind, _canonical_value(rest[0])) if kind == "option"
+            else (name.lower(), kind, *rest)
+            for name, kind, *rest in self.filters)
+        self._hash = hash(self._canonical)
+
+    @classmethod
+    def from_filters(cls, filters: "dict | SearchQuery") -> "SearchQuery":
+        """
+        Builds a query from either filter dict shape used in the tests.
+
+        Args:
+            filters: {"City": "Lahore"} or
+                     {"City": {"type": "option", "value": "Lahore"},
+                      "Price Range": {"type": "range", "min": 2500000, "max": 10000000}}.
+                     A SearchQuery is returned unchanged.
+        """
+        if isinstance(filters, SearchQuery):
+            return filters
+        options, ranges = [], []
+        for name, spec in filters.items():
+            if not isinstance(spec, dict):
+                options.append((name, spec))
+            elif spec.get("type") == "range":
+                ranges.append((name, spec.get("min"), spec.get("max")))
+            else:
+                options.append((name, spec.get("value")))
+        return cls(options, ranges)
+
+    @classmethod
+    def from_url(cls, url: str) -> "SearchQuery":
+        """Reads the filter set back out of a results URL (path segments and query string)."""
+        parts = urlsplit(url)
+        path = parts.path
+        if "/-/" in path:
+            path = path.split("/-/", 1)[1]
+        options, ranges = [], []
+        for segment in filter(None, path.split("/")):
+            prefix, _, rest = unquote(segment).partition("_")
+            name = SEGMENT_FILTERS.get(prefix)
+            if name is None or not rest:
+                continue  # Not a filter segment, e.g. a page or sort slug.
+            if name in RANGE_FILTERS:
+                low, _, high = rest.partition("_")
+                ranges.append((name, low, high))
+            else:
+                options.append((name, rest.replace("-", " ")))
+        bounds = {}
+        for key, value in parse_qsl(parts.query):
+            if key.endswith("_from"):
+                bounds.setdefault(key[:-len("_from")], [None, None])[0] = value
+            elif key.endswith("_to"):
+                bounds.setdefault(key[:-len("_to")], [None, None])[1] = value
+            elif key not in ("page", "sortby"):
+                options.append((key, value))
+        ranges.extend((name, low, high) for name, (low, high) in bounds.items())
+        return cls(options, ranges)
+
+    def to_filters(self) -> dict[str, dict]:
+        """Returns the filter set as a {name: {"type": ..., ...}} dict."""
+        filters = {}
+        for name, kind, *rest in self.filters:
+            if kind == "option":
+                filters[name] = {"type": "option", "value": rest[0]}
+            else:
+                filters[name] = {"type": "range", "min": rest[0], "max": rest[1]}
+        return filters
+
+    def get(self, name: str) -> tuple | None:
+        """Returns ("option", value) or ("range", min, max) for a filter, or None if it is not set."""
+        name = _canonical_name(name)
+        for filter_name, *spec in self.filters:
+            if filter_name == name:
+                return tuple(spec)
+        return None
+
+    def with_option(self, name: str, value: str) -> "SearchQuery":
+        """Returns a copy with one option filter added or replaced."""
+        return self._replace(name, ("option", value))
+
+    def with_range(self, name: str, low: int | None, high: int | None) -> "SearchQuery":
+        """Returns a copy with one range filter added or replaced."""
+        return self._replace(name, ("range", low, high))
+
+    def _replace(self, name: str, spec: tuple) -> "SearchQuery":
+        name = _canonical_name(name)
+        kept = [item for item in self.filters if item[0] != name] + [(name, *spec)]
+        return SearchQuery([(n, rest[0]) for n, kind, *rest in kept if kind == "option"],
+                           [(n, *rest) for n, kind, *rest in kept if kind == "range"])
+
+    @cached_property
+    def key(self) -> str:
+        """A short stable digest of the canonical form, usable as a file name or crawl label."""
+        payload = json.dumps(self._canonical, separators=(",", ":"))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    @cached_property
+    def text(self) -> str:
+        """The search bar keyword: options and ranges, then 'in <city>' last."""
+        parts, city = [], None
+        for name, kind, *rest in self.filters:
+            if kind == "option" and name == "City":
+                city = rest[0]
+            elif kind == "option":
+                parts.append(rest[0])
+            else:
+                low, high = rest
+                parts.append(f"{name} {'' if low is None else low}-{'' if high is None else high}")
+        keyword = " ".join(parts)
+        if city:
+            keyword = f"{keyword} in {city}" if keyword else f"in {city}"
+        return keyword
+
+    def to_url(self, search_url: str = DEFAULT_SEARCH_URL) -> str:
+        """
+        Returns the results URL for this filter set.
+
+        Args:
+            search_url: The "/used-cars/search/-/" base URL (config "search_url").
+        """
+        segments, params = [], []
+        for name, kind, *rest in self.filters:
+            prefix = URL_SEGMENTS.get(name)
+            if kind == "option":
+                slug = "-".join(rest[0].lower().split())
+                if prefix:
+                    segments.append(f"{prefix}_{quote(slug)}")
+                else:
+                    params.append((name, rest[0]))
+            else:
+                low, high = ("" if bound is None else str(bound) for bound in rest)
+                if prefix:
+                    segments.append(f"{prefix}_{low}_{high}")
+                else:
+                    params.extend([(f"{name}_from", low), (f"{name}_to", high)])
+        url = search_url.rstrip("/") + "/" + "".join(f"{segment}/" for segment in segments)
+        return f"{url}?{urlencode(params)}" if params else url
+
+    def __bool__(self) -> bool:
+        return bool(self.filters)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SearchQuery) and self._canonical == other._canonical
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"SearchQuery({self.text or '<no filters>'!r})"
@@ -0,0 +1,152 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+Locator = tuple[str, str]
+
+
+@dataclass
+class SelectorStats:
+    """Hit/miss counters for one locator of a registered selector."""
+    hits: int = 0
+    misses: int = 0
+    seconds: float = 0.0
+
+
+class SelectorRegistry:
+    """
+    Central registry of named selectors, each with an ordered chain of fallback locators.
+
+    Lookups use find_elements, so a miss costs one round trip instead of a full wait
+    timeout. The locator that worked last is remembered per page type and placeholder
+    values and tried first next time, and every attempt is counted so slow or dead
+    fallbacks show up in report(). Lookups made while polling inside a wait pass
+    record=False, so a page that is still loading neither counts misses nor picks winners.
+    """
+
+    def __init__(self):
+        self._chains: dict[str, tuple[Locator, ...]] = {}
+        self._winners: dict[tuple[str, str, tuple], int] = {}
+        self._stats: dict[tuple[str, Locator], SelectorStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, *locators: Locator):
+        """
+        Registers a selector. Locator values may contain str.format placeholders
+        (e.g. "input[id='{prefix}_from']") that are filled in at lookup time.
+        """
+        self._chains[name] = tuple(locators)
+
+    def locator(self, name: str, page_type: str = "", **params) -> Locator:
+        """Returns the preferred locator for a selector, for use with WebDriverWait conditions."""
+        return self._ordered(name, page_type, params)[0][1]
+
+    def css_chain(self, name: str) -> list[str]:
+        """Returns the CSS locators of a selector in preference order, for parsing raw HTML."""
+        return [value for _, (by, value) in self._ordered(name, "", {}) if by == By.CSS_SELECTOR]
+
+    def _ordered(self, name: str, page_type: str, params: dict) -> list[tuple[int, Locator]]:
+        chain = self._chains[name]
+        order = list(range(len(chain)))
+        winner = self._winners.get(self._winner_key(name, page_type, params))
+        if winner is not None:
+            order.remove(winner)
+            order.insert(0, winner)
+        return [(i, (chain[i][0], chain[i][1].format(**params) if params else chain[i][1])) for i in order]
+
+    @staticmethod
+    def _winner_key(name: str, page_type: str, params: dict) -> tuple[str, str, tuple]:
+        return page_type, name, tuple(sorted(params.items()))
+
+    def find_all(self, root, name: str, page_type: str = "", record: bool = True,
+                 **params) -> list[WebElement]:
+        """
+        Returns the elements matched by the first locator in the chain that matches anything.
+
+        Args:
+            root: A WebDriver or WebElement to search within.
+            name: The registered selector name.
+            page_type: Page the lookup runs on (e.g. 'search', 'detail'); winners are tracked
+                       per page type and placeholder values.
+            record: False for lookups repeated by a wait condition; record the settled
+                    outcome with one recorded lookup after the wait instead.
+            **params: Values for placeholders in the locator templates.
+        """
+        for index, locator in self._ordered(name, page_type, params):
+            started = time.perf_counter()
+            elements = root.find_elements(*locator)
+            if record:
+                self._record(name, self._chains[name][index], bool(elements), time.perf_counter() - started)
+            if elements:
+                if record:
+                    with self._lock:
+                        self._winners[self._winner_key(name, page_type, params)] = index
+                return elements
+        return []
+
+    def find(self, root, name: str, page_type: str = "", record: bool = True,
+             **params) -> WebElement | None:
+        """Like find_all, but returns only the first match or None."""
+        elements = self.find_all(root, name, page_type, record, **params)
+        return elements[0] if elements else None
+
+    def _record(self, name: str, locator: Locator, hit: bool, seconds: float):
+        with self._lock:
+            stats = self._stats.setdefault((name, locator), SelectorStats())
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+            stats.seconds += seconds
+
+    def stats(self) -> dict[tuple[str, Locator], SelectorStats]:
+        """Returns a snapshot of the per-locator counters."""
+        with self._lock:
+            return {key: SelectorStats(s.hits, s.misses, s.seconds) for key, s in self._stats.items()}
+
+    def report(self) -> str:
+        """Formats the counters, most time wasted on misses first."""
+        rows = sorted(self.stats().items(),
+                      key=lambda item: (item[1].misses, item[1].seconds), reverse=True)
+        lines = [f"{'selector':<24} {'locator':<60} {'hits':>6} {'misses':>6} {'secs':>8}"]
+        for (name, (by, value)), s in rows:
+            lines.append(f"{name:<24} {(by + '=' + value)[:60]:<60} {s.hits:>6} {s.misses:>6} {s.seconds:>8.2f}")
+        return "\n".join(lines)
+
+
+REGISTRY = SelectorRegistry()
+
+# --- Search results page ---
+REGISTRY.register("listing", (By.CSS_SELECTOR, "li.classified-listing"))
+REGISTRY.register("listings_container",
+                  (By.CSS_SELECTOR, "ul.search-results-mid"),
+                  (By.CSS_SELECTOR, ".search-results"))
+REGISTRY.register("listing_link", (By.CSS_SELECTOR, "a.car-name.ad-detail-path"))
+REGISTRY.register("listing_price", (By.CSS_SELECTOR, ".price-details"))
+REGISTRY.register("listing_city", (By.CSS_SELECTOR, ".search-vehicle-info li:first-child"))
+REGISTRY.register("listing_specs", (By.CSS_SELECTOR, ".search-vehicle-info-2 li"))
+REGISTRY.register("listing_pictures", (By.CSS_SELECTOR, ".total-pictures-bar"))
+REGISTRY.register("listing_updated", (By.CSS_SELECTOR, ".dated"))
+REGISTRY.register("result_count",
+                  (By.CSS_SELECTOR, ".search-pagi"),
+                  (By.CSS_SELECTOR, ".search-title-area"),
+                  (By.CSS_SELECTOR, ".pagination"))
+REGISTRY.register("range_from",
+                  (By.CSS_SELECTOR, "input[id='{prefix}_from']"),
+                  (By.CSS_SELECTOR, "input[placeholder='From']"))
+REGISTRY.register("range_to",
+                  (By.CSS_SELECTOR, "input[id='{prefix}_to']"),
+                  (By.CSS_SELECTOR, "input[placeholder='To']"))
+REGISTRY.register("range_go",
+                  (By.CSS_SELECTOR, "input[type='submit'][id='{prefix}-go']"),
+                  (By.CSS_SELECTOR, "input[type='submit'][value='Go']"))
+
+# --- Listing detail page ---
+REGISTRY.register("detail_specs_table", (By.CSS_SELECTOR, "table.table-engine-detail"))
+REGISTRY.register("detail_ready", (By.CSS_SELECTOR, "table.table-engine-detail, .price-box"))
+REGISTRY.register("detail_price",
+                  (By.CSS_SELECTOR, ".price-box strong"),
+                  (By.CSS_SELECTOR, ".light-gallery-user-info strong.generic-white"))
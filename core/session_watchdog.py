@@ -0,0 +1,230 @@
+import functools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import urllib3
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+
+# Navigator methods that can safely run again after a restart.
+IDEMPOTENT_ACTIONS = ("go_to_search_page", "go_to_search_results", "go_to_page",
+                      "go_to_comparison_page", "is_on_comparison_page", "is_on_search_page")
+
+# WebDriver commands that may start or wait for a page load. Other commands get the short
+# command_timeout budget, unless one of these started within hang_timeout before them:
+# chromedriver holds later commands until a pending navigation finishes.
+PAGE_LOAD_COMMANDS = (Command.GET, Command.GO_BACK, Command.GO_FORWARD, Command.REFRESH,
+                      Command.CLICK_ELEMENT, Command.SEND_KEYS_TO_ELEMENT,
+                      Command.W3C_EXECUTE_SCRIPT, Command.W3C_EXECUTE_SCRIPT_ASYNC)
+
+# What a dead browser or driver service surfaces as: protocol errors, or connection
+# errors from the HTTP client once the service process is gone.
+SESSION_ERRORS = (WebDriverException, urllib3.exceptions.HTTPError, ConnectionError)
+
+
+class SessionWatchdog:
+    """
+    Pings the WebDriver session from a background thread and restarts the browser when it dies or hangs.
+
+    Pings go straight to the driver service over HTTP with a short timeout and cost one
+    GET /url round trip. While a command is in flight the driver queues session requests
+    behind it, so only the service's /status is pinged then, and the command itself counts
+    as hung once it outlives its budget: command_timeout for element lookups, reads and
+    the like, hang_timeout for commands that may wait for a page load and for any command
+    issued while such a navigation may still be pending. When the session is found dead, the driver
+    service is killed, which turns a command that is stuck on the test thread into an
+    immediate error. The restart itself happens on the thread that uses the
+    navigator: wrapped idempotent actions, and check(), re-initialize the browser with the
+    same config, reopen the last good URL and retry the action once.
+    """
+
+    def __init__(self, navigator, interval: float = 5, ping_timeout: float = 3,
+                 failures_before_restart: int = 2, hang_timeout: float = 120,
+                 command_timeout: float = 15):
+        """
+        Initializes the SessionWatchdog.
+
+        Args:
+            navigator: The PakWheelsNavigator to watch.
+            interval: Seconds between pings.
+            ping_timeout: Seconds a ping may take before it counts as failed.
+            failures_before_restart: Consecutive failed pings that mark the session dead.
+            hang_timeout: Seconds a command in PAGE_LOAD_COMMANDS may run before the
+                          browser is considered hung.
+            command_timeout: The same budget for every other command.
+        """
+        self.navigator = navigator
+        self.interval = interval
+        self.ping_timeout = ping_timeout
+        self.failures_before_restart = failures_before_restart
+        self.hang_timeout = hang_timeout
+        self.command_timeout = command_timeout
+        self.last_url = None
+        self.healthy = True
+        self.pings = 0
+        self.ping_failures = 0
+        self.restarts = 0
+        self.last_restart_reason = None
+        self._consecutive_failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval + self.ping_timeout)
+            self._thread = None
+
+    def ping(self, driver=None) -> float:
+        """
+        Asks the driver service for the session's current URL.
+
+        Args:
+            driver: Driver to ping (defaults to the navigator's current one).
+
+        Returns:
+            Round trip time in seconds.
+
+        Raises:
+            WebDriverException: If the session is gone or did not answer within ping_timeout.
+        """
+        driver = driver or self.navigator.driver
+        if driver is None:
+            raise WebDriverException("No WebDriver session.")
+        started = time.perf_counter()
+        value = self._get(driver, f"/session/{driver.session_id}/url")
+        if isinstance(value, dict):  # Error payload, e.g. invalid session id.
+            raise WebDriverException(f"Session ping failed: {value.get('message') or value}")
+        elapsed = time.perf_counter() - started
+        if value and value.startswith("http"):
+            self.last_url = value
+        return elapsed
+
+    def ping_service(self, driver):
+        """Checks that the driver service process is up and answering, without touching the session."""
+        if driver.service.process is not None and driver.service.process.poll() is not None:
+            raise WebDriverException("Driver service process has exited.")
+        self._get(driver, "/status")
+
+    def _get(self, driver, path: str):
+        try:
+            with urllib.request.urlopen(f"{driver.service.service_url}{path}",
+                                        timeout=self.ping_timeout) as resp:
+                return json.load(resp).get("value")
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise WebDriverException(f"Session ping failed: {e}") from e
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            driver = self.navigator.driver
+            if not self.healthy or driver is None:
+                continue
+            busy_since = self.navigator.command_started
+            if busy_since is not None:
+                command = self.navigator.command_name
+                deadline = self._deadline(command, busy_since)
+                if time.monotonic() > deadline:
+                    self._mark_dead(driver, f"'{command}' running for over {deadline - busy_since:.0f}s")
+                    continue
+            self.pings += 1
+            try:
+                if busy_since is None:
+                    self.navigator.latency.record("session_ping", self.ping(driver))
+                else:
+                    self.ping_service(driver)
+                self._consecutive_failures = 0
+            except WebDriverException as e:
+                if busy_since is None and self.navigator.command_started is not None:
+                    continue  # A command started meanwhile and the ping queued behind it.
+                self.ping_failures += 1
+                self._consecutive_failures += 1
+                print(f"Watchdog: {e.msg} ({self._consecutive_failures}/{self.failures_before_restart})")
+                if self._consecutive_failures >= self.failures_before_restart:
+                    self._mark_dead(driver, e.msg)
+
+    def _deadline(self, command: str, started: float) -> float:
+        """Monotonic time by which a command that started at `started` should have returned."""
+        if command in PAGE_LOAD_COMMANDS:
+            return started + self.hang_timeout
+        deadline = started + self.command_timeout
+        navigation_started = self.navigator.navigation_started
+        if navigation_started is not None:
+            # The command may be queued behind a navigation that is still within its budget.
+            deadline = max(deadline, navigation_started + self.hang_timeout)
+        return deadline
+
+    def _mark_dead(self, driver, reason: str):
+        if driver is not self.navigator.driver:
+            return  # Already replaced by a restart on the test thread.
+        self.healthy = False
+        self.last_restart_reason = reason
+        try:
+            # Unblocks a command stuck on the test thread; it fails and the wrapper recovers.
+            driver.service.process.kill()
+        except Exception:
+            pass
+
+    def check(self):
+        """Restarts the browser now if the watchdog has marked the session dead."""
+        if not self.healthy:
+            self.recover(self.last_restart_reason or "session marked dead")
+
+    def recover(self, reason: str):
+        """Re-initializes the browser with the same config and reopens the last good URL."""
+        self.healthy = False
+        self.restarts += 1
+        self.last_restart_reason = reason
+        print(f"Watchdog: restarting browser ({reason}); reopening {self.last_url}")
+        self.navigator.recover_session(self.last_url)
+        self.healthy = True
+        self._consecutive_failures = 0
+
+    def wrap(self, action):
+        """Wraps an idempotent navigator action so it survives one browser restart."""
+        @functools.wraps(action)
+        def guarded(*args, **kwargs):
+            self.check()
+            try:
+                return action(*args, **kwargs)
+            except SESSION_ERRORS as e:
+                if self.healthy and self.alive():
+                    raise
+                self.recover(f"{action.__name__} failed: {e}")
+                return action(*args, **kwargs)
+        return guarded
+
+    def install(self):
+        """Wraps the navigator's idempotent actions and starts pinging."""
+        for name in IDEMPOTENT_ACTIONS:
+            setattr(self.navigator, name, self.wrap(getattr(self.navigator, name)))
+        self.start()
+
+    def alive(self) -> bool:
+        """Whether the session answers a ping right now."""
+        try:
+            self.ping()
+            return True
+        except WebDriverException:
+            return False
+
+    def metrics(self) -> dict:
+        """Returns ping counts, ping latency percentiles and restart counts."""
+        return {
+            "healthy": self.healthy,
+            "pings": self.pings,
+            "ping_failures": self.ping_failures,
+            "ping_p50": self.navigator.latency.percentile("session_ping", 50),
+            "ping_p99": self.navigator.latency.percentile("session_ping", 99),
+            "restarts": self.restarts,
+            "last_restart_reason": self.last_restart_reason,
+        }
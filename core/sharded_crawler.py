@@ -0,0 +1,250 @@
+import hashlib
+import json
+import math
+import multiprocessing
+import queue
+import random
+import time
+from dataclasses import asdict
+
+import requests
+
+from .crawl_planner import CrawlPlanner, Shard
+from .extractor import ListingExtractor
+from .rate_limiter import TokenBucketLimiter, shared_limiter
+from .result_count import QuerySplitter, ResultCount, load_range_bounds, parse_result_count
+from .search_query import DEFAULT_SEARCH_URL, SearchQuery
+
+
+class SharedBloomFilter:
+    """
+    A Bloom filter in shared memory, so every worker process sees which listing ids were already crawled.
+
+    The bit array is a RawArray handed to the workers at start-up; one lock guards
+    check-and-set, taken once per results page. False positives drop roughly error_rate
+    of the unique listings; there are no false negatives, so no listing is stored twice.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        """
+        Initializes the SharedBloomFilter.
+
+        Args:
+            capacity: Number of distinct ids the filter is sized for.
+            error_rate: Chance that a new id is mistaken for a seen one at full capacity.
+        """
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = multiprocessing.RawArray("B", (self.size + 7) // 8)
+        self._lock = multiprocessing.Lock()
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add_many(self, keys: list[str]) -> list[bool]:
+        """Adds keys; returns True for each key that was not in the filter before."""
+        positions = [self._positions(key) for key in keys]
+        added = []
+        with self._lock:
+            for key_positions in positions:
+                if all(self._bits[p >> 3] & (1 << (p & 7)) for p in key_positions):
+                    added.append(False)
+                    continue
+                for p in key_positions:
+                    self._bits[p >> 3] |= 1 << (p & 7)
+                added.append(True)
+        return added
+
+
+def _page_url(query_url: str, page: int) -> str:
+    if page == 1:
+        return query_url
+    return f"{query_url}{'&' if '?' in query_url else '?'}page={page}"
+
+
+def _crawl_worker(worker: int, tasks: list[tuple[str, str]], results, seen: SharedBloomFilter,
+                  max_pages: int, limiter: TokenBucketLimiter, user_agents: list[str]):
+    """Fetches every page of its shard's queries over plain HTTP and parses the listing cards."""
+    extractor = ListingExtractor()
+    session = requests.Session()
+    try:
+        for query_key, query_url in tasks:
+            previous_ids = None
+            for page in range(1, max_pages + 1):
+                url = _page_url(query_url, page)
+                try:
+                    resp = limiter.request(session, url, "search", timeout=30,
+                                           headers={"User-Agent": random.choice(user_agents)} if user_agents else None)
+                    resp.raise_for_status()
+                except requests.RequestException as e:
+                    results.put(("error", worker, url, str(e)))
+                    break
+                listings = extractor.extract_listings_from_html(resp.text, url)
+                ids = [listing.listing_id or listing.url or "" for listing in listings]
+                # Past the last page the site repeats the last page instead of returning nothing.
+                if not listings or ids == previous_ids:
+                    break
+                previous_ids = ids
+                fresh = [asdict(listing) for listing, new in zip(listings, seen.add_many(ids)) if new]
+                results.put(("page", worker, query_key, page, fresh, len(listings) - len(fresh)))
+            else:
+                # Every page up to the cap was full, so the query likely has more than it showed.
+                results.put(("capped", worker, query_key))
+    finally:
+        results.put(("done", worker))
+
+
+class ShardedCrawler:
+    """
+    Enumerates listings beyond the pagination cap by crawling facet shards in parallel processes.
+
+    The search space is cut by a facet's stored options (CrawlPlanner), optionally crossed
+    with year ranges; any piece still over the pagination cap is split further with a
+    QuerySplitter before the pieces are dealt to shards. Each worker process owns
+    one shard and fetches its pages over plain HTTP within one rate limiter shared by all
+    workers, parsing them with the same HTML listing parser the network-capture path
+    uses, so no browser is involved. Listings are
+    deduplicated across all workers by listing_id through a SharedBloomFilter and streamed
+    to one JSONL file by the parent.
+    """
+
+    def __init__(self, output_path: str, workers: int = 4, max_pages: int | None = None,
+                 limiter: TokenBucketLimiter | None = None, config_path: str = "config.json",
+                 capacity: int = 1_000_000, search_url: str | None = None):
+        """
+        Initializes the ShardedCrawler.
+
+        Args:
+            output_path: JSONL file every new listing is appended to.
+            workers: Worker processes, one shard each.
+            max_pages: Pages read per query (default: config "max_result_pages").
+            limiter: Rate limiter the workers share (default: this process's shared limiter).
+            config_path: Config supplying search_url, user agents and the filter DB path.
+            capacity: Expected number of distinct listings, for sizing the Bloom filter.
+            search_url: Overrides config "search_url", e.g. to crawl a local replay server.
+        """
+        with open(config_path, "r") as f:
+            self.config = json.load(f)
+        self.output_path = output_path
+        self.workers = max(1, workers)
+        self.max_pages = max_pages or self.config.get("max_result_pages", 100)
+        self.per_page = self.config.get("results_per_page", 25)
+        self.limiter = limiter or shared_limiter(config_path)
+        self.capacity = capacity
+        self.search_url = search_url or self.config.get("search_url") or DEFAULT_SEARCH_URL
+
+    def plan(self, facet: str = "City", year_ranges: list[tuple[int, int]] | None = None,
+             base: "SearchQuery | dict | None" = None) -> list[Shard]:
+        """
+        Splits the search space into one shard per worker from the stored facet counts.
+
+        Args:
+            facet: Facet whose options divide the space, e.g. "City" or "Make".
+            year_ranges: (from, to) model years each option is further cut into (optional).
+            base: Filters applied to every query (optional).
+
+        Options (or option-year pieces) whose stored count exceeds results_per_page x
+        max_pages are loaded and split with a QuerySplitter before being dealt out.
+        """
+        planner = CrawlPlanner(self.config.get("filters_db_path", "filters.db"))
+        base = SearchQuery.from_filters(base or {})
+        max_results = self.per_page * self.max_pages
+        splitter = QuerySplitter(self._count, max_results,
+                                 range_bounds=load_range_bounds(self.config.get("filters_db_path", "filters.db")))
+        units = []
+        for option, count in planner.facet_counts(facet).items():
+            query = base.with_option(facet, option)
+            pieces = ([(query.with_range("Year", low, high), count / len(year_ranges)) for low, high in year_ranges]
+                      if year_ranges else [(query, count)])
+            for piece, expected in pieces:
+                if expected <= max_results:
+                    units.append((piece, round(expected)))
+                    continue
+                for part in splitter.split(piece):
+                    if part.total is not None and part.total > max_results:
+                        print(f"Warning: {part.query} has {part.total} results, over the cap of {max_results}.")
+                    units.append((part.query, round(expected) if part.total is None else part.total))
+        if splitter.queries_loaded:
+            print(f"Split oversized options after loading {splitter.queries_loaded} result pages.")
+        return planner.deal(units, self.workers, f"'{facet}'")
+
+    def _count(self, query: SearchQuery) -> ResultCount:
+        """Loads a query's first results page over HTTP and reads its result and facet counts."""
+        try:
+            resp = self.limiter.request(requests, query.to_url(self.search_url), "search", timeout=30)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Warning: could not count {query}: {e}")
+            return ResultCount(query, None, per_page=self.per_page)
+        return parse_result_count(resp.text, query, self.per_page)
+
+    def run(self, shards: list[Shard]) -> dict[str, float]:
+        """
+        Crawls every shard, one worker process per shard.
+
+        A worker that dies without reporting back (OOM kill, a crashed interpreter) is noticed
+        while the results queue is idle and its shard is counted as failed.
+
+        Returns:
+            Counts of pages, listings stored, duplicates dropped, errors, queries that still
+            filled every page up to the cap and shards whose worker died, plus the elapsed
+            seconds and listings per second.
+        """
+        seen = SharedBloomFilter(self.capacity)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_crawl_worker, daemon=True,
+                args=(worker, [(query.key, query.to_url(self.search_url)) for query in shard.queries],
+                      results, seen, self.max_pages, self.limiter, self.config.get("uset_agents", [])))
+            for worker, shard in enumerate(shards)]
+
+        stats = {"pages": 0, "listings": 0, "duplicates": 0, "errors": 0, "capped_queries": 0,
+                 "failed_shards": 0}
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        running = set(range(len(processes)))
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            while running:
+                try:
+                    message = results.get(timeout=5)
+                except queue.Empty:
+                    # A worker flushes its messages before it exits, so one that is gone
+                    # while the queue is idle and never said "done" died mid-shard.
+                    for worker in sorted(running):
+                        if not processes[worker].is_alive():
+                            running.discard(worker)
+                            stats["failed_shards"] += 1
+                            print(f"Worker {worker} died (exit code {processes[worker].exitcode}); "
+                                  f"shard of {len(shards[worker].queries)} queries did not finish.")
+                    continue
+                kind = message[0]
+                if kind == "done":
+                    running.discard(message[1])
+                elif kind == "capped":
+                    stats["capped_queries"] += 1
+                    print(f"Worker {message[1]}: {message[2]} filled all {self.max_pages} pages; "
+                          f"it may have more listings than the site pages through.")
+                elif kind == "error":
+                    stats["errors"] += 1
+                    print(f"Worker {message[1]}: failed to fetch {message[2]}: {message[3]}")
+                else:
+                    _, _, query_key, page, listings, duplicates = message
+                    stats["pages"] += 1
+                    stats["listings"] += len(listings)
+                    stats["duplicates"] += duplicates
+                    for listing in listings:
+                        out.write(json.dumps({"query_key": query_key, "page": page, **listing}) + "\n")
+        for process in processes:
+            process.join()
+
+        stats["seconds"] = time.perf_counter() - started
+        stats["listings_per_second"] = stats["listings"] / stats["seconds"] if stats["seconds"] else 0.0
+        print(f"Crawled {stats['listings']} listings ({stats['duplicates']} duplicates dropped) "
+              f"from {stats['pages']} pages in {stats['seconds']:.1f}s "
+              f"with {len(processes)} workers: {stats['listings_per_second']:.1f} listings/s.")
+        return stats
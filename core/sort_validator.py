@@ -0,0 +1,83 @@
+from typing import Callable, Iterable
+
+from .models import ListingData
+
+
+def _year(listing: ListingData) -> int | None:
+    return int(listing.year) if listing.year and str(listing.year).strip().isdigit() else None
+
+
+def _price(listing: ListingData) -> int | None:
+    return listing.price if isinstance(listing.price, int) else None
+
+
+class SortOrderValidator:
+    """
+    Checks that listings arrive in the order promised by an apply_sort option.
+
+    Only the previous value is kept, so memory stays constant no matter how many
+    pages are streamed through it, and ordering is checked across page boundaries.
+    """
+
+    # sort option -> (field label, value getter, descending)
+    SORT_KEYS: dict[str, tuple[str, Callable[[ListingData], int | None], bool]] = {
+        "Updated Date: Recent First": ("updated age", lambda l: l.updated_age, False),
+        "Updated Date: Oldest First": ("updated age", lambda l: l.updated_age, True),
+        "Price: Low to High": ("price", _price, False),
+        "Price: High to Low": ("price", _price, True),
+        "Model Year: Latest First": ("year", _year, True),
+        "Model Year: Oldest First": ("year", _year, False),
+        "Mileage: Low to High": ("mileage", lambda l: l.mileage, False),
+        "Mileage: High to Low": ("mileage", lambda l: l.mileage, True),
+    }
+
+    def __init__(self, sort_option: str, fail_fast: bool = False):
+        """
+        Initializes the SortOrderValidator.
+
+        Args:
+            sort_option: One of the apply_sort dropdown labels (e.g., 'Price: High to Low').
+            fail_fast: Stop consuming listings at the first violation.
+        """
+        if sort_option not in self.SORT_KEYS:
+            raise ValueError(f"Unsupported sort option: {sort_option}")
+        self.sort_option = sort_option
+        self.field, self.get_value, self.descending = self.SORT_KEYS[sort_option]
+        self.fail_fast = fail_fast
+        self.checked = 0
+        self._previous = None
+        self._previous_id = None
+
+    def check(self, page: int, listing: ListingData) -> str | None:
+        """Checks one listing against the last one seen. Returns a violation message or None."""
+        self.checked += 1
+        value = self.get_value(listing)
+        if value is None:
+            return f"Page {page} (ID: {listing.listing_id}): missing {self.field}."
+
+        previous, previous_id = self._previous, self._previous_id
+        self._previous, self._previous_id = value, listing.listing_id
+        if previous is None:
+            return None
+        if (value > previous) if self.descending else (value < previous):
+            return (f"Page {page} (ID: {listing.listing_id}): {self.field} {value} is out of order "
+                    f"after {previous} (ID: {previous_id}) for '{self.sort_option}'.")
+        return None
+
+    def validate(self, listings: Iterable[tuple[int, ListingData]]) -> list[str]:
+        """
+        Streams (page, listing) pairs, e.g. from FilterInteractor.iter_listings().
+
+        Returns:
+            The violations found; at most one when fail_fast is set.
+        """
+        violations = []
+        for page, listing in listings:
+            violation = self.check(page, listing)
+            if violation:
+                violations.append(violation)
+                if self.fail_fast:
+                    print(f"Sort violation found, stopping early: {violation}")
+                    break
+        print(f"Checked {self.checked} listings for '{self.sort_option}'.")
+        return violations
@@ -0,0 +1,281 @@
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from .listing_history import ListingHistoryStore
+from .models import ListingData
+from .search_interactor import FilterInteractor
+from .search_query import SearchQuery
+from .session_watchdog import SESSION_ERRORS
+
+
+@dataclass
+class SweepState:
+    """Everything needed to continue a multi-page sweep where it stopped."""
+    name: str
+    filters: dict = field(default_factory=dict)
+    page: int = 1
+    page_url: str | None = None
+    processed_ids: list[str] = field(default_factory=list)
+    mismatches: list[str] = field(default_factory=list)
+    crawl_id: int | None = None
+    finished: bool = False
+
+
+class SweepCheckpoint:
+    """Persists a SweepState as JSON, replacing the file atomically so a crash mid-write keeps the previous state."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> SweepState | None:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return SweepState(**json.load(f))
+        except (OSError, TypeError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable sweep checkpoint '{self.path}': {e}")
+            return None
+
+    def save(self, state: SweepState):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(state), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ListingSweep:
+    """
+    Walks search result pages with a per-page check, checkpointing after every page.
+
+    If the browser dies mid-sweep (a failed command plus a session that no longer answers;
+    other driver errors are re-raised) the navigator is restarted, the last checkpointed page
+    is reopened and listings that were already checked are skipped, so nothing is done
+    twice. A later run with the same name and filters picks up from the checkpoint file.
+    """
+
+    def __init__(self, navigator, name: str, filters: dict, max_restarts: int = 3,
+                 history: ListingHistoryStore | None = None):
+        """
+        Initializes the ListingSweep.
+
+        Args:
+            navigator: The PakWheelsNavigator to drive; it is re-initialized on crashes.
+            name: Identifies the sweep; also names its checkpoint file.
+            filters: The filters the sweep applies. A checkpoint recorded for a different
+                     filter set (compared in canonical SearchQuery form) is discarded.
+            max_restarts: Browser restarts allowed before the crash is re-raised.
+            history: Store every listing seen is appended to, as one crawl per sweep
+                     (a resumed sweep keeps appending to the same crawl). The crawl is
+                     stored as 'partial' and only becomes 'full' once the sweep has
+                     walked every result page, so diffs never compare a capped sweep.
+        """
+        self.navigator = navigator
+        self.filters = filters
+        self.max_restarts = max_restarts
+        self.history = history
+        checkpoint_dir = navigator.config.get("sweep_checkpoint_dir", "checkpoints")
+        safe_name = re.sub(r"[^\w.-]+", "_", name)
+        self.checkpoint = SweepCheckpoint(os.path.join(checkpoint_dir, f"{safe_name}.json"))
+        self.state = self._initial_state(name)
+        if history and self.state.crawl_id is None:
+            self.state.crawl_id = history.start_crawl(name, kind="partial")
+
+    def _initial_state(self, name: str) -> SweepState:
+        state = self.checkpoint.load()
+        if (state and not state.finished and state.page_url
+                and SearchQuery.from_filters(state.filters) == SearchQuery.from_filters(self.filters)):
+            print(f"Resuming sweep '{name}' at page {state.page} "
+                  f"({len(state.processed_ids)} listings already checked).")
+            return state
+        return SweepState(name=name, filters=self.filters)
+
+    def run(self, apply_filters: Callable[[FilterInteractor], None],
+            check_page: Callable[[int, list[ListingData]], list[str]],
+            max_pages: int | None = None) -> list[str]:
+        """
+        Runs (or resumes) the sweep.
+
+        Args:
+            apply_filters: Applies the filters on a fresh search page; skipped when resuming.
+            check_page: Receives the page number and that page's not-yet-checked listings
+                        and returns mismatch messages.
+            max_pages: Stop after this many pages (optional; default is all pages).
+
+        Returns:
+            All mismatches, including those recorded before a crash or in an earlier run.
+        """
+        restarts = 0
+        while True:
+            try:
+                complete = self._run_pages(apply_filters, check_page, max_pages)
+                break
+            except SESSION_ERRORS as e:
+                # Element timeouts and stale elements are WebDriverExceptions too; only a
+                # session that is really gone is worth a restart.
+                if self._session_alive():
+                    raise
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise
+                print(f"Browser failed on page {self.state.page} ({e}); "
+                      f"restarting ({restarts}/{self.max_restarts}).")
+                if self.navigator.watchdog:
+                    self.navigator.watchdog.recover(f"sweep failed on page {self.state.page}")
+                else:
+                    self.navigator.recover_session()
+
+        if self.history and complete:
+            self.history.set_crawl_kind(self.state.crawl_id, "full")
+        self.state.finished = True
+        self.checkpoint.clear()
+        return self.state.mismatches
+
+    def _run_pages(self, apply_filters, check_page, max_pages) -> bool:
+        """Walks the pages from the checkpoint on; returns False if max_pages cut the sweep short."""
+        navigator = self.navigator
+        if self.state.page_url:
+            navigator.driver.get(self.state.page_url)
+        else:
+            navigator.go_to_search_page()
+            apply_filters(FilterInteractor(navigator.driver, navigator.wait, navigator))
+            self.state.page_url = navigator.driver.current_url
+            self.checkpoint.save(self.state)
+        interactor = FilterInteractor(navigator.driver, navigator.wait, navigator)
+
+        processed = set(self.state.processed_ids)
+        while True:
+            listings = interactor.get_current_listings_data()
+            if not listings:
+                self._raise_if_browser_died()
+                print(f"No listings found on page {self.state.page}, stopping.")
+                return True
+            if self.history:
+                self.history.add_listings(self.state.crawl_id, listings)
+            pending = [listing for listing in listings if listing.listing_id not in processed]
+            print(f"Page {self.state.page}: {len(pending)} of {len(listings)} listings to check.")
+            if pending:
+                self.state.mismatches.extend(check_page(self.state.page, pending))
+                for listing in pending:
+                    processed.add(listing.listing_id)
+                    self.state.processed_ids.append(listing.listing_id)
+                self.checkpoint.save(self.state)
+
+            if max_pages is not None and self.state.page >= max_pages:
+                return False
+            if not navigator.go_to_next_page():
+                self._raise_if_browser_died()
+                return True
+            self.state.page += 1
+            self.state.page_url = navigator.driver.current_url
+            self.checkpoint.save(self.state)
+
+    def _session_alive(self) -> bool:
+        watchdog = self.navigator.watchdog
+        if watchdog:
+            return watchdog.healthy and watchdog.alive()
+        try:
+            self.navigator.driver.current_url
+            return True
+        except SESSION_ERRORS:
+            return False
+
+    def _raise_if_browser_died(self):
+        """The page helpers swallow driver errors, so an empty result is double-checked against the session."""
+        self.navigator.driver.current_url
+
+
+class IncrementalCrawl:
+    """
+    Picks up only the listings updated since the last crawl with the same label.
+
+    Results are sorted by 'Updated Date: Recent First' and walked page by page until the
+    listings are ones the history store already has and that were last updated before the
+    previous crawl started; everything further down is older still, so paging stops there.
+    """
+
+    SORT_OPTION = "Updated Date: Recent First"
+
+    def __init__(self, navigator, history: ListingHistoryStore, label: str, patience: int = 3):
+        """
+        Initializes the IncrementalCrawl.
+
+        Args:
+            navigator: The PakWheelsNavigator to drive.
+            history: Store consulted for known listings; new ones are appended to it.
+            label: Identifies the filter set; only earlier crawls with this label count.
+            patience: Consecutive already-stored listings needed before stopping, so a
+                      pinned/featured ad at the top of the page does not end the crawl.
+        """
+        self.navigator = navigator
+        self.history = history
+        self.label = label
+        self.patience = patience
+        self.pages_visited = 0
+
+    def _already_stored(self, listing: ListingData, since: float, stored_ids: set[int]) -> bool:
+        if not str(listing.listing_id).isdigit() or int(listing.listing_id) not in stored_ids:
+            return False
+        if listing.updated_age is None:
+            return True
+        # updated_age is rounded down ('2 hours ago'), so now - age is the latest it can have changed.
+        return time.time() - listing.updated_age <= since
+
+    def run(self, apply_filters: Callable[[FilterInteractor], None] | None = None,
+            max_pages: int | None = None) -> list[ListingData]:
+        """
+        Crawls the new and updated listings and stores them as an incremental crawl.
+
+        Args:
+            apply_filters: Applies the label's filters on a fresh search page (optional).
+            max_pages: Hard page limit, e.g. for the very first run when nothing is stored.
+
+        Returns:
+            The listings updated since the last crawl, newest first.
+        """
+        since = self.history.last_crawl_started(self.label)
+        navigator = self.navigator
+        navigator.go_to_search_page()
+        interactor = FilterInteractor(navigator.driver, navigator.wait, navigator)
+        if apply_filters:
+            apply_filters(interactor)
+        interactor.apply_sort(self.SORT_OPTION)
+        complete = since is None and max_pages is None
+        crawl_id = self.history.start_crawl(self.label, kind="full" if complete else "incremental")
+
+        fresh, known_streak = [], []
+        for page, listings in interactor.iter_pages(max_pages=max_pages):
+            self.pages_visited = page
+            # One lookup per page rather than one connection per listing.
+            stored_ids = (self.history.stored_ids(listing.listing_id for listing in listings)
+                          if since is not None else set())
+            reached_known = False
+            for listing in listings:
+                if since is not None and self._already_stored(listing, since, stored_ids):
+                    known_streak.append(listing)
+                    if len(known_streak) >= self.patience:
+                        reached_known = True
+                        break
+                    continue
+                fresh.extend(known_streak)
+                known_streak = []
+                fresh.append(listing)
+            if reached_known:
+                print(f"Reached listings from the previous crawl on page {page}; stopping.")
+                break
+
+        self.history.add_listings(crawl_id, fresh)
+        print(f"Incremental crawl '{self.label}': {len(fresh)} new or updated listings "
+              f"in {self.pages_visited} page(s).")
+        return fresh
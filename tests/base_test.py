@@ -1,5 +1,7 @@
 import unittest
 from core.navigator import PakWheelsNavigator
+from core.selector_registry import REGISTRY
+from core.failure_artifacts import FailureArtifactCollector
 import os
 import logging
 import traceback
@@ -7,29 +9,57 @@ import traceback
 class BaseTest(unittest.TestCase):
     """Base class for tests needing a WebDriver instance."""
     LOG_PATH = os.path.join(os.getcwd(), "tests.log")
+    LOG_FORMAT = "%(asctime)s %(levelname)-8s %(message)s"
+    LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+    # Set by the parallel runner so every test in a worker reuses one browser.
+    shared_navigator = None
+    artifacts = None
 
     @classmethod
     def setUpClass(cls):
-        cls.navigator = PakWheelsNavigator()
-        cls.driver, cls.wait = cls.navigator.initialize_driver()
+        if BaseTest.shared_navigator:
+            cls.navigator = BaseTest.shared_navigator
+        else:
+            cls.navigator = PakWheelsNavigator()
+            cls.navigator.initialize_driver()
 
         logger = logging.getLogger("pakwheels_tests")
         logger.setLevel(logging.INFO)
 
         if not logger.handlers:
             fh = logging.FileHandler(cls.LOG_PATH, mode="a", encoding="utf-8")
-            fh.setFormatter(logging.Formatter(
-                "%(asctime)s %(levelname)-8s %(message)s",
-                "%Y-%m-%d %H:%M:%S"
-            ))
+            fh.setFormatter(logging.Formatter(cls.LOG_FORMAT, cls.LOG_DATEFMT))
             logger.addHandler(fh)
 
         cls.logger = logger
 
+        if BaseTest.artifacts is None:
+            BaseTest.artifacts = FailureArtifactCollector(
+                cls.navigator.config.get("artifact_dir", "artifacts"),
+                cls.navigator.config.get("artifact_max_bytes", 200 * 1024 * 1024))
+
+    # Read through the navigator so tests pick up the new browser after a watchdog restart.
+    @property
+    def driver(self):
+        return self.navigator.driver
+
+    @property
+    def wait(self):
+        return self.navigator.wait
+
     @classmethod
     def tearDownClass(cls):
         """Tear down the WebDriver after all tests in the class."""
-        if cls.navigator:
+        if BaseTest.artifacts:
+            BaseTest.artifacts.flush()
+        if cls.navigator.watchdog:
+            cls.logger.info(f"WATCHDOG: {cls.__name__} {cls.navigator.watchdog.metrics()}")
+        if cls.navigator and cls.navigator.rate_limiter.stats():
+            cls.logger.info(f"RATE LIMITER: {cls.__name__} {cls.navigator.rate_limiter.stats()}")
+        if REGISTRY.stats():
+            cls.logger.info(f"SELECTORS: {cls.__name__}\n{REGISTRY.report()}")
+        if cls.navigator and cls.navigator is not BaseTest.shared_navigator:
             cls.navigator.close_driver()
 
     def setUp(self):
@@ -53,6 +83,14 @@ class BaseTest(unittest.TestCase):
                 else:
                     tb = str(exc_info)
                 self.logger.error(f"FAIL: {self.id()}\n{tb}")
+                BaseTest.artifacts.capture(self.navigator, self.id())
                 break
         else:
             self.logger.info(f"PASS: {self.id()}")
+
+        suppressor = self.navigator.popup_suppressor
+        if suppressor.active:
+            self.logger.info(
+                f"POPUPS: {self.id()} skipped {suppressor.waits_skipped} popup waits "
+                f"({suppressor.timeout_seconds_skipped:.1f}s of wait timeouts)")
+        suppressor.reset_stats()
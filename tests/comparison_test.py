@@ -8,7 +8,10 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
+from core.comparison_batch import ComparisonBatchRunner, load_comparison_results
 
+import os
+import tempfile
 import time
 from typing import List, Dict, Any, Callable, Tuple
 
@@ -249,3 +252,108 @@ class ComparisonTest(BaseTest):
                         f"Comparison failed: All extracted specification values were identical across the compared cars for all features checked ({len(all_identical_features)} features).")
 
         print("Comparison data validation successful.")
+
+    def test_cached_comparison_result(self):
+        """Tests that a repeated comparison is served from the cache without touching the browser."""
+        print("\nRunning test: test_cached_comparison_result")
+
+        self.navigator.go_to_comparison_page()
+        time.sleep(2)
+
+        cars_to_compare = [
+            {"Make": "Toyota", "Model": "Corolla", "Version": "XLi"},
+            {"Make": "Honda", "Model": "Civic", "Version": "Oriel"}
+        ]
+        self.comparison_interactor.cache.invalidate(cars_to_compare)
+
+        first = self.comparison_interactor.get_comparison_result(cars_to_compare)
+        self.assertIsNotNone(first, "Failed to run the initial comparison.")
+
+        url_before = self.driver.current_url
+        started = time.time()
+        second = self.comparison_interactor.get_comparison_result(
+            [{"Make": " toyota ", "Model": "COROLLA", "Version": "xli"},
+             {"Make": "Honda", "Model": "Civic", "Version": "Oriel"}])
+        elapsed = time.time() - started
+
+        self.assertIs(second, first, "Normalized car details did not hit the cache.")
+        self.assertEqual(self.driver.current_url, url_before,
+                         "Browser navigated while serving a cached comparison.")
+        self.assertLess(elapsed, 1, "Cached comparison took too long to return.")
+
+        refreshed = self.comparison_interactor.get_comparison_result(
+            cars_to_compare, force_refresh=True)
+        self.assertIsNotNone(refreshed, "Forced refresh failed to rerun the comparison.")
+        self.assertIsNot(refreshed, first, "Forced refresh returned the cached object.")
+
+    def test_direct_comparison_url(self):
+        """Tests that a comparison run through the picker can be reopened with a single URL load."""
+        print("\nRunning test: test_direct_comparison_url")
+
+        cars_to_compare = [
+            {"Make": "Toyota", "Model": "Corolla", "Version": "XLi"},
+            {"Make": "Honda", "Model": "Vezel", "Version": "G"}
+        ]
+        self.comparison_interactor.slug_map.forget(cars_to_compare)
+
+        self.navigator.go_to_comparison_page()
+        time.sleep(2)
+        self.assertTrue(self.comparison_interactor.do_comparison(cars_to_compare),
+                        "Failed to run the comparison through the slot picker.")
+
+        self.navigator.go_to_comparison_page()
+        self.assertTrue(self.comparison_interactor.open_comparison_by_url(cars_to_compare),
+                        "Learned slugs did not open the comparison page directly.")
+        for details in cars_to_compare:
+            self.assertIn(details["Make"].lower(), self.driver.current_url.lower(),
+                          "Direct comparison URL does not contain the selected make.")
+
+    def test_reject_unknown_car_before_browser_work(self):
+        """Tests that a car missing from the scraped vocabulary is rejected without driving the picker."""
+        print("\nRunning test: test_reject_unknown_car_before_browser_work")
+
+        if not self.comparison_interactor.vocabulary:
+            self.skipTest("Comparison vocabulary not scraped; run FilterScraper.py first.")
+
+        self.navigator.go_to_comparison_page()
+        url_before = self.driver.current_url
+
+        started = time.time()
+        success = self.comparison_interactor.do_comparison([
+            {"Make": "Toyota", "Model": "Corolla", "Version": "XLi"},
+            {"Make": "McLaren", "Model": "Artura", "Version": "Standard"}
+        ])
+        elapsed = time.time() - started
+
+        self.assertFalse(success, "Unknown car was not rejected.")
+        self.assertEqual(self.driver.current_url, url_before,
+                         "Browser navigated before the unknown car was rejected.")
+        self.assertLess(elapsed, 1, "Rejecting an unknown car took too long.")
+
+    def test_batch_comparison_resumes(self):
+        """Tests that a batch run compares each group once and a rerun resumes from its output."""
+        print("\nRunning test: test_batch_comparison_resumes")
+
+        corolla = {"Make": "Toyota", "Model": "Corolla", "Version": "XLi"}
+        civic = {"Make": "Honda", "Model": "Civic", "Version": "Oriel"}
+        groups = [
+            [corolla, civic],
+            [{"Make": " toyota ", "Model": "COROLLA", "Version": "xli"}, civic],
+            [corolla],
+            [corolla, civic, corolla, civic],
+        ]
+        output_path = os.path.join(tempfile.mkdtemp(), "comparisons.jsonl")
+        runner = ComparisonBatchRunner(output_path, workers=2)
+
+        stats = runner.run(groups)
+        self.assertEqual(stats["ok"], 2, f"Expected both unique groups to be compared, got {stats}.")
+        self.assertEqual(stats["skipped"], 1, "Duplicate group was not skipped.")
+        self.assertEqual(stats["invalid"], 1, "Group of four cars was not rejected.")
+        self.assertEqual(len(list(load_comparison_results(output_path))), 2)
+
+        rerun = runner.run(groups)
+        self.assertEqual((rerun["ok"], rerun["failed"], rerun["skipped"]), (0, 0, 3),
+                         f"Rerun did not resume from the output file: {rerun}.")
+        with open(output_path, "r", encoding="utf-8") as f:
+            invalid = [line for line in f if '"status": "invalid"' in line]
+        self.assertEqual(len(invalid), 1, "Invalid group was recorded again on resume.")
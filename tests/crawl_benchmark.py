@@ -0,0 +1,106 @@
+"""
+Measures how the sharded HTTP crawler scales with the number of worker processes.
+
+A local replay server stands in for PakWheels search results: every city has a fixed
+number of result pages, a featured listing repeats on each city's first page (so
+deduplication has work to do), and pages past the end repeat the last page like the
+site does. Each request is answered after a fixed delay, so the numbers reflect
+parallelism rather than the site. No browser is needed.
+
+Usage:
+    python -m tests.crawl_benchmark
+    python -m tests.crawl_benchmark --cities 24 --pages 6 --latency 0.2 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from core.crawl_planner import Shard
+from core.rate_limiter import TokenBucketLimiter
+from core.search_query import SearchQuery
+from core.sharded_crawler import ShardedCrawler
+
+PER_PAGE = 25
+FEATURED_ID = "9999999"
+
+LISTING_CARD = """<li class="classified-listing" data-listing-id="{listing_id}">
+<a class="car-name ad-detail-path" href="/used-cars/car-{listing_id}">Toyota Corolla</a>
+<div class="price-details">PKR 45 lacs</div>
+<ul class="search-vehicle-info"><li>{city}</li></ul>
+<ul class="search-vehicle-info-2"><li>2019</li><li>42,000 km</li><li>Petrol</li><li>1800 cc</li><li>Automatic</li></ul>
+<div class="total-pictures-bar">12</div>
+<div class="dated">Updated 2 hours ago</div>
+</li>"""
+
+
+def make_handler(latency: float, pages_per_city: int):
+    class SearchPageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            city = next((segment[3:] for segment in parts.path.split("/") if segment.startswith("ct_")), "all")
+            page = min(int(parse_qs(parts.query).get("page", ["1"])[0]), pages_per_city)
+            city_number = (int("".join(filter(str.isdigit, city)) or 0) + 1) * 100_000
+            ids = [str(city_number + (page - 1) * PER_PAGE + i) for i in range(PER_PAGE)]
+            if page == 1:
+                ids[0] = FEATURED_ID
+            cards = "".join(LISTING_CARD.format(listing_id=listing_id, city=city) for listing_id in ids)
+            payload = f"<html><body><ul class='search-results-mid'>{cards}</ul></body></html>".encode("utf-8")
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SearchPageHandler
+
+
+def run_benchmark(cities: int, pages: int, latency: float,
+                  worker_counts: list[int]) -> list[tuple[int, int, int, float]]:
+    """
+    Crawls the same replayed search space once per worker count.
+
+    Returns:
+        (workers, listings, duplicates, listings_per_second) for every worker count.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency, pages))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    search_url = f"http://127.0.0.1:{server.server_port}/used-cars/search/-/"
+    queries = [SearchQuery.from_filters({"City": f"city{i:03d}"}) for i in range(cities)]
+
+    rows = []
+    try:
+        for workers in worker_counts:
+            shards = [Shard(queries[i::workers]) for i in range(workers)]
+            with tempfile.TemporaryDirectory() as tmp:
+                crawler = ShardedCrawler(os.path.join(tmp, "listings.jsonl"), workers=workers,
+                                         max_pages=pages + 1, limiter=TokenBucketLimiter({}),
+                                         search_url=search_url)
+                stats = crawler.run(shards)
+            rows.append((workers, stats["listings"], stats["duplicates"], stats["listings_per_second"]))
+    finally:
+        server.shutdown()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=16, help="City shards in the replayed search space.")
+    parser.add_argument("--pages", type=int, default=4, help="Result pages per city.")
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Seconds the replay server waits before answering.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Worker process counts to measure.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.cities, args.pages, args.latency, args.workers)
+    print(f"\n{'workers':>7}  {'listings':>8}  {'dupes':>5}  {'listings/s':>10}")
+    for workers, listings, duplicates, per_second in results:
+        print(f"{workers:>7}  {listings:>8}  {duplicates:>5}  {per_second:>10.1f}")
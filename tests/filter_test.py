@@ -3,9 +3,19 @@ from core.models import ListingPageData
 from tests.base_test import BaseTest
 from core.search_interactor import FilterInteractor
 from core.extractor import ListingExtractor
+from core.sort_validator import SortOrderValidator
+from core.sweep import IncrementalCrawl, ListingSweep
+from core.listing_history import ListingHistoryStore
+from core.filter_rules import FilterVerifier
+from core.search_query import SearchQuery
+from core.adaptive_sampling import ACCEPT, REJECT, SequentialDetailSampler
+from core.selector_registry import REGISTRY
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
+import math
+import os
+import tempfile
 import time
 from typing import List, Dict, Any, Callable, Tuple
 
@@ -38,18 +48,12 @@ class FilterTests(BaseTest):
         self.assertGreater(len(
             listings), 0, "No listings found after applying filters. Check filter criteria or website state.")
 
-        print(f"Verifying {len(listings)} listings against filters...")
-        mismatches = []
-
-        for i, listing in enumerate(listings):
-            # Verify City
-            if listing.city and filters["City"].lower() not in listing.city.lower():
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): City mismatch. Expected '{filters['City']}', got '{listing.city}'.")
-
-            if listing.transmission and filters["Transmission"].lower() not in listing.transmission.lower():
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): Transmission mismatch. Expected '{filters['Transmission']}', got '{listing.engine_type}'.")
+        verifier = FilterVerifier({
+            "City": {"type": "option", "value": filters["City"]},
+            "Transmission": {"type": "option", "value": filters["Transmission"]},
+        })
+        print(f"Verifying {len(listings)} listings against filters ({verifier.describe()})...")
+        mismatches = verifier.check_summaries(listings)
 
         if mismatches:
             self.fail(
@@ -140,8 +144,10 @@ class FilterTests(BaseTest):
             "Price Range", min_value=min_price, max_value=max_price)
         time.sleep(3)
 
-        if max_price < min_price:
-            min_price, max_price = max_price, min_price
+        verifier = FilterVerifier({
+            "City": {"type": "option", "value": target_city},
+            "Price Range": {"type": "range", "min": min_price, "max": max_price},
+        })
 
         print("Fetching listing data after applying filters...")
         listings = self.filter_interactor.get_current_listings_data()
@@ -149,27 +155,8 @@ class FilterTests(BaseTest):
         self.assertGreater(len(
             listings), 0, "No listings found after applying filters. Check filter criteria or website state.")
 
-        print(f"Verifying {len(listings)} listings against filters...")
-        mismatches = []
-
-        for i, listing in enumerate(listings):
-            # Verify City
-            if listing.city and target_city.lower() not in listing.city.lower():
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): City mismatch. Expected '{target_city}', got '{listing.city}'.")
-
-            # Verify Price
-            if listing.price is not None:
-                if isinstance(listing.price, int):
-                    if not (min_price <= listing.price <= max_price):
-                        mismatches.append(
-                            f"Listing {i+1} (ID: {listing.listing_id}): Price mismatch. Price {listing.price} not in range [{min_price}-{max_price}].")
-                else:
-                    mismatches.append(
-                        f"Listing {i+1} (ID: {listing.listing_id}): Price could not be parsed to integer ('{listing.price}'). Cannot verify range.")
-            else:
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): Price is missing. Cannot verify range.")
+        print(f"Verifying {len(listings)} listings against filters ({verifier.describe()})...")
+        mismatches = verifier.check_summaries(listings)
 
         if mismatches:
             self.fail(
@@ -240,29 +227,14 @@ class FilterTests(BaseTest):
         self.assertGreater(len(
             listings), 0, "No listings found after applying filters. Check filter criteria or website state.")
 
-        print(f"Verifying {len(listings)} listings against filters...")
-        mismatches = []
-
-        for i, listing in enumerate(listings):
-            # Verify City
-            if listing.city and target_city.lower() not in listing.city.lower():
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): City mismatch. Expected '{target_city}', got '{listing.city}'.")
-
-            # Verify Transmission
-            if listing.transmission and transmission.lower() not in listing.transmission.lower():
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): Transmission mismatch. Expected '{transmission}', got '{listing.transmission}'.")
-
-            # Verify Engine Type
-            if listing.engine_type and engine_type.lower() not in listing.engine_type.lower():
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): Engine Type mismatch. Expected '{engine_type}', got '{listing.engine_type}'.")
-
-            # Verify Picture Availability boolean
-            if picture_availability == "With Pictures" and not listing.picture_availability:
-                mismatches.append(
-                    f"Listing {i+1} (ID: {listing.listing_id}): Picture Availability mismatch. Expected '{picture_availability}', got '{listing.picture_availability}'.")
+        verifier = FilterVerifier({
+            "City": {"type": "option", "value": target_city},
+            "Transmission": {"type": "option", "value": transmission},
+            "Engine Type": {"type": "option", "value": engine_type},
+            "Picture Availability": {"type": "option", "value": picture_availability},
+        })
+        print(f"Verifying {len(listings)} listings against filters ({verifier.describe()})...")
+        mismatches = verifier.check_summaries(listings)
 
         if mismatches:
             self.fail(
@@ -279,172 +251,146 @@ class FilterTests(BaseTest):
     # --------------------------------------------------------------
     def test_verify_imported_assembly_across_pages(self):
         """
-        Applies 'Assembly: Imported' filter and verifies listings on first 3 pages.
+        Applies 'Assembly: Imported' filter and verifies listings over enough pages for the sampler to decide.
+        Detail pages are sampled sequentially until the mismatch rate is decided, and
+        progress is checkpointed per page, so a browser crash resumes instead of restarting.
         """
-        print("\\nRunning test: test_verify_imported_assembly_across_pages")
+        print("\nRunning test: test_verify_imported_assembly_across_pages")
 
         # --- Filter Criteria ---
         filter_name = "Assembly"
         option_value = "Imported"
-        max_pages_to_check = 3
-
-        # --- Apply Filter ---
-        print(f"Applying filter: {filter_name} = {option_value}")
-        self.filter_interactor.select_filter_option(filter_name, option_value)
-        time.sleep(3)
-        print("Filter applied. Proceeding to check listings.")
-
-        # --- Initialization ---
-        mismatches = []
-        original_window_handle = self.driver.current_window_handle
-        current_page = 1
 
-        # --- Page Traversal Loop ---
-        while current_page <= max_pages_to_check:
-            print(f"--- Checking Page {current_page} ---")
-
-            # Get listings on the current page
-            listings_on_page = self.filter_interactor.get_current_listings_data()
-
-            if not listings_on_page:
-                print(
-                    f"No listings found on page {current_page}. Stopping check.")
-                break
-            counter = 0
+        def apply_filters(interactor):
+            print(f"Applying filter: {filter_name} = {option_value}")
+            interactor.select_filter_option(filter_name, option_value)
+            time.sleep(3)
+            print("Filter applied. Proceeding to check listings.")
+
+        verifier = FilterVerifier({filter_name: {"type": "option", "value": option_value}})
+        sampler = SequentialDetailSampler(
+            verifier, batch_size=self.navigator.config.get("detail_tabs", 4))
+        # Enough pages for three times the samples the SPRT expects to need, since cards
+        # whose detail page shows no assembly are not counted.
+        per_page = self.navigator.config.get("results_per_page", 25)
+        max_pages_to_check = max(3, math.ceil(3 * sampler.expected_samples() / per_page))
+
+        def check_page(current_page, listings_on_page):
             print(
-                f"Found {len(listings_on_page)} listings on page {current_page}. Verifying assembly...")
-            # --- Listing Verification Loop ---
-            for i, listing_summary in enumerate(listings_on_page):
-                if not listing_summary.url:
-                    print(
-                        f"Warning: Listing {i+1} (ID: {listing_summary.listing_id}) on page {current_page} has no URL. Skipping.")
-                    continue
-                if counter >= 5:
-                    print(
-                        f"  Warning: Skipping listing {i+1} (ID: {listing_summary.listing_id}) due to too many open tabs.")
-                    break
-                counter += 1
-                print(
-                    f"  Checking listing {i+1} (ID: {listing_summary.listing_id})...")
-                new_tab_handle = None
-                try:
-                    new_tab_handle = self.navigator.open_listing_page_new_tab(
-                        listing_summary.url)
-                    if not new_tab_handle:
-                        print(
-                            f"  Error: Failed to open or switch to new tab for listing {listing_summary.listing_id}. Skipping.")
-                        continue
-
-                    time.sleep(2)
-                    try:
-                        self.wait.until(EC.presence_of_element_located(
-                            (By.CSS_SELECTOR, "table.table-engine-detail, .price-box")))
-                    except TimeoutException:
-                        print(
-                            f"  Warning: Timed out waiting for detail page elements for listing {listing_summary.listing_id}.")
-
-                    self.filter_interactor.sleep_driver(1)
-                    listing_details = self.extractor.extract_listing_page_data(
-                        self.driver)
-
-                    # Verify Assembly
-                    if listing_details.assembly is None:
-                        print(f"Assembly Unavailable for the listing: {listing_summary.listing_id}")
-                    elif option_value.lower() not in listing_details.assembly.lower():
-                        mismatches.append(
-                            f"Page {current_page}, Listing {i+1} (ID: {listing_summary.listing_id}, URL: {listing_summary.url}): Assembly mismatch. Expected '{option_value}', got '{listing_details.assembly}'.")
-                    else:
-                        print(
-                            f"    Assembly '{listing_details.assembly}' matches expected '{option_value}'. OK.")
-
-                except Exception as e:
-                    print(
-                        f"  Error processing listing {listing_summary.listing_id} on page {current_page}: {e}")
-                    mismatches.append(
-                        f"Page {current_page}, Listing {i+1} (ID: {listing_summary.listing_id}, URL: {listing_summary.url}): Unexpected error during processing: {e}")
-                finally:
-                    if new_tab_handle:
-                        self.navigator.close_current_tab_and_switch_back(
-                            original_window_handle)
-
-            # --- Go to Next Page ---
-            if current_page < max_pages_to_check:
-                print(f"Attempting to navigate to page {current_page + 1}...")
-                if not self.navigator.go_to_next_page():
-                    print(
-                        f"Could not navigate to next page (already on last page or error). Stopping check.")
-                    break
-
-            current_page += 1
+                f"Found {len(listings_on_page)} listings on page {current_page}. Verifying ({verifier.describe()})...")
+            return sampler.check(listings_on_page, self.navigator.load_listing_details,
+                                 prefix=f"Page {current_page}, ")
+
+        history = ListingHistoryStore(
+            self.navigator.config.get("listing_history_path", "listing_history.db"))
+        sweep = ListingSweep(self.navigator, self.id(), {filter_name: option_value},
+                             history=history)
+        mismatches = sweep.run(apply_filters, check_page, max_pages=max_pages_to_check)
 
         # --- Assert Results ---
+        print(f"Sampling: {sampler.report()}")
+        self.logger.info(f"SAMPLING: {self.id()} {sampler.report()}")
         self.assertFalse(mismatches,
                          f"Found listings that do not match the '{option_value}' assembly filter or had errors:\\n" + "\\n".join(mismatches))
+        self.assertNotEqual(sampler.decision, REJECT,
+                            f"Sampling found the '{option_value}' assembly filter broken: {sampler.report()}")
+        if sampler.decision != ACCEPT:
+            print(f"Warning: sampling stayed undecided after {sweep.state.page} page(s).")
 
         print(
-            f"Successfully verified assembly for all checked listings across {current_page-1} page(s).")
+            f"Successfully verified assembly for all checked listings across {sweep.state.page} page(s).")
 
     # --------------------------------------------------------------
     # Test Case 5: Test the Filters across multiple webpages
     # - --------------------------------------------------------------
 
     def test_sorting_by_price(self):
-        """Tests sorting by price (High→Low) across the first 3 pages using summary data only."""
+        """Tests sorting by price (High→Low) across the first 3 pages, including page boundaries."""
         print("\nRunning test: test_sorting_by_price_quick")
 
-        # Apply the sort
-        print("Applying sort: Price: High to Low")
-        self.filter_interactor.apply_sort("Price: High to Low")
+        self._verify_sort_order("Price: High to Low", max_pages=3)
+
+    def test_sorting_by_model_year(self):
+        """Tests sorting by model year (Latest First) across the first 3 pages."""
+        print("\nRunning test: test_sorting_by_model_year")
+
+        self._verify_sort_order("Model Year: Latest First", max_pages=3)
+
+    def _verify_sort_order(self, sort_option: str, max_pages: int):
+        print(f"Applying sort: {sort_option}")
+        self.filter_interactor.apply_sort(sort_option)
         time.sleep(3)
 
-        mismatches = []
-        current_page = 1
-
-        # Loop over pages
-        while current_page <= 3:
-            print(f"--- Page {current_page} ---")
-            listings = self.filter_interactor.get_current_listings_data()
-            if not listings:
-                print(f"No listings found on page {current_page}, stopping.")
-                break
-
-            # Extract and validate prices
-            prices = []
-            for idx, summary in enumerate(listings, start=1):
-                price = summary.price
-                if price is None:
-                    mismatches.append(
-                        f"Page {current_page} Listing {idx}: missing price."
-                    )
-                elif not isinstance(price, int):
-                    mismatches.append(
-                        f"Page {current_page} Listing {idx}: price '{price}' not an int."
-                    )
-                else:
-                    prices.append(price)
-
-            # Check the prices list is sorted descending
-            if prices and prices != sorted(prices, reverse=True):
-                mismatches.append(
-                    f"Page {current_page}: prices not in descending order: {prices}"
-                )
-            else:
-                print(f"  Prices on page {current_page} are correctly sorted.")
-
-            # Advance to next page (if possible)
-            try:
-                self.navigator.go_to_next_page()
-                time.sleep(3)
-                current_page += 1
-            except TimeoutException:
-                print("No further pages available; ending at page", current_page)
-                break
-
-        # 6. Assert no mismatches were found
+        validator = SortOrderValidator(sort_option, fail_fast=True)
+        mismatches = validator.validate(
+            self.filter_interactor.iter_listings(max_pages=max_pages))
+
+        self.assertGreater(validator.checked, 0, "No listings found after applying the sort.")
         if mismatches:
             self.fail("Sorting mismatches:\n" + "\n".join(mismatches))
         else:
-            print("✅ All pages verified: listings are sorted High→Low by price.")
+            print(f"✅ All pages verified: listings are sorted by '{sort_option}'.")
+
+    def test_incremental_crawl_stops_at_stored_listings(self):
+        """A second incremental crawl right after the first should stop within the first pages."""
+        print("\nRunning test: test_incremental_crawl_stops_at_stored_listings")
+        with tempfile.TemporaryDirectory() as tmp:
+            history = ListingHistoryStore(os.path.join(tmp, "history.db"))
+
+            first = IncrementalCrawl(self.navigator, history, "all-cars")
+            stored = first.run(max_pages=3)
+            self.assertGreater(len(stored), 0, "First crawl found no listings.")
+
+            second = IncrementalCrawl(self.navigator, history, "all-cars")
+            fresh = second.run(max_pages=3)
+            print(f"Second crawl: {len(fresh)} listings in {second.pages_visited} page(s).")
+            self.assertLess(second.pages_visited, 3,
+                            "Incremental crawl did not stop at already-stored listings.")
+
+    def test_search_query_round_trips_through_results_url(self):
+        """Checks that the results URL of a clicked filter reads back as the same canonical query."""
+        print("\nRunning test: test_search_query_round_trips_through_results_url")
+        query = SearchQuery.from_filters({"City": "Lahore", "Transmission": "Automatic"})
+
+        self.filter_interactor.select_filter_option("City", "Lahore")
+        self.filter_interactor.sleep_driver(3)
+        self.filter_interactor.select_filter_option("Transmission", "Automatic")
+        self.filter_interactor.sleep_driver(3)
+        clicked_url = self.driver.current_url
+        print(f"Results URL after clicking filters: {clicked_url}")
+        self.assertEqual(SearchQuery.from_url(clicked_url), query,
+                         f"Results URL did not parse back to {query}.")
+
+        self.navigator.go_to_search_results(query)
+        self.assertEqual(SearchQuery.from_url(self.driver.current_url), query,
+                         "Opening the query URL landed on a different filter set.")
+        self.assertGreater(len(self.filter_interactor.get_current_listings_data()), 0,
+                           "No listings found on the query URL.")
+
+    def test_result_count_matches_listings_paged(self):
+        """Checks that count() predicts the listings found by paging through a small result set."""
+        print("\nRunning test: test_result_count_matches_listings_paged")
+        filters = {"City": "Gujranwala", "Transmission": "Automatic", "Engine Type": "Petrol"}
+        result = self.filter_interactor.count(filters)
+        self.assertIsNotNone(result.total, "No result count found on the results page.")
+        if result.pages > 5:
+            self.skipTest(f"{result.total} results is too many to page through here.")
+
+        paged = [listing for _, listing in self.filter_interactor.iter_listings(max_pages=result.pages + 1)]
+        print(f"count() said {result.total}; paging found {len(paged)} listings.")
+        self.assertLessEqual(abs(len(paged) - result.total), max(2, result.total // 20),
+                             "Result count is off from the listings actually paged through.")
+
+    def test_network_listings_match_dom(self):
+        """Checks that listings parsed from the captured response equal the DOM-scraped ones."""
+        print("\nRunning test: test_network_listings_match_dom")
+        if not self.navigator.network_capture.active:
+            self.skipTest("Network capture is off; set network_capture in config.json (Chrome only).")
+
+        differences = self.filter_interactor.compare_listing_sources()
+        if differences:
+            self.fail("Network and DOM listings differ:\n" + "\n".join(differences))
+        print("✅ Network and DOM listings are identical.")
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,145 @@
+"""
+Runs FilterTests and ComparisonTest methods across worker processes.
+
+Each worker owns one PakWheelsNavigator (and so one browser) for all the tests it
+picks up. PASS/FAIL records from every worker go through a queue to a single
+listener in the parent, which appends them to tests.log.
+
+Usage:
+    python -m tests.parallel_runner --workers 4
+    python -m tests.parallel_runner --workers 2 tests.filter_test.FilterTests.test_apply_city_filter
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import time
+import unittest
+
+from core.navigator import PakWheelsNavigator
+from core.rate_limiter import TokenBucketLimiter
+from tests.base_test import BaseTest
+
+DEFAULT_SUITES = ["tests.filter_test.FilterTests", "tests.comparison_test.ComparisonTest"]
+
+
+def collect_test_ids(names: list[str]) -> list[str]:
+    """Expands module/class/method names into individual test ids."""
+    loader = unittest.TestLoader()
+    ids = []
+
+    def flatten(suite):
+        for item in suite:
+            if isinstance(item, unittest.TestSuite):
+                flatten(item)
+            else:
+                ids.append(item.id())
+
+    for name in names:
+        flatten(loader.loadTestsFromName(name))
+    return ids
+
+
+def _worker(task_queue, log_queue, result_queue, limiter):
+    from core.rate_limiter import install_shared_limiter
+
+    install_shared_limiter(limiter)
+
+    logger = logging.getLogger("pakwheels_tests")
+    logger.setLevel(logging.INFO)
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+
+    navigator = PakWheelsNavigator()
+    navigator.initialize_driver()
+    BaseTest.shared_navigator = navigator
+    loader = unittest.TestLoader()
+    try:
+        while True:
+            # Blocking get: get_nowait() can raise Empty while another worker holds the
+            # queue's read lock, even though tests remain.
+            test_id = task_queue.get()
+            if test_id is None:
+                return
+
+            started = time.time()
+            result = unittest.TestResult()
+            loader.loadTestsFromName(test_id).run(result)
+            if result.errors:
+                status = "ERROR"
+            elif result.failures:
+                status = "FAIL"
+            elif result.skipped:
+                status = "SKIP"
+            else:
+                status = "PASS"
+            result_queue.put((test_id, status, time.time() - started))
+    finally:
+        BaseTest.shared_navigator = None
+        navigator.close_driver()
+
+
+def run_parallel(names: list[str], workers: int) -> list[tuple[str, str, float]]:
+    """
+    Runs the named tests across worker processes.
+
+    Returns:
+        (test_id, status, duration_seconds) for every test, in completion order.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    task_queue, log_queue, result_queue = ctx.Queue(), ctx.Queue(), ctx.Queue()
+    test_ids = collect_test_ids(names)
+    for test_id in test_ids:
+        task_queue.put(test_id)
+
+    file_handler = logging.FileHandler(BaseTest.LOG_PATH, mode="a", encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(BaseTest.LOG_FORMAT, BaseTest.LOG_DATEFMT))
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+
+    # One limiter for all workers, so N browsers together stay within the site budgets.
+    with open("config.json", "r") as f:
+        config = json.load(f)
+    limiter = TokenBucketLimiter.from_config(config, ctx)
+    processes = [ctx.Process(target=_worker, args=(task_queue, log_queue, result_queue, limiter))
+                 for _ in range(min(workers, len(test_ids)))]
+    for _ in processes:
+        task_queue.put(None)  # One stop sentinel per worker, queued after every test.
+    for process in processes:
+        process.start()
+
+    results = []
+    while len(results) < len(test_ids):
+        try:
+            results.append(result_queue.get(timeout=5))
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+    for process in processes:
+        process.join()
+    listener.stop()
+    file_handler.close()
+    return results
+
+
+def print_duration_table(results: list[tuple[str, str, float]], wall_seconds: float):
+    width = max((len(test_id) for test_id, _, _ in results), default=10)
+    print(f"\n{'test':<{width}}  {'status':<6}  {'seconds':>8}")
+    for test_id, status, duration in sorted(results, key=lambda r: r[2], reverse=True):
+        print(f"{test_id:<{width}}  {status:<6}  {duration:>8.1f}")
+    serial = sum(duration for _, _, duration in results)
+    print(f"\n{len(results)} tests, {serial:.1f}s of test time in {wall_seconds:.1f}s wall time.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", default=DEFAULT_SUITES,
+                        help="Test modules, classes or methods to run.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    started = time.time()
+    results = run_parallel(args.names, args.workers)
+    print_duration_table(results, time.time() - started)
+    raise SystemExit(0 if all(status in ("PASS", "SKIP") for _, status, _ in results) else 1)
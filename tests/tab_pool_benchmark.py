@@ -0,0 +1,103 @@
+"""
+Measures detail-page throughput of the tab pool for several pool sizes.
+
+A local HTTP server stands in for PakWheels: it serves generated listing detail
+pages after a fixed delay, so the numbers reflect the pipeline rather than the
+site or the network. Needs Chrome, like the rest of the suite.
+
+Usage:
+    python -m tests.tab_pool_benchmark
+    python -m tests.tab_pool_benchmark --pages 80 --latency 0.8 --tabs 1 2 4 8
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.navigator import PakWheelsNavigator
+
+DETAIL_PAGE = """<!DOCTYPE html>
+<html><head><title>Listing {listing_id}</title>
+<script type="application/ld+json">{json_ld}</script></head>
+<body>
+<p class="detail-sub-heading"><a>Gulberg, Lahore Punjab</a></p>
+<div class="price-box"><strong>PKR 45 lacs</strong></div>
+<table class="table-engine-detail"><tr>
+<td>{year}</td><td>{mileage:,} km</td><td>Petrol</td><td>Automatic</td></tr></table>
+<ul class="ul-featured">
+<li class="ad-data">Registered In</li><li>Lahore</li>
+<li class="ad-data">Color</li><li>White</li>
+<li class="ad-data">Assembly</li><li>Imported</li>
+<li class="ad-data">Engine Capacity</li><li>1800 cc</li>
+<li class="ad-data">Body Type</li><li>Sedan</li>
+<li class="ad-data">Ad Ref #</li><li>{listing_id}</li>
+</ul>
+<button class="phone_number_btn"><span>0300-12.....</span></button>
+{padding}
+</body></html>"""
+
+
+def make_handler(latency: float):
+    class DetailPageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            listing_id = self.path.strip("/").split("/")[-1] or "0"
+            time.sleep(latency)
+            json_ld = json.dumps({"@type": "Car", "modelDate": "2019",
+                                  "offers": {"price": 4500000}})
+            body = DETAIL_PAGE.format(listing_id=listing_id, json_ld=json_ld, year=2019,
+                                      mileage=42000, padding="<div>filler</div>" * 2000)
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return DetailPageHandler
+
+
+def run_benchmark(pages: int, latency: float, tab_counts: list[int]) -> list[tuple[int, int, float]]:
+    """
+    Loads the same number of stand-in detail pages once per pool size.
+
+    Returns:
+        (tabs, pages_extracted, listings_per_minute) for every pool size.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/used-cars/"
+
+    navigator = PakWheelsNavigator()
+    navigator.initialize_driver()
+    rows = []
+    try:
+        for tabs in tab_counts:
+            # Fresh URLs per run so the browser cache does not flatter later runs.
+            urls = [f"{base_url}{tabs}-{i}" for i in range(pages)]
+            started = time.perf_counter()
+            results = navigator.load_listing_details(urls, tabs=tabs)
+            elapsed = time.perf_counter() - started
+            extracted = sum(1 for data in results.values() if data is not None)
+            rows.append((tabs, extracted, extracted / elapsed * 60))
+    finally:
+        navigator.close_driver()
+        server.shutdown()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=40, help="Detail pages per pool size.")
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="Seconds the stand-in server waits before answering.")
+    parser.add_argument("--tabs", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Pool sizes to measure.")
+    args = parser.parse_args()
+
+    print(f"\n{'tabs':>4}  {'pages':>5}  {'listings/min':>12}")
+    for tabs, extracted, per_minute in run_benchmark(args.pages, args.latency, args.tabs):
+        print(f"{tabs:>4}  {extracted:>5}  {per_minute:>12.1f}")